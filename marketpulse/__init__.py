@@ -0,0 +1,26 @@
+"""Shared data layer for the MarketPulse Streamlit pages.
+
+Submodules are imported on first attribute access (``marketpulse.cot``),
+so importing the package costs nothing and a page only pays for the
+modules, and the third-party libraries behind them, that it uses.
+"""
+import importlib
+
+_SUBMODULES = (
+    "cache", "charts", "correlation", "cot", "cot_store", "export", "fundamentals", "indicators", "macro",
+    "metrics", "ohlcv", "prices", "providers", "pulse", "scanner", "scheduler", "setups", "store",
+)
+
+__all__ = list(_SUBMODULES)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
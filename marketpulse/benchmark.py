@@ -0,0 +1,307 @@
+"""Offline benchmark suite.
+
+``python -m marketpulse.benchmark`` times the data paths the pages depend
+on against the bundled ``price_data.pkl`` and ``cot_data.pkl`` and against
+synthetic inputs scaled 10x and 100x:
+
+- prices: converting the price pickle into the store, and the page's
+  ``load_us_data`` read (columns filtered by coverage)
+- cot: mapping CFTC market names to assets and the weekly groupby
+- corr: ``DataFrame.corr`` of returns and the engine equivalents, at
+  increasing widths
+- indicators: Bollinger bands and rolling volatility over a symbol panel
+- charts: building and serializing a price chart figure
+
+Every case reports its median and best time over ``--repeat`` runs and its
+peak traced memory (``tracemalloc``, measured in a separate run). Results
+are written as JSON. With ``--baseline`` the run is compared against a
+previous result and exits non-zero when a case got slower than the
+tolerance allows; ``--save-baseline`` stores this run as the new baseline.
+Nothing touches the network or the real data directory.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import store
+
+SCALES = (1, 10, 100)
+DEFAULT_BASELINE = store.DATA_DIR / "benchmarks" / "baseline.json"
+
+# A case regresses when it is this much slower than the baseline, and by
+# more than MIN_DELTA seconds so that sub-millisecond noise never fails a run
+TOLERANCE = 0.25
+MIN_DELTA = 0.005
+
+# pandas' DataFrame.corr is O(n·k²) in Cython loops, and the rolling engine
+# keeps O(n·k²) prefix sums; past these widths only pairwise_corr is timed
+PANDAS_CORR_MAX_WIDTH = 250
+ENGINE_MAX_WIDTH = 60
+
+
+def _price_panel(scale, rng):
+    # The bundled panel, widened with random walks to ``scale`` times its columns
+    from . import prices
+    base = prices._flatten(pd.read_pickle(prices.PRICE_PICKLE))
+    if scale == 1:
+        return base
+    extra = base.shape[1] * (scale - 1)
+    steps = rng.normal(0, 0.01, size=(len(base), extra))
+    walks = 100 * np.exp(np.cumsum(steps, axis=0))
+    # Same gaps as the real columns, so the missing-data paths are exercised
+    mask = np.tile(base.isna().to_numpy(), (1, scale - 1))
+    walks[mask] = np.nan
+    synthetic = pd.DataFrame(walks, index=base.index, columns=[f"SYN{i}_SYN{i}" for i in range(extra)])
+    return pd.concat([base, synthetic], axis=1)
+
+
+def _raw_cot(scale, rng):
+    # Raw CFTC-style rows rebuilt from the bundled weekly history: each
+    # weekly row becomes one report for its asset plus four unrelated markets
+    from . import cot
+    history = pd.read_pickle(cot.COT_PICKLE)
+    history = pd.concat([history] * scale, ignore_index=True)
+    n = len(history)
+    names = history["Asset"].map(cot.ASSETS).fillna("Other").to_numpy(dtype=object)
+    others = np.array([f"UNLISTED MARKET {i} - SOME EXCHANGE" for i in range(200)], dtype=object)
+    market = np.concatenate([names + " - CHICAGO MERCANTILE EXCHANGE", rng.choice(others, size=4 * n)])
+    dates = np.concatenate([history["Date"].to_numpy() - np.timedelta64(5, "D")] * 5)
+    return pd.DataFrame({
+        "Market and Exchange Names": market,
+        "As of Date in Form YYYY-MM-DD": pd.to_datetime(dates).strftime("%Y-%m-%d"),
+        "Noncommercial Positions-Long (All)": rng.integers(0, 500_000, size=5 * n),
+        "Noncommercial Positions-Short (All)": rng.integers(0, 500_000, size=5 * n),
+    })
+
+
+def _cases(scales, rng):
+    """Yield ``(group, name, scale, build)``; ``build()`` returns ``(run, extra)``."""
+    from . import charts, correlation, cot, indicators, prices
+
+    def price_import():
+        def run():
+            path = store.path_for(prices.DATASET)
+            if path.exists():
+                path.unlink()
+            prices.load_price_panel()
+        return run, {}
+
+    def price_read():
+        prices.load_price_panel()
+        return (lambda: prices.load_price_panel(min_coverage=0.7)), {}
+
+    yield "prices", "pickle_to_store", 1, price_import
+    yield "prices", "load_us_data", 1, price_read
+
+    for scale in scales:
+        if scale > 1:
+            def scaled_read(scale=scale):
+                panel = _price_panel(scale, rng)
+                name = f"benchmark/price_panel_{scale}x"
+                store.write_frame(name, panel, index_name="Date")
+                return (lambda: store.read_frame(name)), {"columns": panel.shape[1]}
+            yield "prices", "load_us_data", scale, scaled_read
+
+        def cot_classify(scale=scale):
+            raw = _raw_cot(scale, rng)
+            names = raw["Market and Exchange Names"]
+            return (lambda: cot.AssetClassifier(cot.ASSETS).classify(names)), {"rows": len(raw)}
+
+        def cot_weekly(scale=scale):
+            raw = _raw_cot(scale, rng)
+            return (lambda: cot.process_reports(raw, cot.ASSETS)), {"rows": len(raw)}
+
+        yield "cot", "classify_names", scale, cot_classify
+        yield "cot", "process_reports", scale, cot_weekly
+
+        panel = None
+
+        def get_panel(scale=scale):
+            nonlocal panel
+            if panel is None:
+                panel = _price_panel(scale, rng)
+            return panel
+
+        def pandas_corr(scale=scale):
+            returns = get_panel().pct_change(fill_method=None)
+            return (lambda: returns.corr()), {"columns": returns.shape[1]}
+
+        def pairwise(scale=scale):
+            returns = get_panel().pct_change(fill_method=None)
+            return (lambda: correlation.pairwise_corr(returns)), {"columns": returns.shape[1]}
+
+        def engine_window(scale=scale):
+            dense = get_panel().dropna()
+            engine = correlation.RollingCorrelationEngine(dense)
+            start = dense.index[len(dense) // 2]
+            return (lambda: engine.corr(start=start)), {"columns": dense.shape[1]}
+
+        if get_panel().shape[1] <= PANDAS_CORR_MAX_WIDTH:
+            yield "corr", "pandas_corr", scale, pandas_corr
+        yield "corr", "pairwise_corr", scale, pairwise
+        if get_panel().shape[1] <= ENGINE_MAX_WIDTH:
+            yield "corr", "engine_window_corr", scale, engine_window
+
+        def bollinger_vol(scale=scale):
+            close = get_panel()
+
+            def run():
+                values = indicators.compute_many(close, [("sma", 20), ("std", 20), ("vol", 20)])
+                indicators.bollinger(close, 20, 2, middle=values[("sma", 20)], std=values[("std", 20)])
+            return run, {"columns": close.shape[1]}
+
+        def bollinger_vol_pandas(scale=scale):
+            close = get_panel()
+
+            def run():
+                indicators.bollinger(close, 20, 2)
+                indicators.rolling_volatility(close, 20)
+            return run, {"columns": close.shape[1]}
+
+        yield "indicators", "bollinger_volatility", scale, bollinger_vol
+        yield "indicators", "bollinger_volatility_pandas", scale, bollinger_vol_pandas
+
+        def chart(scale=scale):
+            import plotly.graph_objects as go
+            base = get_panel().iloc[:, 0].dropna()
+            n = len(base) * scale
+            series = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))),
+                               index=pd.date_range("1900-01-01", periods=n, freq="D"))
+            extra = {"points": n}
+
+            def run():
+                fig = go.Figure([charts.line(series, name="Close")])
+                charts.reference_line(fig, float(series.mean()))
+                extra["payload_bytes"] = len(fig.to_json())
+            return run, extra
+
+        yield "charts", "price_figure", scale, chart
+
+
+def _measure(run, repeat):
+    run()  # warm-up: first-touch page faults, lazy imports, caches
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def run_suite(scales=SCALES, repeat=5, only=None, seed=0):
+    """Run every case and return the results document."""
+    rng = np.random.default_rng(seed)
+    results = []
+    for group, name, scale, build in _cases(scales, rng):
+        key = f"{group}.{name}"
+        if only and not any(pattern in key for pattern in only):
+            continue
+        run, extra = build()
+        times, peak = _measure(run, repeat)
+        result = {
+            "case": key, "scale": scale,
+            "median_s": statistics.median(times), "min_s": min(times),
+            "peak_mb": peak / 2**20, **extra,
+        }
+        print(f"{key:42} {scale:>4}x {result['median_s'] * 1000:10.2f} ms {result['peak_mb']:9.1f} MB",
+              file=sys.stderr)
+        results.append(result)
+    return {
+        "meta": {
+            "created": pd.Timestamp.now("UTC").isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=TOLERANCE, min_delta=MIN_DELTA):
+    """Rows of ``(case, scale, baseline_s, current_s, ratio, regressed)`` for cases in both runs."""
+    previous = {(r["case"], r["scale"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        old = previous.get((r["case"], r["scale"]))
+        if old is None:
+            continue
+        ratio = r["median_s"] / old["median_s"] if old["median_s"] else float("inf")
+        regressed = ratio > 1 + tolerance and r["median_s"] - old["median_s"] > min_delta
+        rows.append((r["case"], r["scale"], old["median_s"], r["median_s"], ratio, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the MarketPulse data paths offline.")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES), help="input scales to run")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("--only", nargs="+", help="run only cases whose name contains one of these")
+    parser.add_argument("--output", type=Path, help="write the results JSON here (default: stdout)")
+    parser.add_argument("--baseline", type=Path, nargs="?", const=DEFAULT_BASELINE,
+                        help=f"compare against this results file (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", type=Path, nargs="?", const=DEFAULT_BASELINE,
+                        help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed slowdown as a fraction of the baseline median")
+    args = parser.parse_args(argv)
+    if args.baseline and not args.baseline.exists():
+        print(f"No baseline at {args.baseline}", file=sys.stderr)
+        return 2
+
+    # Work in a scratch store so the real data directory is never touched
+    with tempfile.TemporaryDirectory(prefix="marketpulse-bench-") as scratch:
+        data_dir, store.DATA_DIR = store.DATA_DIR, Path(scratch)
+        try:
+            results = run_suite(args.scales, args.repeat, args.only)
+        finally:
+            store.DATA_DIR = data_dir
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(payload)
+    else:
+        print(payload)
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(payload)
+        print(f"Baseline saved to {args.save_baseline}", file=sys.stderr)
+
+    if args.baseline:
+        rows = compare(results, json.loads(args.baseline.read_text()), tolerance=args.tolerance)
+        print(f"\n{'case':42} {'scale':>5} {'baseline':>10} {'current':>10} {'ratio':>6}", file=sys.stderr)
+        for case, scale, old, new, ratio, regressed in rows:
+            flag = "  SLOWER" if regressed else ""
+            print(f"{case:42} {scale:>4}x {old * 1000:8.2f}ms {new * 1000:8.2f}ms {ratio:6.2f}{flag}", file=sys.stderr)
+        failures = [row for row in rows if row[-1]]
+        if failures:
+            print(f"{len(failures)} case(s) slower than the baseline by more than {args.tolerance:.0%}",
+                  file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
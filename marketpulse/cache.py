@@ -0,0 +1,261 @@
+"""Process-wide, memory-bounded cache for the pages' loaders.
+
+``cached(dataset, ttl=...)`` replaces ``st.cache_data``/``st.cache_resource``
+on the page functions. Entries from every page and session share one LRU
+that is kept under ``MARKETPULSE_CACHE_MB`` (default 512) of measured size:
+frames by their buffers (``memory_usage(deep=True)``), arrays by ``nbytes``
+and other objects by walking their attributes. The least recently used
+entries are evicted first, and each dataset can have its own TTL and entry
+limit.
+
+Nothing is pickled: a cached frame is returned as a shallow copy, which
+shares its buffers with the cached one, and arrays as read-only views.
+Copy-on-write (always on since pandas 3.0, which requirements.txt pins)
+copies the buffers only if a page writes to its frame. Other objects,
+such as the correlation and indicator engines, are shared as they are. An
+object that keeps growing once cached (the indicator engine) offers
+``track_size(callback)``; the cache passes it a callback that charges the
+growth to its entry with ``Cache.resize``, evicting as needed.
+
+Hits, misses, expiries and evictions are counted in ``marketpulse.metrics``
+under the dataset name.
+"""
+import functools
+import inspect
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+
+MAX_BYTES = int(float(os.environ.get("MARKETPULSE_CACHE_MB", 512)) * 2**20)
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _seconds(ttl):
+    # Seconds from a number or a Streamlit-style duration ("30m", "6h", "1d")
+    if ttl is None or isinstance(ttl, (int, float)):
+        return ttl
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd])\s*", ttl)
+    if not match:
+        raise ValueError(f"Unrecognized ttl: {ttl!r}")
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+def sizeof(value, _seen=None):
+    """Approximate bytes held by ``value``, counting shared objects once."""
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(index=True, deep=True)
+        return int(usage.sum()) if isinstance(value, pd.DataFrame) else int(usage)
+    if isinstance(value, pd.Index):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        # A view is charged to the array it views, once
+        return sizeof(value.base, seen) if isinstance(value.base, np.ndarray) else int(value.nbytes)
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k, seen) + sizeof(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(v, seen) for v in value)
+    attrs = getattr(value, "__dict__", None)
+    return sys.getsizeof(value) + (sizeof(attrs, seen) if attrs else 0)
+
+
+def _shared(value):
+    # What a caller gets back: no pickling, and no way to alter the cached entry in place
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=False)
+    if isinstance(value, np.ndarray):
+        view = value.view()
+        view.flags.writeable = False
+        return view
+    if isinstance(value, tuple):
+        return tuple(_shared(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _shared(v) for k, v in value.items()}
+    return value
+
+
+class Cache:
+    """LRU of ``key -> value`` kept under ``max_bytes`` of measured size."""
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (value, size, expires)
+        self._lock = threading.Lock()
+
+    def get(self, key, dataset=None):
+        """``(True, value)`` for a live entry, else ``(False, None)``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, _, expires = entry
+            if expires is not None and time.monotonic() >= expires:
+                self._drop(key)
+                metrics.count(dataset or key[0], "expired")
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def put(self, key, value, ttl=None, max_entries=None, dataset=None):
+        size = sizeof(value)
+        if size > self.max_bytes:
+            # Would evict everything else and still not fit; hand it back uncached
+            metrics.count(dataset or key[0], "too_large")
+            return
+        expires = None if ttl is None else time.monotonic() + ttl
+        evicted = {}
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, expires)
+            self.bytes += size
+            if max_entries is not None:
+                same = [k for k in self._entries if k[0] == key[0]]
+                for old in same[:-max_entries]:
+                    self._drop(old)
+                    evicted[old[0]] = evicted.get(old[0], 0) + 1
+            self._evict(evicted)
+        self._report(evicted)
+        track = getattr(value, "track_size", None)
+        if callable(track):
+            track(lambda delta: self.resize(key, delta, value))
+
+    def resize(self, key, delta, value=None):
+        """Charge ``delta`` more bytes to a cached entry that grew (or shrank) in place.
+
+        With ``value``, only if that is still the object cached under ``key``.
+        """
+        evicted = {}
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (value is not None and entry[0] is not value):
+                return
+            _, size, expires = entry
+            self._entries[key] = (entry[0], size + delta, expires)
+            self.bytes += delta
+            self._evict(evicted)
+        self._report(evicted)
+
+    def _evict(self, evicted):
+        # Least recently used first, until the total fits; called with the lock held
+        while self.bytes > self.max_bytes and self._entries:
+            old = next(iter(self._entries))
+            self._drop(old)
+            evicted[old[0]] = evicted.get(old[0], 0) + 1
+
+    @staticmethod
+    def _report(evicted):
+        for name, n in evicted.items():
+            metrics.count(name, "eviction", n)
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self, dataset=None):
+        with self._lock:
+            for key in [k for k in self._entries if dataset is None or k[0] == dataset]:
+                self._drop(key)
+
+    def stats(self):
+        """``{dataset: (entries, bytes)}`` plus the total under ``None``."""
+        with self._lock:
+            out = {}
+            for key, (_, size, _) in self._entries.items():
+                entries, total = out.get(key[0], (0, 0))
+                out[key[0]] = (entries + 1, total + size)
+            out[None] = (len(self._entries), self.bytes)
+            return out
+
+
+CACHE = Cache()
+
+# One lock per key being computed, shared by every session's copy of a page
+_computing = {}
+_computing_lock = threading.Lock()
+
+
+def _freeze(value):
+    # Hashable form of an argument (lists and dicts from widgets included)
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, set):
+        return frozenset(value)
+    hash(value)
+    return value
+
+
+def cached(dataset, ttl=None, max_entries=None, cache=None):
+    """Cache the decorated loader's results in the shared LRU under ``dataset``.
+
+    Arguments are part of the key, except those whose name starts with an
+    underscore (as with ``st.cache_data``), which must then be determined by
+    the others. ``ttl`` is seconds or a duration such as ``"6h"``;
+    ``max_entries`` caps how many argument combinations of this dataset are
+    kept. Concurrent misses on the same key compute it once.
+    """
+    ttl = _seconds(ttl)
+
+    def wrap(func):
+        signature = inspect.signature(func)
+
+        def key_for(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = [dataset]
+            for name, value in bound.arguments.items():
+                if name.startswith("_"):
+                    continue
+                try:
+                    key.append((name, _freeze(value)))
+                except TypeError:
+                    raise TypeError(f"{func.__name__}: argument {name!r} ({type(value).__name__}) cannot be "
+                                    f"part of a cache key; prefix its name with an underscore") from None
+            return tuple(key)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            lru = cache or CACHE
+            key = key_for(args, kwargs)
+            found, value = lru.get(key, dataset)
+            if found:
+                metrics.count(dataset, "hit")
+                return _shared(value)
+            with _computing_lock:
+                lock = _computing.setdefault(key, threading.Lock())
+            try:
+                with lock:
+                    # Another session may have filled it while this one waited
+                    found, value = lru.get(key, dataset)
+                    if found:
+                        metrics.count(dataset, "hit")
+                    else:
+                        metrics.count(dataset, "miss")
+                        value = func(*args, **kwargs)
+                        lru.put(key, value, ttl=ttl, max_entries=max_entries, dataset=dataset)
+            finally:
+                with _computing_lock:
+                    _computing.pop(key, None)
+            return _shared(value)
+
+        call.clear = lambda: (cache or CACHE).clear(dataset)
+        return call
+
+    return wrap
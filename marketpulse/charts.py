@@ -0,0 +1,117 @@
+"""Plotly traces sized to what the browser can show.
+
+A chart a thousand or so pixels wide cannot show more points than that, so
+long series are downsampled on the server before they are sent: lines with
+Largest-Triangle-Three-Buckets (LTTB), which keeps the visual shape, or by
+keeping each bucket's minimum and maximum; bars keep each bucket's last
+or largest value. Traces that still carry many points are drawn with WebGL
+(``Scattergl``), and constant reference lines are layout shapes instead of
+a trace with one point per date. Payload size and render time then depend
+on the chart width, not on the length of the history.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+MAX_POINTS = 1500
+MAX_BARS = 400
+WEBGL_THRESHOLD = 1000
+
+
+def lttb_indices(x, y, n):
+    """Positions of the ``n`` points LTTB keeps from ``x``/``y`` (float arrays)."""
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+    every = (size - 2) / (n - 2)
+    edges = (np.arange(n - 1) * every).astype(np.int64) + 1
+    edges[-1] = size - 1
+    keep = np.empty(n, dtype=np.int64)
+    keep[0], keep[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # The next bucket's average is the third corner of the triangle
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else size
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def minmax_indices(y, n):
+    """Positions of each equal bucket's minimum and maximum plus both ends, at most ``n``."""
+    size = len(y)
+    buckets = max((n - 2) // 2, 1)
+    if size <= n:
+        return np.arange(size)
+    bucket = (np.arange(size) * buckets) // size
+    order = np.lexsort((y, bucket))
+    edges = np.searchsorted(bucket, np.arange(buckets + 1))
+    keep = np.concatenate([[0, size - 1], order[edges[:-1]], order[edges[1:] - 1]])
+    return np.unique(keep)
+
+
+def last_indices(size, n):
+    """Position of the last point in each of ``n`` equal buckets."""
+    if size <= n:
+        return np.arange(size)
+    return np.unique(((np.arange(1, n + 1) * size) // n) - 1)
+
+
+def downsample(series, max_points=MAX_POINTS, method="lttb"):
+    """``series`` (indexed by x) reduced to at most ``max_points`` points.
+
+    ``method`` is ``"lttb"`` or ``"minmax"`` for lines, and ``"last"`` or
+    ``"max"`` for bars: each bucket is shown at its last x with its last
+    value (levels such as open positions) or its largest (flows such as
+    volume). Missing values are dropped first.
+    """
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    if method in ("last", "max"):
+        ends = last_indices(len(series), max_points)
+        if method == "last":
+            return series.iloc[ends]
+        starts = np.concatenate([[0], ends[:-1] + 1])
+        return pd.Series(np.maximum.reduceat(series.to_numpy(dtype=float), starts),
+                         index=series.index[ends], name=series.name)
+    y = series.to_numpy(dtype=float)
+    if method == "minmax":
+        return series.iloc[minmax_indices(y, max_points)]
+    index = series.index
+    x = index.asi8.astype(float) if isinstance(index, pd.DatetimeIndex) else np.asarray(index, dtype=float)
+    return series.iloc[lttb_indices(x, y, max_points)]
+
+
+def line(series, max_points=MAX_POINTS, method="lttb", webgl=True, **kwargs):
+    """A line trace of ``series``, downsampled and switched to WebGL when long.
+
+    Pass ``webgl=False`` for figures with a range slider: Plotly does not
+    draw WebGL traces in the slider, which then shows up blank.
+    """
+    points = downsample(series, max_points, method)
+    trace = go.Scattergl if webgl and len(points) > WEBGL_THRESHOLD else go.Scatter
+    kwargs.setdefault("mode", "lines")
+    kwargs.setdefault("name", series.name)
+    return trace(x=points.index, y=points.to_numpy(), **kwargs)
+
+
+def bar(series, max_bars=MAX_BARS, method="last", **kwargs):
+    """A bar trace of ``series`` with at most ``max_bars`` bars (see ``downsample``)."""
+    points = downsample(series, max_bars, method)
+    kwargs.setdefault("name", series.name)
+    return go.Bar(x=points.index, y=points.to_numpy(), **kwargs)
+
+
+def reference_line(fig, y, yref="y", color="gray", dash="dot", width=1):
+    """A horizontal line at ``y`` across the plot, drawn as a layout shape."""
+    if yref == "y":
+        fig.add_hline(y=y, line_color=color, line_dash=dash, line_width=width)
+    else:
+        # add_hline only targets primary axes; secondary ones need the shape directly
+        fig.add_shape(type="line", xref="paper", x0=0, x1=1, yref=yref, y0=y, y1=y,
+                      line=dict(color=color, dash=dash, width=width))
+    return fig
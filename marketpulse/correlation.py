@@ -0,0 +1,196 @@
+"""Correlation of daily returns for the heatmap pages."""
+import numpy as np
+import pandas as pd
+
+# Widest selection worth prefix sums: ten years of 40 assets is ~32 MB
+ENGINE_MAX_COLUMNS = 40
+
+
+class RollingCorrelationEngine:
+    """Correlation matrix of returns for any date window in O(k²).
+
+    Returns are computed once from ``prices`` (rows with a missing return
+    are dropped, as the heatmap does). Cumulative sums, sums of squares,
+    cross-products and counts are stored, so the matrix for any window, or
+    a rolling/expanding series for a pair, is a difference of two prefix
+    sums and its cost does not depend on the window length.
+
+    Memory is O(n·k²) (n·k²·8 bytes of cross-products), which suits the
+    tens of assets the heatmap shows; wider selections should go through
+    ``pairwise_corr`` instead, see ``ENGINE_MAX_COLUMNS``.
+    """
+
+    def __init__(self, prices):
+        returns = prices.pct_change(fill_method=None)
+        # Date of the price row each return starts from, so a window that
+        # begins on ``start`` only uses returns between prices inside it
+        previous = pd.Series(prices.index, index=prices.index).shift(1)
+        keep = returns.notna().all(axis=1) & previous.notna()
+        returns, previous = returns[keep], previous[keep]
+
+        self.columns = list(prices.columns)
+        self.index = returns.index
+        self._starts = previous.to_numpy(dtype="datetime64[ns]")
+        self._ends = returns.index.to_numpy(dtype="datetime64[ns]")
+
+        x = returns.to_numpy(dtype=float)
+        if len(x):
+            # Correlation is shift-invariant; centring keeps the sums precise
+            x = x - x.mean(axis=0)
+        k = x.shape[1]
+        self._sx = np.vstack([np.zeros((1, k)), np.cumsum(x, axis=0)])
+        self._sxy = np.concatenate([np.zeros((1, k, k)), np.cumsum(x[:, :, None] * x[:, None, :], axis=0)])
+
+    def __len__(self):
+        return len(self.index)
+
+    def _bounds(self, start, end):
+        lo = 0 if start is None else int(np.searchsorted(self._starts, np.datetime64(pd.Timestamp(start)), "left"))
+        hi = len(self) if end is None else int(np.searchsorted(self._ends, np.datetime64(pd.Timestamp(end)), "right"))
+        return lo, max(hi, lo)
+
+    def count(self, start=None, end=None):
+        lo, hi = self._bounds(start, end)
+        return hi - lo
+
+    def corr(self, start=None, end=None):
+        """Correlation matrix of returns between prices dated ``start``..``end``."""
+        lo, hi = self._bounds(start, end)
+        n = hi - lo
+        if n < 2:
+            return pd.DataFrame(np.nan, index=self.columns, columns=self.columns)
+        sx = self._sx[hi] - self._sx[lo]
+        cov = (self._sxy[hi] - self._sxy[lo]) - np.outer(sx, sx) / n
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(std, std)
+        np.fill_diagonal(corr, 1.0)
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.columns, columns=self.columns)
+
+    def _pair(self, a, b, lo, hi):
+        i, j = self.columns.index(a), self.columns.index(b)
+        n = (hi - lo).astype(float)
+        sa = self._sx[hi, i] - self._sx[lo, i]
+        sb = self._sx[hi, j] - self._sx[lo, j]
+        cov = (self._sxy[hi, i, j] - self._sxy[lo, i, j]) - sa * sb / n
+        va = (self._sxy[hi, i, i] - self._sxy[lo, i, i]) - sa * sa / n
+        vb = (self._sxy[hi, j, j] - self._sxy[lo, j, j]) - sb * sb / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = cov / np.sqrt(va * vb)
+        out[n < 2] = np.nan
+        return np.clip(out, -1, 1)
+
+    def rolling_pair(self, a, b, window):
+        """Correlation of ``a`` and ``b`` over the trailing ``window`` returns."""
+        hi = np.arange(1, len(self) + 1)
+        lo = np.maximum(hi - window, 0)
+        out = self._pair(a, b, lo, hi)
+        out[hi < window] = np.nan
+        return pd.Series(out, index=self.index, name=f"{a} / {b}")
+
+    def expanding_pair(self, a, b, start=None):
+        """Correlation of ``a`` and ``b`` from ``start`` up to each date."""
+        lo0, _ = self._bounds(start, None)
+        hi = np.arange(lo0 + 1, len(self) + 1)
+        out = self._pair(a, b, np.full(len(hi), lo0), hi)
+        return pd.Series(out, index=self.index[lo0:], name=f"{a} / {b}")
+
+
+def pairwise_corr(returns, min_periods=1, block_size=256, dtype=np.float64):
+    """Pairwise-complete correlation of a returns frame with gaps.
+
+    Each pair uses every row where both series have a value, as
+    ``DataFrame.corr`` does, but computed with masked matrix products
+    instead of a loop over pairs. Returns ``(corr, counts)`` where
+    ``counts`` is each pair's overlap; pairs with fewer than
+    ``min_periods`` overlapping observations are NaN.
+
+    The products are formed one column block at a time, so the working set
+    is three n×k panels in ``dtype`` plus the k×k results.
+    """
+    x = returns.to_numpy(dtype=np.float64)
+    n, k = x.shape
+    valid = ~np.isnan(x)
+    counts_1d = valid.sum(axis=0)
+    # Correlation is shift-invariant; centring keeps the products precise
+    mean = np.divide(np.where(valid, x, 0.0).sum(axis=0), counts_1d,
+                     out=np.zeros(k), where=counts_1d > 0)
+    x0 = np.where(valid, x - mean, 0.0).astype(dtype)
+    del x
+    m = valid.astype(dtype)
+    x2 = x0 * x0
+
+    corr = np.empty((k, k), dtype=dtype)
+    counts = np.empty((k, k), dtype=np.int64)
+    for i in range(0, k, block_size):
+        si = slice(i, i + block_size)
+        for j in range(i, k, block_size):
+            sj = slice(j, j + block_size)
+            nn = m[:, si].T @ m[:, sj]
+            sx_i = x0[:, si].T @ m[:, sj]
+            sx_j = m[:, si].T @ x0[:, sj]
+            var_i = x2[:, si].T @ m[:, sj]
+            var_j = m[:, si].T @ x2[:, sj]
+            cov = x0[:, si].T @ x0[:, sj]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cov -= sx_i * sx_j / nn
+                var_i -= sx_i * sx_i / nn
+                var_j -= sx_j * sx_j / nn
+                block = cov / np.sqrt(var_i * var_j)
+            nn = np.rint(nn).astype(np.int64)
+            block[(nn < max(min_periods, 2)) | ~(var_i > 0) | ~(var_j > 0)] = np.nan
+            corr[si, sj], corr[sj, si] = block, block.T
+            counts[si, sj], counts[sj, si] = nn, nn.T
+
+    diag = np.diag(corr).copy()
+    np.fill_diagonal(corr, np.where(np.isnan(diag), np.nan, 1.0))
+    np.clip(corr, -1, 1, out=corr)
+    columns = returns.columns
+    return (pd.DataFrame(corr, index=columns, columns=columns),
+            pd.DataFrame(counts, index=columns, columns=columns))
+
+
+def blockwise_corr(returns, block_size=256, dtype=np.float32, min_periods=1):
+    """Pairwise-complete correlation for wide panels, in float32 by default."""
+    return pairwise_corr(returns, min_periods=min_periods, block_size=block_size, dtype=dtype)[0]
+
+
+def cluster_order(corr, method="average"):
+    """Column order that groups correlated assets (hierarchical clustering)."""
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    if len(corr) < 3:
+        return list(corr.columns)
+    c = np.nan_to_num(corr.to_numpy(dtype=np.float64), nan=0.0)
+    dist = np.sqrt(np.clip(0.5 * (1.0 - c), 0.0, 1.0))
+    np.fill_diagonal(dist, 0.0)
+    order = leaves_list(linkage(squareform(dist, checks=False), method=method))
+    return [corr.columns[i] for i in order]
+
+
+def top_pairs(corr, k=10):
+    """The ``k`` most and least correlated distinct pairs, without a full sort."""
+    values = corr.to_numpy()
+    rows, cols = np.triu_indices(len(values), k=1)
+    flat = values[rows, cols]
+    ok = ~np.isnan(flat)
+    rows, cols, flat = rows[ok], cols[ok], flat[ok]
+    k = min(k, len(flat))
+    if k == 0:
+        empty = pd.DataFrame(columns=["Asset A", "Asset B", "Correlation"])
+        return empty, empty
+
+    def pick(idx, descending):
+        idx = idx[np.argsort(flat[idx])]
+        if descending:
+            idx = idx[::-1]
+        return pd.DataFrame({
+            "Asset A": corr.index[rows[idx]],
+            "Asset B": corr.columns[cols[idx]],
+            "Correlation": flat[idx],
+        })
+
+    most = pick(np.argpartition(flat, len(flat) - k)[len(flat) - k:], True)
+    least = pick(np.argpartition(flat, k - 1)[:k], False)
+    return most, least
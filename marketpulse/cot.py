@@ -0,0 +1,325 @@
+"""Weekly COT positioning history backed by the columnar store."""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from . import providers, store
+
+COT_PICKLE = store.ROOT / "cot_data.pkl"
+HISTORY = "cot_history"
+LATEST = "cot_latest"
+ANALYTICS = "cot_analytics"
+# Lookbacks (weeks) of the COT Index and z-score columns
+ANALYTICS_WINDOWS = (26, 52, 156)
+# Share of a window's weeks that must have a report (some assets skip weeks)
+ANALYTICS_MIN_REPORTED = 0.9
+REPORT_TYPE = "legacy_fut"
+FIRST_YEAR = 2006
+
+# Asset mappings, shared by every COT page. SPX follows the history page's
+# "S&P 500 Index"; the snapshot page used to read "S&P 500 ANNUAL DIVIDEND INDEX"
+ASSETS = {
+    "ZAR": "So African Rand", "GBP": "EURO FX/BRITISH POUND XRATE", "COPPER": "Copper",
+    "JPY": "Japanese Yen", "US10T": "ULTRA UST 10Y", "USOil": "Crude Oil",
+    "EUR": "Euro", "USD": "USD INDEX", "CAD": "Canadian Dollar", "SILVER": "Silver",
+    "CHF": "Swiss Franc", "BTC": "Bitcoin", "Gold": "Gold", "AUD": "Australian Dollar",
+    "RUSSELL": "RUSSELL 2000 ANNUAL DIVIDEND", "NZD": "NZ DOLLAR", "NIKKEI": "NIKKEI STOCK AVERAGE YEN DENOM",
+    "PLATINUM": "Platinum", "NASDAQ": "NASDAQ-100 Consolidated", "SPX": "S&P 500 Index",
+    "DOW": "DOW JONES U.S. REAL ESTATE IDX"
+}
+
+DISPLAY_NAMES = {
+    "ZAR": "South African Rand", "GBP": "British Pound Sterling", "COPPER": "Copper Metal",
+    "JPY": "Japanese Yen", "US10T": "US 10-Year Treasury", "USOil": "Crude Oil (WTI)",
+    "EUR": "Euro Currency", "USD": "US Dollar Index", "CAD": "Canadian Dollar (CAD)",
+    "SILVER": "Silver Commodity", "CHF": "Swiss Franc (CHF)", "BTC": "Bitcoin (BTC)",
+    "Gold": "GOLD", "AUD": "Australian Dollar (AUD)", "RUSSELL": "Russell 2000 Index",
+    "NZD": "New Zealand Dollar", "NIKKEI": "Nikkei 225 Stock Index",
+    "PLATINUM": "Platinum Metal", "NASDAQ": "NASDAQ-100 Index", "SPX": "S&P 500 ANNUAL DIVIDEND INDEX",
+    "DOW": "Dow Jones Industrial Average"
+}
+
+
+class AssetClassifier:
+    """Maps CFTC market names to asset codes.
+
+    ``assets`` maps each code to a case-insensitive substring of the market
+    name; when several match, the first one in ``assets`` wins. Every unique
+    name is resolved once by a single compiled pattern, and names that match
+    nothing or more than one asset are collected in ``unmatched`` and
+    ``ambiguous``; ``report`` prints them for review.
+    """
+
+    def __init__(self, assets):
+        self.codes = list(assets)
+        # One optional lookahead per pattern, so a single match at the start of
+        # the name captures every pattern that occurs anywhere in it
+        self._matcher = re.compile(
+            "".join(f"(?:(?=.*?({re.escape(v)})))?" for v in assets.values()),
+            re.IGNORECASE | re.DOTALL,
+        )
+        self.unmatched = set()
+        self.ambiguous = {}
+
+    def matches(self, name):
+        groups = self._matcher.match(name).groups()
+        return [i for i, g in enumerate(groups) if g is not None]
+
+    def classify(self, names):
+        """Return a Categorical of asset codes aligned with ``names`` (NaN when unmatched)."""
+        name_codes, uniques = pd.factorize(pd.Series(names, dtype=object))
+        resolved = np.full(len(uniques) + 1, -1, dtype=np.int64)
+        for i, name in enumerate(uniques):
+            hits = self.matches(name)
+            if not hits:
+                self.unmatched.add(name)
+                continue
+            if len(hits) > 1:
+                self.ambiguous[name] = [self.codes[j] for j in hits]
+            resolved[i] = hits[0]
+        # factorize marks missing names with -1, which lands on the trailing -1
+        return pd.Categorical.from_codes(resolved[name_codes], categories=self.codes)
+
+    def report(self):
+        """Print the names that matched several assets and how many matched none."""
+        for name, codes in sorted(self.ambiguous.items()):
+            print(f"Ambiguous COT market {name!r}: matches {codes}, using {codes[0]}")
+        if self.unmatched:
+            sample = ", ".join(sorted(self.unmatched)[:3])
+            print(f"{len(self.unmatched)} COT markets matched no asset (e.g. {sample})")
+
+
+def fetch_cot_year(year):
+    """Fetch one year of the legacy futures-only report from the active provider."""
+    return providers.get_provider().cot_report(year, report_type=REPORT_TYPE)
+
+
+def local_source(directory):
+    """Return a fetcher reading CFTC text files from ``directory`` instead of the network.
+
+    Each year is read from the first ``*.txt`` file whose name contains the
+    year, e.g. ``annual_2024.txt`` or ``deacot2024.txt``.
+    """
+    return lambda year: providers.read_cot_file(directory, year)
+
+
+def process_reports(raw, assets):
+    """Turn raw CFTC rows into weekly Long/Short totals per asset.
+
+    ``assets`` is either a code-to-pattern dict or an ``AssetClassifier``.
+    """
+    classifier = assets if isinstance(assets, AssetClassifier) else AssetClassifier(assets)
+    df = raw.rename(columns={
+        "Market and Exchange Names": "Asset",
+        "Noncommercial Positions-Long (All)": "Long",
+        "Noncommercial Positions-Short (All)": "Short"
+    })
+    df["Date"] = pd.to_datetime(df["As of Date in Form YYYY-MM-DD"])
+    df = df[["Date", "Asset", "Long", "Short"]].dropna()
+    df["Asset"] = classifier.classify(df["Asset"])
+    df = df.dropna()
+    df = df.groupby(["Asset", pd.Grouper(key="Date", freq="W")], observed=True).sum().reset_index()
+    df["Asset"] = df["Asset"].astype(str)
+    df["Long %"] = (df["Long"] / (df["Long"] + df["Short"])) * 100
+    return df
+
+
+def has_history():
+    if store.import_pickle(HISTORY, COT_PICKLE, lambda df: df, sort_by="Date"):
+        _save_derived(load_history())
+    return store.exists(HISTORY)
+
+
+def save_history(df, last_report_date=None):
+    if last_report_date is None:
+        last_report_date = df["Date"].max()
+    store.write_frame(HISTORY, df, sort_by="Date",
+                      metadata={"last_report_date": pd.Timestamp(last_report_date).isoformat()})
+    _save_derived(df)
+
+
+def _save_derived(history):
+    _save_latest(history)
+    _save_analytics(history)
+
+
+def _save_latest(history):
+    # Rebuilt whenever the history changes so readers never sort or dedupe
+    latest = history.sort_values("Date", kind="stable").drop_duplicates(subset=["Asset"], keep="last")
+    latest = latest[["Date", "Asset", "Long", "Short", "Long %"]].copy()
+    latest["Short %"] = 100 - latest["Long %"]
+    store.write_frame(LATEST, latest.sort_values("Long %", ignore_index=True))
+
+
+def load_latest():
+    """Latest weekly report per asset, sorted by ``Long %``."""
+    if not has_history():
+        return None
+    if not store.exists(LATEST):
+        _save_latest(load_history())
+    return store.read_frame(LATEST)
+
+
+def compute_analytics(history, windows=ANALYTICS_WINDOWS):
+    """Net positioning analytics for every asset, one row per (Asset, Date).
+
+    ``Net`` is Long minus Short and ``Net Change`` its week-over-week change.
+    For each window of ``windows`` weeks, ``COT Index <w>w`` places the net
+    position between its trailing minimum (0) and maximum (100), and
+    ``Z-Score <w>w`` is its distance from the trailing mean in standard
+    deviations.
+
+    Windows count calendar weeks, not reports: each asset is laid out on a
+    complete weekly calendar first, so a skipped week is a gap rather than
+    pulling in an older report. ``Net Change`` is NaN after a skipped week,
+    and a window needs ``ANALYTICS_MIN_REPORTED`` of its weeks reported.
+    """
+    df = history[["Asset", "Date", "Long", "Short", "Long %"]].sort_values(["Asset", "Date"], kind="stable")
+    df = df.set_index(["Asset", "Date"])
+    df["Net"] = (df["Long"] - df["Short"]).astype(float)
+    net = df["Net"].reindex(_weekly_calendar(df.index))
+    grouped = net.groupby(level="Asset")
+    df["Net Change"] = grouped.diff().reindex(df.index)
+    for w in windows:
+        rolling = grouped.rolling(w, min_periods=int(np.ceil(w * ANALYTICS_MIN_REPORTED)))
+        # groupby().rolling() prepends the group level; drop it to line up with net
+        low, high = (r.droplevel(0) for r in (rolling.min(), rolling.max()))
+        mean, std = (r.droplevel(0) for r in (rolling.mean(), rolling.std()))
+        span = (high - low).where(high > low)
+        df[f"COT Index {w}w"] = (100 * (net - low) / span).reindex(df.index)
+        df[f"Z-Score {w}w"] = ((net - mean) / std.where(std > 0)).reindex(df.index)
+    return df
+
+
+def _weekly_calendar(index):
+    # Every week from each asset's first report to its last, plus any report
+    # dated off that weekly grid, as an (Asset, Date) index
+    frames = []
+    for asset, dates in index.to_frame(index=False).groupby("Asset", sort=False)["Date"]:
+        weeks = pd.date_range(dates.iloc[0], dates.iloc[-1], freq="7D").union(pd.DatetimeIndex(dates))
+        frames.append(pd.DataFrame({"Asset": asset, "Date": weeks}))
+    if not frames:
+        return index
+    return pd.MultiIndex.from_frame(pd.concat(frames, ignore_index=True))
+
+
+def _save_analytics(history):
+    store.write_frame(ANALYTICS, compute_analytics(history).reset_index(), sort_by="Date", group_by="Asset")
+
+
+def load_analytics(asset=None, start=None, end=None, columns=None):
+    """The analytics table indexed by (Asset, Date), or one asset's rows of it.
+
+    Reading one asset only touches that asset's rows (the table is grouped
+    by asset and sorted by date), and ``start``/``end`` are binary-searched
+    within them.
+    """
+    if not has_history():
+        return None
+    if not store.exists(ANALYTICS):
+        _save_analytics(load_history())
+    if columns is not None:
+        columns = ["Asset", "Date", *[c for c in columns if c not in ("Asset", "Date")]]
+    df = store.read_frame(ANALYTICS, columns=columns, start=start, end=end, group=asset)
+    return df.set_index(["Asset", "Date"])
+
+
+def extremes(analytics, metric="Z-Score 156w"):
+    """Each asset's latest row, most extreme ``metric`` first.
+
+    Z-scores rank by distance from 0 and COT Index values by distance from
+    50, so stretched long and short positioning both come first.
+    """
+    latest = analytics.groupby(level="Asset").tail(1).dropna(subset=[metric])
+    center = 50 if metric.startswith("COT Index") else 0
+    order = (latest[metric] - center).abs().sort_values(ascending=False, kind="stable").index
+    return latest.loc[order].reset_index()
+
+
+def last_report_date():
+    """Date of the newest raw report already in the history, or None."""
+    if not has_history():
+        return None
+    recorded = store.read_metadata(HISTORY).get("last_report_date")
+    if recorded:
+        return pd.Timestamp(recorded)
+    # Histories imported from the pickle only carry the weekly labels. Each
+    # label is the Sunday closing the week, so every report up to it is in.
+    return load_history(columns=["Date"])["Date"].max()
+
+
+def load_history(columns=None, start=None, end=None):
+    """Load the weekly history, optionally limited to ``columns`` and a date range."""
+    has_history()
+    return store.read_frame(HISTORY, columns=columns, start=start, end=end)
+
+
+def positioning_zscore(weeks=156, start=None, min_weeks=52):
+    """Weekly z-score of each asset's ``Long %`` against its trailing ``weeks`` (Date x Asset)."""
+    if not has_history():
+        return pd.DataFrame()
+    history = load_history(columns=["Date", "Asset", "Long %"], start=start)
+    long_pct = history.pivot_table(index="Date", columns="Asset", values="Long %")
+    rolling = long_pct.rolling(weeks, min_periods=min_weeks)
+    return (long_pct - rolling.mean()) / rolling.std()
+
+
+def _fetch_years(fetch, years, max_workers):
+    def attempt(year):
+        try:
+            return fetch(year)
+        except Exception as e:
+            print(f"Failed for {year}: {e}")
+            return None
+
+    if max_workers > 1 and len(years) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            frames = list(pool.map(attempt, years))
+    else:
+        frames = [attempt(year) for year in years]
+    frames = [df for df in frames if df is not None]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def update_history(assets=None, fetch=None, today=None, max_workers=8):
+    """Bring the stored history up to date and return the number of new rows.
+
+    With no stored history every year since 2006 is fetched concurrently.
+    Otherwise only the years from the last ingested report onwards are
+    fetched (normally just the current one) and only newer reports are
+    processed and appended. Market names that matched no asset, or several,
+    are printed.
+    """
+    assets = assets or ASSETS
+    classifier = assets if isinstance(assets, AssetClassifier) else AssetClassifier(assets)
+    fetch = fetch or fetch_cot_year
+    this_year = (today or datetime.now()).year
+    last = last_report_date()
+
+    if last is None:
+        raw = _fetch_years(fetch, list(range(FIRST_YEAR, this_year + 1)), max_workers)
+        if raw is None:
+            return 0
+        new = process_reports(raw, classifier)
+        classifier.report()
+        save_history(new, pd.to_datetime(raw["As of Date in Form YYYY-MM-DD"]).max())
+        return len(new)
+
+    raw = _fetch_years(fetch, list(range(last.year, this_year + 1)), max_workers=1)
+    if raw is None:
+        return 0
+    report_dates = pd.to_datetime(raw["As of Date in Form YYYY-MM-DD"])
+    raw = raw[report_dates > last]
+    if raw.empty:
+        return 0
+    new = process_reports(raw, classifier)
+    classifier.report()
+    history = load_history()
+    # Another process may have appended the same reports since ``last`` was read
+    merged = pd.concat([history, new[history.columns]], ignore_index=True)
+    merged = merged.drop_duplicates(subset=["Asset", "Date"], keep="last", ignore_index=True)
+    save_history(merged, report_dates.max())
+    return len(new)
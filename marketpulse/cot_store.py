@@ -0,0 +1,247 @@
+"""COT positions for every CFTC report type, partitioned by report and year.
+
+The legacy, disaggregated and Traders in Financial Futures (TFF) reports,
+futures-only (``_fut``) and futures-and-options combined (``_futopt``), are
+normalized to one long layout: a row per (Asset, Date, Category) with the
+trader category's Long, Short and Spreading positions, its Net position and
+the market's Open Interest. Markets are mapped to the assets of
+``cot.ASSETS``, summing contracts that map to the same asset.
+
+Each (report type, year) is its own dataset, ``cot/<report_type>/<year>``,
+grouped by asset and sorted by date. ``query`` opens only the years that
+overlap the requested range, jumps to each requested asset's rows through
+the recorded group offsets and binary-searches the dates inside them, so
+the cost of a query depends on what it returns, not on how many report
+types or years are stored.
+
+``python -m marketpulse.cot_store --report disaggregated_fut`` ingests a
+report type; afterwards the weekly scheduler job keeps every stored type
+current.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from . import cot, providers, store
+
+FIRST_YEAR = cot.FIRST_YEAR
+VARIANTS = ("fut", "futopt")
+
+_LEGACY = {
+    "date": "As of Date in Form YYYY-MM-DD",
+    "market": "Market and Exchange Names",
+    "open_interest": "Open Interest (All)",
+    "categories": {
+        "Noncommercial": ("Noncommercial Positions-Long (All)", "Noncommercial Positions-Short (All)",
+                          "Noncommercial Positions-Spreading (All)"),
+        "Commercial": ("Commercial Positions-Long (All)", "Commercial Positions-Short (All)", None),
+        "Nonreportable": ("Nonreportable Positions-Long (All)", "Nonreportable Positions-Short (All)", None),
+    },
+}
+_DISAGGREGATED = {
+    "date": "Report_Date_as_YYYY-MM-DD",
+    "market": "Market_and_Exchange_Names",
+    "open_interest": "Open_Interest_All",
+    "categories": {
+        "Producer/Merchant": ("Prod_Merc_Positions_Long_All", "Prod_Merc_Positions_Short_All", None),
+        "Swap Dealer": ("Swap_Positions_Long_All", "Swap_Positions_Short_All", "Swap_Positions_Spread_All"),
+        "Managed Money": ("M_Money_Positions_Long_All", "M_Money_Positions_Short_All", "M_Money_Positions_Spread_All"),
+        "Other Reportable": ("Other_Rept_Positions_Long_All", "Other_Rept_Positions_Short_All",
+                             "Other_Rept_Positions_Spread_All"),
+        "Nonreportable": ("NonRept_Positions_Long_All", "NonRept_Positions_Short_All", None),
+    },
+}
+_TFF = {
+    "date": "Report_Date_as_YYYY-MM-DD",
+    "market": "Market_and_Exchange_Names",
+    "open_interest": "Open_Interest_All",
+    "categories": {
+        "Dealer": ("Dealer_Positions_Long_All", "Dealer_Positions_Short_All", "Dealer_Positions_Spread_All"),
+        "Asset Manager": ("Asset_Mgr_Positions_Long_All", "Asset_Mgr_Positions_Short_All",
+                          "Asset_Mgr_Positions_Spread_All"),
+        "Leveraged Funds": ("Lev_Money_Positions_Long_All", "Lev_Money_Positions_Short_All",
+                            "Lev_Money_Positions_Spread_All"),
+        "Other Reportable": ("Other_Rept_Positions_Long_All", "Other_Rept_Positions_Short_All",
+                             "Other_Rept_Positions_Spread_All"),
+        "Nonreportable": ("NonRept_Positions_Long_All", "NonRept_Positions_Short_All", None),
+    },
+}
+# Report type names as the CFTC (and the cot_reports package) call them
+REPORTS = {
+    **{f"legacy_{v}": _LEGACY for v in VARIANTS},
+    **{f"disaggregated_{v}": _DISAGGREGATED for v in VARIANTS},
+    **{f"traders_in_financial_futures_{v}": _TFF for v in VARIANTS},
+}
+COLUMNS = ["Asset", "Date", "Category", "Long", "Short", "Spreading", "Net", "Open Interest"]
+
+
+def _dataset(report_type, year):
+    return f"cot/{report_type}/{year}"
+
+
+def _spec(report_type):
+    if report_type not in REPORTS:
+        raise ValueError(f"Unknown COT report type {report_type!r}; expected one of {list(REPORTS)}")
+    return REPORTS[report_type]
+
+
+def categories(report_type):
+    return list(_spec(report_type)["categories"])
+
+
+def normalize(raw, report_type, assets=None):
+    """Raw CFTC rows of ``report_type`` as the long (Asset, Date, Category) layout.
+
+    Raises KeyError if the report lacks the date, market, open interest or
+    any category's long, short or spreading column; only categories that
+    have no spreading position get zeros there.
+    """
+    spec = _spec(report_type)
+    # Some CFTC files spell e.g. ``Swap__Positions_Short_All`` with a double underscore
+    raw = raw.set_axis(raw.columns.astype(str).str.strip().str.replace(r"_{2,}", "_", regex=True), axis=1)
+    required = [spec["date"], spec["market"], spec["open_interest"],
+                *[name for names in spec["categories"].values() for name in names if name is not None]]
+    missing = [name for name in required if name not in raw.columns]
+    if missing:
+        raise KeyError(f"{report_type} report is missing columns {missing}")
+    classifier = assets if isinstance(assets, cot.AssetClassifier) else cot.AssetClassifier(assets or cot.ASSETS)
+    asset = classifier.classify(raw[spec["market"]])
+    keep = ~pd.isna(np.asarray(asset))
+    raw, asset = raw[keep], asset[keep]
+    dates = pd.to_datetime(raw[spec["date"]])
+
+    def column(name):
+        # Only categories without a spreading position have no column (None)
+        if name is None:
+            return np.zeros(len(raw))
+        return pd.to_numeric(raw[name], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+    open_interest = column(spec["open_interest"])
+    frames = []
+    for category, (long_col, short_col, spread_col) in spec["categories"].items():
+        frames.append(pd.DataFrame({
+            "Asset": np.asarray(asset).astype(str), "Date": dates.to_numpy(), "Category": category,
+            "Long": column(long_col), "Short": column(short_col), "Spreading": column(spread_col),
+            "Open Interest": open_interest,
+        }))
+    df = pd.concat(frames, ignore_index=True)
+    df = df.groupby(["Asset", "Date", "Category"], sort=False).sum().reset_index()
+    df["Net"] = df["Long"] - df["Short"]
+    return df[COLUMNS]
+
+
+def save_year(df, report_type, year):
+    store.write_frame(_dataset(report_type, year), df, sort_by="Date", group_by="Asset", metadata={
+        "report_type": report_type, "year": int(year),
+        "last_report_date": df["Date"].max().isoformat() if len(df) else None,
+    })
+
+
+def stored_years(report_type):
+    folder = store.path_for(_dataset(report_type, 0)).parent
+    if not folder.exists():
+        return []
+    return sorted(int(p.stem) for p in folder.glob("*.arrow") if p.stem.isdigit())
+
+
+def stored_reports():
+    """Report types with at least one stored year."""
+    return [r for r in REPORTS if stored_years(r)]
+
+
+def ingest(report_type, years, fetch=None, max_workers=4):
+    """Fetch, normalize and store ``years`` of ``report_type``; returns rows stored per year.
+
+    Years are fetched concurrently but normalized and written one at a
+    time, so memory holds at most one year's raw report per worker.
+    """
+    _spec(report_type)
+    fetch = fetch or (lambda year: providers.get_provider().cot_report(year, report_type=report_type))
+    classifier = cot.AssetClassifier(cot.ASSETS)
+
+    def attempt(year):
+        try:
+            df = normalize(fetch(year), report_type, classifier)
+        except Exception as e:
+            print(f"Failed for {report_type} {year}: {e}")
+            return year, None
+        save_year(df, report_type, year)
+        return year, len(df)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(years)))) as pool:
+        stored = {year: rows for year, rows in pool.map(attempt, years) if rows is not None}
+    classifier.report()
+    return stored
+
+
+def update(report_type, today=None, fetch=None):
+    """Store every missing year of ``report_type`` and refresh the latest stored one."""
+    this_year = (today or datetime.now()).year
+    stored = stored_years(report_type)
+    years = [y for y in range(FIRST_YEAR, this_year + 1) if y not in stored]
+    if stored:
+        # The newest stored year may have gained reports since
+        years = sorted({*years, stored[-1]})
+    return ingest(report_type, years, fetch=fetch)
+
+
+def last_report_date(report_type):
+    years = stored_years(report_type)
+    if not years:
+        return None
+    recorded = store.read_metadata(_dataset(report_type, years[-1])).get("last_report_date")
+    return pd.Timestamp(recorded) if recorded else None
+
+
+def query(report_type="legacy_fut", assets=None, start=None, end=None, categories=None, columns=None):
+    """Positions of ``assets`` (default: all) between ``start`` and ``end`` (inclusive).
+
+    ``categories`` limits the trader categories (see ``categories()``) and
+    ``columns`` the value columns. Returns a frame indexed by (Asset, Date)
+    with a ``Category`` column, sorted by asset and date.
+    """
+    _spec(report_type)
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    years = [y for y in stored_years(report_type)
+             if (start is None or y >= start.year) and (end is None or y <= end.year)]
+    if isinstance(assets, str):
+        assets = [assets]
+    wanted = None if columns is None else ["Asset", "Date", "Category",
+                                           *[c for c in columns if c not in ("Asset", "Date", "Category")]]
+    frames = [store.read_frame(_dataset(report_type, year), columns=wanted, start=start, end=end, group=assets)
+              for year in years]
+    frames = [df for df in frames if len(df)]
+    if not frames:
+        return pd.DataFrame(columns=wanted or COLUMNS).set_index(["Asset", "Date"])
+    df = pd.concat(frames, ignore_index=True)
+    if categories is not None:
+        df = df[df["Category"].isin(categories)]
+    # Partitions are already date-ordered per asset; this only brings each asset's years together
+    df = df.sort_values(["Asset", "Date"], kind="stable")
+    return df.set_index(["Asset", "Date"])
+
+
+def net_positions(report_type, assets=None, start=None, end=None):
+    """Net position per trader category as columns, indexed by (Asset, Date)."""
+    df = query(report_type, assets, start, end, columns=["Net"])
+    return df.set_index("Category", append=True)["Net"].unstack("Category")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest CFTC COT reports into the partitioned store.")
+    parser.add_argument("--report", action="append", choices=list(REPORTS),
+                        help="report type to ingest or update (repeatable; default: the stored ones)")
+    parser.add_argument("--year", type=int, action="append", help="only these years")
+    args = parser.parse_args(argv)
+
+    for report_type in args.report or stored_reports():
+        stored = ingest(report_type, args.year) if args.year else update(report_type)
+        print(f"{report_type}: stored {sum(stored.values())} rows for {sorted(stored)}")
+
+
+if __name__ == "__main__":
+    main()
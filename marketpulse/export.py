@@ -0,0 +1,203 @@
+"""File exports of stored data, built only when someone downloads them.
+
+Exports are written to ``exports/`` under the data directory as gzipped CSV,
+Parquet or Excel, in chunks of ``CHUNK_ROWS`` rows so that no format ever
+holds the whole text or workbook of a long history in memory. Each file is
+named after its (dataset, range, format) and reused until its source data
+changes; the oldest files beyond ``MAX_FILES`` are removed.
+
+Multi-symbol exports read one symbol at a time and append it to the same
+file, with a ``Symbol`` column, so their memory use does not grow with the
+number of symbols.
+
+``python -m marketpulse.export SYMBOL ...`` writes bar exports from the
+command line.
+"""
+import argparse
+import gzip
+import hashlib
+import importlib.util
+import io
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from . import ohlcv, store
+
+FORMATS = {
+    "csv.gz": "application/gzip",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+CHUNK_ROWS = 50_000
+MAX_FILES = 64
+# One sheet holds 1,048,576 rows including the header
+XLSX_MAX_ROWS = 1_048_575
+
+
+def formats():
+    """Formats that can be written here (Excel needs openpyxl)."""
+    return [fmt for fmt in FORMATS if fmt != "xlsx" or importlib.util.find_spec("openpyxl")]
+
+
+def _export_dir():
+    return store.DATA_DIR / "exports"
+
+
+def _target(label, key, fmt):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {list(FORMATS)}")
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+    slug = "".join(c if c.isalnum() or c in "-." else "_" for c in label)
+    return _export_dir() / f"{slug}-{digest}.{fmt}"
+
+
+def _write_csv_gz(f, frames):
+    with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=6) as gz, io.TextIOWrapper(gz, newline="") as text:
+        for i, frame in enumerate(frames):
+            frame.to_csv(text, header=i == 0)
+
+
+def _write_parquet(f, frames):
+    # Small frames (one symbol each) are batched so row groups stay near CHUNK_ROWS
+    writer, pending, rows = None, [], 0
+
+    def write():
+        writer.write_table(pa.concat_tables(pending))
+        pending.clear()
+
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame, preserve_index=True)
+            if writer is None:
+                writer = pq.ParquetWriter(f, table.schema, compression="zstd")
+            else:
+                # Later symbols may store e.g. Volume as float; keep the first schema
+                table = table.cast(writer.schema)
+            pending.append(table)
+            rows += table.num_rows
+            if rows >= CHUNK_ROWS:
+                write()
+                rows = 0
+        if pending:
+            write()
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_xlsx(f, frames):
+    from openpyxl import Workbook
+    book = Workbook(write_only=True)
+    sheet = book.create_sheet("data")
+    written = 0
+    for i, frame in enumerate(frames):
+        if i == 0:
+            sheet.append([frame.index.name or "", *map(str, frame.columns)])
+        written += len(frame)
+        if written > XLSX_MAX_ROWS:
+            raise ValueError(f"Too many rows for one Excel sheet ({XLSX_MAX_ROWS}); use csv.gz or parquet")
+        for row in frame.itertuples(name=None):
+            sheet.append([None if pd.isna(v) else v for v in row])
+    book.save(f)
+
+
+_WRITERS = {"csv.gz": _write_csv_gz, "parquet": _write_parquet, "xlsx": _write_xlsx}
+
+
+def _prune():
+    # Dot-files are exports still being written
+    files = [p for p in _export_dir().iterdir() if not p.name.startswith(".")]
+    files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in files[MAX_FILES:]:
+        old.unlink(missing_ok=True)
+
+
+def _build(path, fmt, frames, sources=()):
+    """``path``, written as ``fmt`` from the ``frames`` iterable unless it is newer than every source file."""
+    newest = max((p.stat().st_mtime for p in sources if p.exists()), default=0)
+    if path.exists() and path.stat().st_mtime >= newest:
+        path.touch()
+        return path
+    store._atomic_write(path, lambda f: _WRITERS[fmt](f, frames))
+    _prune()
+    return path
+
+
+def export_dataset(dataset, fmt="csv.gz", start=None, end=None, columns=None):
+    """Path of stored ``dataset`` between ``start`` and ``end`` written as ``fmt``."""
+    path = _target(dataset, (dataset, start, end, columns), fmt)
+    frames = store.iter_frames(dataset, columns=columns, start=start, end=end, rows=CHUNK_ROWS)
+    return _build(path, fmt, frames, [store.path_for(dataset)])
+
+
+def export_frame(frame, label, key, fmt="csv.gz"):
+    """Path of an in-memory ``frame`` written as ``fmt``, reused while it is unchanged.
+
+    For frames derived on a page (e.g. with indicator columns); ``key``
+    names them, such as the symbol, range and parameters. A hash of the
+    contents joins the key, since there is no source file whose
+    modification time would show that the data behind it changed.
+    """
+    contents = int(pd.util.hash_pandas_object(frame).to_numpy().sum())
+    path = _target(label, (key, len(frame), contents), fmt)
+    frames = (frame.iloc[i:i + CHUNK_ROWS] for i in range(0, max(len(frame), 1), CHUNK_ROWS))
+    return _build(path, fmt, frames)
+
+
+def _symbol_frames(symbols, interval, start, end, columns):
+    # One symbol read at a time, in chunks
+    for symbol in symbols:
+        name = ohlcv._dataset(symbol, interval)
+        if not store.exists(name):
+            continue
+        for frame in store.iter_frames(name, columns=columns, start=start, end=end, rows=CHUNK_ROWS):
+            frame.insert(0, "Symbol", symbol)
+            yield frame
+
+
+def export_bars(symbols, fmt="csv.gz", start=None, end=None, interval="1d", columns=None):
+    """Path of the stored bars of one symbol or several (with a ``Symbol`` column) written as ``fmt``."""
+    if isinstance(symbols, str):
+        return export_dataset(ohlcv._dataset(symbols, interval), fmt, start, end, columns)
+    symbols = list(symbols)
+    label = f"bars_{interval}_{len(symbols)}_symbols"
+    path = _target(label, (tuple(symbols), interval, start, end, columns), fmt)
+    sources = [store.path_for(ohlcv._dataset(s, interval)) for s in symbols]
+    return _build(path, fmt, _symbol_frames(symbols, interval, start, end, columns), sources)
+
+
+def download(build, *args, **kwargs):
+    """A zero-argument callable for ``st.download_button(data=...)``.
+
+    ``build(*args, **kwargs)`` (e.g. ``export_bars``) runs only when the
+    button is clicked; the arguments are bound now, so a later rerun cannot
+    change what is exported. The callable returns the export opened for
+    binary reading, which Streamlit reads itself.
+    """
+    return lambda: build(*args, **kwargs).open("rb")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export stored bars.")
+    parser.add_argument("symbols", nargs="+", help="symbols as stored, e.g. SBIN.NS ^NSEI")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv.gz")
+    parser.add_argument("--start", help="first date (inclusive)")
+    parser.add_argument("--end", help="last date (inclusive)")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--output", type=Path, help="copy the export here")
+    args = parser.parse_args(argv)
+
+    symbols = args.symbols[0] if len(args.symbols) == 1 else args.symbols
+    path = export_bars(symbols, args.format, args.start, args.end, args.interval)
+    if args.output:
+        shutil.copyfile(path, args.output)
+        path = args.output
+    print(path)
+
+
+if __name__ == "__main__":
+    main()
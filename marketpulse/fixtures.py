@@ -0,0 +1,134 @@
+"""Synthetic replay fixtures, so the replay provider works offline.
+
+``python -m marketpulse.fixtures`` writes a small, deterministic data set
+in the ``ReplayProvider`` layout to ``providers.REPLAY_DIR`` (or the given
+directory): daily bars for a handful of NSE symbols and the three indices
+the dashboard shows, their fundamentals, the FRED series of
+``macro.SERIES``, a legacy COT report per year for the assets of
+``cot.ASSETS`` and an NSE universe file. Prices are random walks and
+positions random integers; they exercise the pages, not the markets.
+
+The load test generates the fixtures itself when the replay directory
+does not exist yet.
+"""
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import cot, cot_store, fundamentals, macro, providers
+
+SYMBOLS = ("SBIN", "RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", "ITC", "LT", "AXISBANK", "KOTAKBANK")
+INDICES = ("^NSEI", "^BSESN", "^NSEBANK")
+YEARS = 10
+
+
+def _bars(dates, rng, price):
+    close = price * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(dates))))
+    open_ = close * np.exp(rng.normal(0, 0.005, len(dates)))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, len(dates)))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, len(dates)))
+    volume = rng.integers(100_000, 5_000_000, len(dates))
+    df = pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+                      index=pd.DatetimeIndex(dates, name="Date"))
+    return df.round(2)
+
+
+def _fundamentals(symbol, close, rng):
+    info = {"longName": f"{symbol.removesuffix(fundamentals.SUFFIX)} Ltd", "sector": "Financial Services",
+            "industry": "Banks", "currency": "INR"}
+    shares = float(rng.integers(10**8, 10**10))
+    earnings = close.iloc[-1] / rng.uniform(8, 40)
+    info.update({
+        "sharesOutstanding": shares, "dividendYield": round(rng.uniform(0, 3), 2), "beta": round(rng.uniform(0.5, 1.5), 2),
+        "marketCap": shares * close.iloc[-1], "trailingPE": close.iloc[-1] / earnings,
+        "forwardPE": close.iloc[-1] / (earnings * 1.1), "priceToBook": round(rng.uniform(1, 8), 2),
+        "fiftyTwoWeekHigh": close.iloc[-252:].max(), "fiftyTwoWeekLow": close.iloc[-252:].min(),
+    })
+    return info
+
+
+def _macro(series_id, end, rng):
+    if series_id == "GDP":
+        dates = pd.date_range(end - pd.DateOffset(years=30), end, freq="QS")
+        values = 10_000 * np.exp(np.cumsum(rng.normal(0.012, 0.008, len(dates))))
+    elif series_id == "GS10":
+        dates = pd.date_range(end - pd.DateOffset(years=30), end, freq="MS")
+        values = np.clip(5 + np.cumsum(rng.normal(0, 0.2, len(dates))), 0.5, None)
+    else:
+        dates = pd.date_range(end - pd.DateOffset(years=30), end, freq="MS")
+        values = 130 * np.exp(np.cumsum(rng.normal(0.002, 0.002, len(dates))))
+    return pd.Series(values.round(3), index=dates, name="value")
+
+
+def _cot_year(year, today, rng):
+    spec = cot_store.REPORTS[cot.REPORT_TYPE]
+    dates = pd.date_range(f"{year}-01-01", min(pd.Timestamp(f"{year}-12-31"), today), freq="W-TUE")
+    rows = []
+    for date in dates:
+        for pattern in cot.ASSETS.values():
+            row = {spec["date"]: date.strftime("%Y-%m-%d"), spec["market"]: f"{pattern.upper()} - EXCHANGE",
+                   spec["open_interest"]: int(rng.integers(10_000, 1_000_000))}
+            for columns in spec["categories"].values():
+                for column in columns:
+                    if column is not None:
+                        row[column] = int(rng.integers(0, 200_000))
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def write(root=None, symbols=SYMBOLS, years=YEARS, seed=0, today=None):
+    """Write the fixtures under ``root`` (default: ``providers.REPLAY_DIR``) and return it."""
+    root = Path(root or providers.REPLAY_DIR)
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp(today or datetime.now()).normalize()
+    dates = pd.bdate_range(today - pd.DateOffset(years=years), today)
+
+    prices = root / "prices" / "1d"
+    prices.mkdir(parents=True, exist_ok=True)
+    (root / "fundamentals").mkdir(exist_ok=True)
+    for symbol in [f"{s}{fundamentals.SUFFIX}" for s in symbols]:
+        bars = _bars(dates, rng, rng.uniform(100, 3000))
+        bars.to_csv(prices / f"{symbol}.csv")
+        (root / "fundamentals" / f"{symbol}.json").write_text(
+            json.dumps(_fundamentals(symbol, bars["Close"], rng)))
+    for index, level in zip(INDICES, (20_000, 70_000, 45_000)):
+        _bars(dates, rng, level).to_csv(prices / f"{index}.csv")
+
+    (root / "macro").mkdir(exist_ok=True)
+    for series_id in macro.SERIES:
+        _macro(series_id, today, rng).to_csv(root / "macro" / f"{series_id}.csv", index_label="date")
+
+    reports = root / "cot" / cot.REPORT_TYPE
+    reports.mkdir(parents=True, exist_ok=True)
+    for year in range(cot.FIRST_YEAR, today.year + 1):
+        _cot_year(year, today, rng).to_csv(reports / f"{year}.txt", index=False)
+
+    (root / "universe").mkdir(exist_ok=True)
+    (root / "universe" / "NSE.txt").write_text("\n".join(symbols))
+    return root
+
+
+def ensure(root=None, **kwargs):
+    """Write the fixtures unless ``root`` already exists; returns it."""
+    root = Path(root or providers.REPLAY_DIR)
+    return root if root.exists() else write(root, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic replay fixtures for offline runs.")
+    parser.add_argument("root", nargs="?", default=str(providers.REPLAY_DIR),
+                        help=f"directory to write (default: {providers.REPLAY_DIR})")
+    parser.add_argument("--years", type=int, default=YEARS, help="years of daily bars")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    root = write(args.root, years=args.years, seed=args.seed)
+    print(f"Wrote replay fixtures to {root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Fundamentals snapshot of the symbol universe, refreshed in batch.
+
+One small table holds a row per symbol with the ``FIELDS`` the pages and
+the scanner use, in yfinance ``info`` keys, and for each field when it was
+last checked (``<field>_at``). Each field has its own TTL: names and
+sectors are good for a month, prices and ratios for a day. A symbol is due
+for a refresh as soon as any of its fields has expired; one provider call
+then renews all of them, and a field the provider no longer returns is
+cleared rather than kept stale.
+
+``refresh`` fetches the due symbols concurrently and writes the table every
+``WRITE_EVERY`` symbols, so an interrupted run keeps what it fetched. The
+table is grouped by symbol, so ``lookup`` reads one row through the group
+offsets instead of the whole table. The background scheduler refreshes the
+universe daily; without it, ``lookup`` refreshes the one symbol it is asked
+for when that symbol is missing or due.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from . import providers, store
+
+SNAPSHOT = "fundamentals/snapshot"
+SUFFIX = ".NS"
+DAY = 86400
+
+# yfinance info key -> seconds before it is fetched again
+FIELDS = {
+    "longName": 30 * DAY,
+    "sector": 30 * DAY,
+    "industry": 30 * DAY,
+    "currency": 30 * DAY,
+    "sharesOutstanding": 7 * DAY,
+    "dividendYield": 7 * DAY,
+    "beta": 7 * DAY,
+    "marketCap": DAY,
+    "trailingPE": DAY,
+    "forwardPE": DAY,
+    "priceToBook": DAY,
+    "fiftyTwoWeekHigh": DAY,
+    "fiftyTwoWeekLow": DAY,
+}
+TEXT_FIELDS = ("longName", "sector", "industry", "currency")
+# Fields joined onto the scanner's feature table, under its snake_case names
+SCREENING = {
+    "marketCap": "market_cap",
+    "trailingPE": "pe",
+    "forwardPE": "forward_pe",
+    "priceToBook": "pb",
+    "dividendYield": "dividend_yield",
+    "beta": "beta",
+}
+WRITE_EVERY = 250
+
+# One writer at a time; each write replaces the whole (small) table
+_write_lock = threading.Lock()
+
+
+def _empty():
+    columns = {"Symbol": pd.Series(dtype=object)}
+    for field in FIELDS:
+        columns[field] = pd.Series(dtype=object if field in TEXT_FIELDS else float)
+        columns[f"{field}_at"] = pd.Series(dtype="datetime64[ns]")
+    return pd.DataFrame(columns)
+
+
+def load(columns=None):
+    """The snapshot indexed by symbol (with suffix), optionally limited to ``columns``."""
+    if not store.exists(SNAPSHOT):
+        df = _empty()
+    else:
+        df = store.read_frame(SNAPSHOT, columns=None if columns is None else ["Symbol", *columns])
+    df = df.set_index("Symbol")
+    return df if columns is None else df[list(columns)]
+
+
+def stored_symbols():
+    if not store.exists(SNAPSHOT):
+        return []
+    return list(store.read_metadata(SNAPSHOT).get("groups", {}))
+
+
+def _value(field, value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if field in TEXT_FIELDS:
+        return str(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _row(info, checked_at):
+    row = {}
+    for field in FIELDS:
+        row[field] = _value(field, info.get(field))
+        row[f"{field}_at"] = checked_at
+    return row
+
+
+def _save(df):
+    df = df.reset_index()
+    df = df.astype({field: object if field in TEXT_FIELDS else float for field in FIELDS})
+    store.write_frame(SNAPSHOT, df, group_by="Symbol", metadata={
+        "refreshed_at": pd.Timestamp.now("UTC").isoformat(), "symbols": len(df),
+    })
+
+
+def _merge(rows):
+    # Upsert fetched rows into the stored table; called with _write_lock held
+    old = load()
+    new = pd.DataFrame.from_dict(rows, orient="index")
+    new.index.name = "Symbol"
+    merged = pd.concat([old[~old.index.isin(new.index)], new[old.columns]])
+    _save(merged)
+
+
+def _now():
+    return pd.Timestamp.now("UTC").tz_localize(None)
+
+
+def _expired(checked, now):
+    # Rows of ``checked`` (the ``<field>_at`` columns) with any field past its TTL
+    at = checked[[f"{field}_at" for field in FIELDS]].to_numpy(dtype="datetime64[ns]")
+    expires = at + np.array(list(FIELDS.values()), dtype="timedelta64[s]")
+    # A never-checked field is NaT, which compares as expired here
+    return ~(expires > np.datetime64(now)).all(axis=1)
+
+
+def due(symbols=None, now=None):
+    """Symbols of ``symbols`` (default: every stored one) that are missing or have an expired field."""
+    checked = load([f"{field}_at" for field in FIELDS])
+    if symbols is not None:
+        checked = checked.reindex(list(symbols))
+    return list(checked.index[_expired(checked, pd.Timestamp(now or _now()))])
+
+
+def refresh(symbols=None, max_workers=8, force=False):
+    """Fetch the due fundamentals of ``symbols`` (default: the NSE universe) and store them.
+
+    Returns the number of symbols fetched. Failed symbols are reported and
+    left as they were, to be retried on the next refresh.
+    """
+    if symbols is None:
+        from . import scanner
+        symbols = [f"{s}{SUFFIX}" for s in scanner.load_universe()]
+    symbols = list(dict.fromkeys(symbols))
+    if not force:
+        symbols = due(symbols)
+    if not symbols:
+        return 0
+    provider = providers.get_provider()
+
+    def attempt(symbol):
+        try:
+            return symbol, provider.fundamentals(symbol)
+        except Exception as e:
+            print(f"Failed for {symbol}: {e}")
+            return symbol, None
+
+    fetched, pending = 0, {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as pool:
+        for symbol, info in pool.map(attempt, symbols):
+            if info is None:
+                continue
+            pending[symbol] = _row(info, _now())
+            if len(pending) >= WRITE_EVERY:
+                with _write_lock:
+                    _merge(pending)
+                fetched += len(pending)
+                pending = {}
+    if pending:
+        with _write_lock:
+            _merge(pending)
+        fetched += len(pending)
+    return fetched
+
+
+def _scheduled():
+    from . import scheduler
+    return scheduler.is_active()
+
+
+def _read_row(symbol):
+    if not store.exists(SNAPSHOT):
+        return _empty()
+    return store.read_frame(SNAPSHOT, group=symbol)
+
+
+def lookup(symbol):
+    """``{field: value}`` for one symbol, read from its row of the snapshot.
+
+    Like yfinance ``info``, fields with no value are left out.
+
+    A symbol that is not stored yet, or whose fields have expired while no
+    scheduler is refreshing them, is fetched first.
+    """
+    row = _read_row(symbol)
+    if row.empty or (not _scheduled() and _expired(row, _now()).any()):
+        refresh([symbol], force=True)
+        row = _read_row(symbol)
+    if row.empty:
+        return {}
+    values = {field: _value(field, row[field].iloc[0]) for field in FIELDS}
+    return {field: value for field, value in values.items() if value is not None}
+
+
+def screening():
+    """The ``SCREENING`` fields indexed by symbol without suffix, for joining onto scanner features."""
+    df = load(list(SCREENING)).rename(columns=SCREENING)
+    df.index = df.index.str.removesuffix(SUFFIX)
+    return df.astype(float)
+
+
+def refreshed_at():
+    """When the snapshot was last written, or None."""
+    if not store.exists(SNAPSHOT):
+        return None
+    return pd.Timestamp(store.read_metadata(SNAPSHOT)["refreshed_at"]).tz_localize(None)
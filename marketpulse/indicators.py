@@ -0,0 +1,195 @@
+"""Technical indicators shared by the pages.
+
+The plain functions work on a Series or on a symbol-per-column DataFrame.
+``IndicatorEngine`` memoizes results per (symbol, indicator, window) and,
+when new bars are appended to a series, extends them from the tail
+instead of recomputing the full history.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+INDICATORS = ("sma", "ema", "std", "vol")
+
+
+def sma(close, window):
+    return close.rolling(window=window).mean()
+
+
+def ema(close, window):
+    return close.ewm(span=window, adjust=False).mean()
+
+
+def rolling_std(close, window):
+    return close.rolling(window=window).std()
+
+
+def rolling_volatility(close, window, periods=TRADING_DAYS):
+    """Annualized rolling volatility of daily returns, in percent."""
+    return close.pct_change(fill_method=None).rolling(window=window).std() * (periods ** 0.5) * 100
+
+
+def bollinger(close, window, num_std, middle=None, std=None):
+    """Return ``(middle, upper, lower)``; the rolling std is computed once."""
+    middle = sma(close, window) if middle is None else middle
+    std = rolling_std(close, window) if std is None else std
+    return middle, middle + std * num_std, middle - std * num_std
+
+
+def _windowed_sums(values, windows):
+    # Rolling sums for every window from a single cumulative sum along axis 0
+    # (per column for 2-D input). Values are centred first so the sum of
+    # squares keeps its precision.
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=0)
+    shift = np.where(valid, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    x = np.where(valid, values - shift, 0.0)
+    zero = np.zeros((1,) + values.shape[1:])
+    cx = np.concatenate([zero, np.cumsum(x, axis=0)])
+    cxx = np.concatenate([zero, np.cumsum(x * x, axis=0)])
+    cn = np.concatenate([zero, np.cumsum(valid, axis=0)])
+    out = {}
+    for w in windows:
+        n, s, ss = (np.full(values.shape, np.nan) for _ in range(3))
+        if w <= len(values):
+            n[w - 1:] = cn[w:] - cn[:-w]
+            s[w - 1:] = cx[w:] - cx[:-w]
+            ss[w - 1:] = cxx[w:] - cxx[:-w]
+        full = n == w
+        out[w] = (np.where(full, n, np.nan), np.where(full, s, np.nan), np.where(full, ss, np.nan), shift)
+    return out
+
+
+def compute_many(close, specs):
+    """Compute several ``(indicator, window)`` pairs in a single pass.
+
+    ``close`` is a Series or a symbol-per-column DataFrame. SMA, rolling std
+    and rolling volatility for every requested window share one cumulative
+    sum of prices (or returns); EMAs are one pass each.
+    """
+    specs = list(dict.fromkeys(specs))
+    results = {}
+    values = close.to_numpy(dtype=float)
+    price_windows = sorted({w for ind, w in specs if ind in ("sma", "std")})
+    return_windows = sorted({w for ind, w in specs if ind == "vol"})
+    price_sums = _windowed_sums(values, price_windows)
+    returns = close.pct_change(fill_method=None).to_numpy(dtype=float)
+    return_sums = _windowed_sums(returns, return_windows)
+
+    for ind, w in specs:
+        if ind == "ema":
+            results[(ind, w)] = ema(close, w)
+            continue
+        n, s, ss, shift = (return_sums if ind == "vol" else price_sums)[w]
+        if ind == "sma":
+            out = s / n + shift
+        else:
+            var = np.maximum(ss - s * s / n, 0.0) / (n - 1)
+            out = np.sqrt(var)
+            if ind == "vol":
+                out = out * (TRADING_DAYS ** 0.5) * 100
+        if isinstance(close, pd.DataFrame):
+            results[(ind, w)] = pd.DataFrame(out, index=close.index, columns=close.columns)
+        else:
+            results[(ind, w)] = pd.Series(out, index=close.index, name=close.name)
+    return results
+
+
+_WARMUP = {"sma": 0, "std": 0, "vol": 1}
+
+
+def _extend(indicator, window, close, previous):
+    """Values for the bars after ``previous`` using only the tail of ``close``."""
+    n = len(previous)
+    if indicator == "ema":
+        # Seed from the last bar with a close: the bars missing after it still
+        # discount the next close, so they are replayed too
+        closes = np.flatnonzero(close.iloc[:n].notna().to_numpy())
+        if not len(closes):
+            return ema(close, window).iloc[n:]
+        seed = closes[-1]
+        tail = pd.concat([previous.iloc[seed:seed + 1], close.iloc[seed + 1:]])
+        return ema(tail, window).iloc[n - seed:]
+    lookback = window - 1 + _WARMUP[indicator]
+    tail = close.iloc[max(n - lookback, 0):]
+    return compute_many(tail, [(indicator, window)])[(indicator, window)].iloc[-(len(close) - n):]
+
+
+def _same(a, b):
+    # A missing close equals a missing close
+    return a == b or (pd.isna(a) and pd.isna(b))
+
+
+class IndicatorEngine:
+    """Memoized indicators per (symbol, indicator, window).
+
+    Moving one window only computes that one series; a series that gained
+    bars at the end is extended from its tail. Entries are evicted least
+    recently used beyond ``max_entries``.
+
+    The engine grows after it is created, so it reports the bytes it gains
+    or frees to the callback given to ``track_size`` (the shared cache uses
+    this to keep its accounting, and its evictions, honest).
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (last close, values, bytes)
+        self._lock = threading.Lock()
+        self._on_resize = None
+
+    def track_size(self, callback):
+        """Call ``callback(delta)`` with the bytes gained (or freed) by every later compute."""
+        self._on_resize = callback
+
+    def _lookup(self, key, close):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        last_close, values, _ = entry
+        n = len(values)
+        if n > len(close) or close.index[n - 1] != values.index[-1] or not _same(close.iloc[n - 1], last_close):
+            # Different or restated history (e.g. a dividend adjustment)
+            return None, None
+        if n == len(close):
+            return values, None
+        return None, values
+
+    def compute(self, symbol, close, specs):
+        """Return ``{(indicator, window): Series}`` for ``close``."""
+        specs = list(dict.fromkeys(specs))
+        results, missing = {}, []
+        with self._lock:
+            for spec in specs:
+                values, stale = self._lookup((symbol, *spec), close)
+                if values is not None:
+                    self._entries.move_to_end((symbol, *spec))
+                    results[spec] = values
+                elif stale is not None:
+                    results[spec] = pd.concat([stale, _extend(*spec, close, stale)])
+                else:
+                    missing.append(spec)
+        if missing:
+            results.update(compute_many(close, missing))
+        delta = 0
+        with self._lock:
+            for spec in specs:
+                key = (symbol, *spec)
+                size = int(results[spec].memory_usage(index=True))
+                if key in self._entries:
+                    delta -= self._entries.pop(key)[2]
+                self._entries[key] = (close.iloc[-1], results[spec], size)
+                delta += size
+            while len(self._entries) > self.max_entries:
+                delta -= self._entries.popitem(last=False)[1][2]
+            self.bytes += delta
+        if delta and self._on_resize is not None:
+            self._on_resize(delta)
+        return results
+
+    def get(self, symbol, close, indicator, window):
+        return self.compute(symbol, close, [(indicator, window)])[(indicator, window)]
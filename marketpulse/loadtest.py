@@ -0,0 +1,351 @@
+"""Concurrent-session load test of the Streamlit pages.
+
+``python -m marketpulse.loadtest --sessions 16 --workers 4`` runs each
+page in N sessions per worker process through Streamlit's public
+``AppTest`` harness. Each session is its own ``AppTest`` with its own
+session state, and the sessions of a worker share its process-wide caches
+and store, as on one server replica. Each session first loads the page and
+then performs ``--reruns`` random widget interactions taken from the page's
+entry in ``SCENARIOS``: picking a ticker, changing the period, toggling
+indicators, moving the lookback sliders and so on. Every interaction is
+one timed rerun.
+
+``AppTest`` runs one script at a time per process, so a worker interleaves
+its sessions (one run each, in a random order, round after round), and
+runs happen in parallel across the ``--workers`` spawned processes.
+
+The report covers, per page and overall:
+
+- first-run and rerun latency: p50, p95, p99 and max
+- throughput, in page runs per second of wall time
+- uncaught page exceptions, and sessions that had to be reloaded because
+  a run did not complete (e.g. it exceeded ``--timeout``)
+- per worker process: RSS before and after, and peak RSS
+- hit rates of the shared cache's datasets, from ``marketpulse.metrics``
+
+The samples of all workers are merged and each worker's memory is
+reported. Data comes from the replay provider, so the numbers measure the
+app rather than the network: ``MARKETPULSE_REPLAY_DIR`` (default
+``providers.REPLAY_DIR``) is filled with ``marketpulse.fixtures`` if it does
+not exist yet. ``--live`` uses whatever provider the environment selects.
+
+Buttons that rebuild data (universe refresh, score updates) are never
+pressed. ``--json`` prints the raw results.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from . import providers, store
+
+PAGES_DIR = store.ROOT / "pages"
+
+# Widget interactions per page: (widget kind, label, values). ``None``
+# picks any option of a select widget, flips a checkbox or moves a slider
+# to a random step; a list picks one of its values.
+SCENARIOS = {
+    "NSE_Financial_Dashboard.py": [
+        ("text_input", "Enter Stock Symbol (e.g., SBIN)", ["SBIN", "RELIANCE", "TCS", "INFY", "HDFCBANK"]),
+        ("selectbox", "Select Time Period", None),
+        ("checkbox", "Show Technical Indicators", None),
+        ("slider", "SMA Window", [10, 20, 50, 100, 200]),
+        ("slider", "EMA Window", [20, 50, 100]),
+        ("checkbox", "Show Bollinger Bands", None),
+        ("checkbox", "Show Volume Chart", None),
+        ("selectbox", "Select Section", ["Equity Market", "Market Indices", "Correlation", "Volatility Analysis"]),
+    ],
+    "Correlation-Heatmap.py": [
+        ("selectbox", "Select Market", None),
+        ("slider", "Select number of years of data to include", None),
+        ("slider", "Rolling window (trading days)", None),
+        ("selectbox", "First asset", None),
+        ("selectbox", "Second asset", None),
+        ("checkbox", "Drop rows with missing values", None),
+    ],
+    "COT_Data_History.py": [
+        ("selectbox", "Select Asset", None),
+        ("radio", "Lookback (weeks)", None),
+        ("selectbox", "Rank by", None),
+        ("checkbox", "🌙 Dark Mode", None),
+    ],
+    "COT_Asset_Data.py": [
+        ("multiselect", "Select assets to view:", None),
+    ],
+    "Market_Pulse_Score.py": [
+        ("selectbox", "Asset", None),
+    ],
+    "Top_Setup.py": [
+        ("selectbox", "Direction", None),
+        ("slider", "Number of setups to show", None),
+        ("multiselect", "Markets", None),
+    ],
+    "Data_Scanner.py": [
+        ("multiselect", "Filters", None),
+        ("selectbox", "Sort by", None),
+        ("checkbox", "Ascending", None),
+    ],
+}
+DEFAULT_PAGES = ("NSE_Financial_Dashboard.py", "Correlation-Heatmap.py")
+
+
+def _rss():
+    # Current resident set size in bytes
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def _widget(at, kind, label):
+    for widget in getattr(at, kind):
+        if widget.label == label and not getattr(widget, "disabled", False):
+            return widget
+    return None
+
+
+def _interact(at, step, rng):
+    """Apply one scenario step to ``at``; False when its widget is not on the page."""
+    kind, label, values = step
+    widget = _widget(at, kind, label)
+    if widget is None:
+        return False
+    if kind == "checkbox":
+        widget.set_value(not widget.value)
+    elif kind in ("selectbox", "radio", "multiselect"):
+        # ``options`` are the displayed labels; they are sent to the page the
+        # way the browser sends a click, and the page maps them back to values
+        options = list(widget.options) if values is None else values
+        if not options:
+            return False
+        if kind == "multiselect":
+            widget.set_value(rng.sample(options, rng.randint(1, min(4, len(options)))))
+        else:
+            widget.set_value(rng.choice(options))
+    elif kind == "slider":
+        if values is None:
+            lo, hi, step_size = widget.min, widget.max, widget.step
+            if isinstance(widget.value, (tuple, list)):
+                return False
+            steps = int(round((hi - lo) / step_size))
+            widget.set_value(type(widget.value)(lo + rng.randint(0, steps) * step_size))
+        else:
+            widget.set_value(rng.choice(values))
+    else:
+        widget.set_value(rng.choice(values))
+    return True
+
+
+def _session(path, reruns, seed, timeout, samples):
+    # One simulated analyst: load the page, then interact ``reruns`` times.
+    # A generator that pauses after every run, so a worker can interleave sessions
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    steps = SCENARIOS.get(path.name, [])
+
+    def timed(at, kind):
+        t0 = time.perf_counter()
+        try:
+            at.run()
+        except Exception as e:
+            # The harness itself failed (e.g. a timeout); the analyst reloads the page
+            samples["errors"].append(f"{type(e).__name__}: {e}")
+            return False
+        samples[kind].append(time.perf_counter() - t0)
+        samples["exceptions"] += [str(e.value) for e in at.exception]
+        return True
+
+    def open_page():
+        at = AppTest.from_file(str(path), default_timeout=timeout)
+        timed(at, "first")
+        return at
+
+    at = open_page()
+    yield
+    for _ in range(reruns):
+        if not steps or not _interact(at, rng.choice(steps), rng):
+            # e.g. a section's widgets while another section is shown
+            samples["skipped"] += 1
+            continue
+        if not timed(at, "rerun"):
+            at = open_page()
+        yield
+
+
+def run_worker(pages, sessions, reruns, seed=0, timeout=300):
+    """Run ``sessions`` interleaved sessions of each page in this process and return the raw samples."""
+    from . import metrics
+
+    metrics.reset()
+    rss_start = _rss()
+    results = {}
+    started = time.perf_counter()
+    order = random.Random(seed)
+    for page in pages:
+        path = PAGES_DIR / page
+        page_started = time.perf_counter()
+        runs = [{"first": [], "rerun": [], "exceptions": [], "errors": [], "skipped": 0} for _ in range(sessions)]
+        active = [_session(path, reruns, seed * 10_000 + i, timeout, runs[i]) for i in range(sessions)]
+        while active:
+            # One run of every unfinished session per round, in a random order
+            order.shuffle(active)
+            for session in list(active):
+                if next(session, StopIteration) is StopIteration:
+                    active.remove(session)
+        results[page] = {
+            "first": [t for r in runs for t in r["first"]],
+            "rerun": [t for r in runs for t in r["rerun"]],
+            "exceptions": [e for r in runs for e in r["exceptions"]],
+            "errors": [e for r in runs for e in r["errors"]],
+            "skipped": sum(r["skipped"] for r in runs),
+            "wall": time.perf_counter() - page_started,
+        }
+    caches = {}
+    for c in metrics.snapshot()["caches"]:
+        caches.setdefault(c["cache"], {})[c["event"]] = c["count"]
+    return {
+        "pid": os.getpid(),
+        "pages": results,
+        "wall": time.perf_counter() - started,
+        "rss_start": rss_start,
+        "rss_end": _rss(),
+        "rss_peak": _peak_rss(),
+        "caches": caches,
+    }
+
+
+def run(pages=DEFAULT_PAGES, sessions=8, reruns=10, workers=1, seed=0, timeout=300):
+    """Run the load test and return ``{"workers": [...], "pages": {...}, "caches": {...}}``."""
+    pages = list(pages)
+    missing = [p for p in pages if not (PAGES_DIR / p).exists()]
+    if missing:
+        raise ValueError(f"No such page: {missing}")
+    args = (pages, sessions, reruns)
+    if workers == 1:
+        raw = [run_worker(*args, seed=seed, timeout=timeout)]
+    else:
+        # spawn, so each worker starts as cold as a new replica would
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(run_worker, *args, seed=seed + w, timeout=timeout)
+                       for w in range(workers)]
+            raw = [f.result() for f in futures]
+
+    pages_out, caches = {}, {}
+    for page in pages:
+        merged = {"first": [], "rerun": [], "exceptions": [], "errors": [], "skipped": 0}
+        for worker in raw:
+            for key in ("first", "rerun", "exceptions", "errors"):
+                merged[key] += worker["pages"][page][key]
+            merged["skipped"] += worker["pages"][page]["skipped"]
+        # Workers run side by side, so the page's wall time is the slowest worker's
+        wall = max(worker["pages"][page]["wall"] for worker in raw)
+        pages_out[page] = _summary(merged, wall)
+    for worker in raw:
+        for cache, events in worker["caches"].items():
+            for event, n in events.items():
+                caches.setdefault(cache, {})[event] = caches.get(cache, {}).get(event, 0) + n
+    overall = {"first": [], "rerun": [], "exceptions": [], "errors": [], "skipped": 0}
+    for worker in raw:
+        for page in pages:
+            for key in ("first", "rerun", "exceptions", "errors"):
+                overall[key] += worker["pages"][page][key]
+    pages_out["all"] = _summary(overall, max(worker["wall"] for worker in raw))
+    workers_out = [{key: worker[key] for key in ("pid", "wall", "rss_start", "rss_end", "rss_peak")}
+                   for worker in raw]
+    return {"config": {"pages": pages, "sessions": sessions, "reruns": reruns, "workers": workers,
+                       "seed": seed},
+            "pages": pages_out, "workers": workers_out, "caches": caches}
+
+
+def _summary(samples, wall):
+    def stats(values):
+        return {"count": len(values), "p50": _percentile(values, 0.5), "p95": _percentile(values, 0.95),
+                "p99": _percentile(values, 0.99), "max": max(values, default=float("nan"))}
+
+    runs = len(samples["first"]) + len(samples["rerun"])
+    return {
+        "first": stats(samples["first"]),
+        "rerun": stats(samples["rerun"]),
+        "throughput": runs / wall if wall else float("nan"),
+        "exceptions": len(samples["exceptions"]),
+        "first_exception": samples["exceptions"][0] if samples["exceptions"] else None,
+        "harness_errors": len(samples["errors"]),
+        "first_harness_error": samples["errors"][0] if samples["errors"] else None,
+        "skipped": samples["skipped"],
+        "wall": wall,
+    }
+
+
+def report(result):
+    config = result["config"]
+    lines = [f"{config['workers']} worker(s) x {config['sessions']} sessions x {config['reruns']} interactions",
+             "",
+             f"{'page':28} {'kind':6} {'runs':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'runs/s':>7} {'errors':>6}"]
+    for page, s in result["pages"].items():
+        for kind in ("first", "rerun"):
+            st = s[kind]
+            if not st["count"]:
+                continue
+            lines.append(f"{page:28} {kind:6} {st['count']:5} "
+                         + " ".join(f"{st[q] * 1000:6.0f}ms" for q in ("p50", "p95", "p99", "max"))
+                         + (f" {s['throughput']:7.2f} {s['exceptions']:6}" if kind == "rerun" else ""))
+        if s["first_exception"]:
+            lines.append(f"{'':28} first exception: {s['first_exception'][:100]}")
+        if s["harness_errors"]:
+            lines.append(f"{'':28} {s['harness_errors']} session(s) reloaded after: {s['first_harness_error'][:100]}")
+    lines += ["", f"{'worker':>8} {'wall':>8} {'RSS start':>10} {'RSS end':>10} {'RSS peak':>10}"]
+    for w in result["workers"]:
+        lines.append(f"{w['pid']:8} {w['wall']:7.1f}s " + " ".join(
+            f"{w[key] / 2**20:8.0f}MB" for key in ("rss_start", "rss_end", "rss_peak")))
+    if result["caches"]:
+        lines += ["", f"{'cache':36} {'hits':>6} {'misses':>6} {'evictions':>9} {'hit rate':>8}"]
+        for cache, events in sorted(result["caches"].items()):
+            hits, misses = events.get("hit", 0), events.get("miss", 0)
+            rate = hits / (hits + misses) if hits + misses else float("nan")
+            lines.append(f"{cache:36} {hits:6} {misses:6} {events.get('eviction', 0):9} {rate:8.1%}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the MarketPulse pages with concurrent sessions.")
+    parser.add_argument("pages", nargs="*", help=f"page file names (default: {' '.join(DEFAULT_PAGES)})")
+    parser.add_argument("--sessions", type=int, default=8, help="sessions per page and worker")
+    parser.add_argument("--reruns", type=int, default=10, help="widget interactions per session")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (server replicas)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300, help="seconds allowed per page run")
+    parser.add_argument("--live", action="store_true",
+                        help="use the provider MARKETPULSE_PROVIDER selects instead of the replay fixtures")
+    parser.add_argument("--json", action="store_true", help="print the raw results as JSON")
+    args = parser.parse_args(argv)
+
+    if not args.live:
+        # Set in the environment, so spawned workers pick the same provider
+        from . import fixtures
+        os.environ["MARKETPULSE_PROVIDER"] = "replay"
+        root = Path(os.environ.get("MARKETPULSE_REPLAY_DIR", providers.REPLAY_DIR))
+        if not root.exists():
+            print(f"Writing replay fixtures to {root}")
+        os.environ["MARKETPULSE_REPLAY_DIR"] = str(fixtures.ensure(root))
+    elif os.environ.get("MARKETPULSE_PROVIDER", "live") != "replay":
+        print("Warning: MARKETPULSE_PROVIDER is not 'replay'; cache misses will call the live providers.")
+    result = run(args.pages or DEFAULT_PAGES, args.sessions, args.reruns, args.workers, args.seed, args.timeout)
+    print(json.dumps(result, indent=2) if args.json else report(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""FRED macro series stored at their native frequency.
+
+Each series is one dataset with a ``value`` column and a ``vintage``
+column: the date the value was first seen in its current form. A refresh
+only asks FRED for observations from ``REVISION_WINDOW`` before the last
+stored one, so recent revisions are picked up without downloading the
+whole history again, and several series are fetched concurrently.
+
+Nothing is upsampled when stored. ``align`` joins series onto a calendar
+(e.g. the price dates) as-of each date, only when a view needs it.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from . import providers, store
+
+SERIES = {
+    "CPIAUCSL": "Consumer Price Index",
+    "GDP": "Gross Domestic Product",
+    "GS10": "10-Year Treasury Rate",
+}
+
+# Observations this recent are fetched again on every refresh, since FRED
+# revises them (GDP estimates are revised for up to a year)
+REVISION_WINDOW = pd.DateOffset(years=1)
+
+
+def _dataset(series_id):
+    return f"macro/{series_id}"
+
+
+def _merge(old, new, fetched_at):
+    # Keep each unchanged value's vintage; new or revised values get this fetch's
+    # Returns the merged frame and how many values were added or revised
+    new = new.to_frame("value")
+    new["vintage"] = fetched_at
+    if old is None or old.empty:
+        return new, len(new)
+    same = old["value"].reindex(new.index)
+    unchanged = np.isclose(same.to_numpy(dtype=float), new["value"].to_numpy(dtype=float), equal_nan=True)
+    new.loc[unchanged, "vintage"] = old["vintage"].reindex(new.index)[unchanged]
+    return pd.concat([old[old.index < new.index.min()], new]), int((~unchanged).sum())
+
+
+def refresh_series(series_id):
+    """Fetch the new and recently revised observations of ``series_id`` and store them.
+
+    Returns the number of observations added or revised.
+    """
+    name = _dataset(series_id)
+    old = store.read_frame(name) if store.exists(name) else None
+    if old is not None and "vintage" not in old.columns:
+        # Stored before vintages were tracked; fetch it again in full
+        old = None
+    observation_start = None
+    if old is not None and not old.empty:
+        observation_start = (old.index.max() - REVISION_WINDOW).strftime("%Y-%m-%d")
+    fetched_at = pd.Timestamp.now().normalize()
+    new = providers.get_provider().macro_series(series_id, observation_start=observation_start)
+    new.index = pd.to_datetime(new.index)
+    new = new.dropna().astype(float).sort_index()
+    if new.empty:
+        return 0
+    merged, changed = _merge(old, new, fetched_at)
+    if old is not None and not changed:
+        return 0
+    store.write_frame(name, merged, index_name="Date", metadata={
+        "series_id": series_id,
+        "fetched_at": pd.Timestamp.now("UTC").isoformat(),
+        "observation_start": observation_start,
+        "last_observation": merged.index.max().isoformat(),
+        "frequency": pd.infer_freq(merged.index[-12:]) if len(merged) >= 12 else None,
+    })
+    return changed
+
+
+def refresh(series_ids=None, max_workers=8):
+    """Refresh ``series_ids`` (default: ``SERIES``) concurrently.
+
+    Returns ``{series_id: observations added or revised}``. A series that
+    fails is reported and skipped; if any failed, a ``RuntimeError`` is
+    raised once the others are stored.
+    """
+    series_ids = list(series_ids or SERIES)
+    failed = {}
+
+    def attempt(series_id):
+        try:
+            return series_id, refresh_series(series_id)
+        except Exception as e:
+            print(f"Failed for {series_id}: {e}")
+            failed[series_id] = e
+            return series_id, None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(series_ids)))) as pool:
+        results = dict(pool.map(attempt, series_ids))
+    if failed:
+        series_id, error = next(iter(failed.items()))
+        raise RuntimeError(f"Macro refresh failed for {sorted(failed)}: {error}") from error
+    return results
+
+
+def last_observation(series_id):
+    """Date of the newest stored observation, or None."""
+    if not store.exists(_dataset(series_id)):
+        return None
+    recorded = store.read_metadata(_dataset(series_id)).get("last_observation")
+    if recorded:
+        return pd.Timestamp(recorded)
+    return store.read_frame(_dataset(series_id)).index.max()
+
+
+def load(series_id, with_vintage=False):
+    """Stored series at its native frequency, downloaded first if never fetched."""
+    name = _dataset(series_id)
+    if not store.exists(name):
+        refresh_series(series_id)
+    if with_vintage:
+        return store.read_frame(name)
+    return store.read_frame(name, columns=["value"])["value"].rename(series_id)
+
+
+def load_many(series_ids, max_workers=8):
+    """``{series_id: series}``, fetching the never-stored ones concurrently."""
+    missing = [s for s in series_ids if not store.exists(_dataset(s))]
+    if missing:
+        refresh(missing, max_workers=max_workers)
+    return {series_id: load(series_id) for series_id in series_ids}
+
+
+def align(series, dates, lag=None):
+    """As-of join of ``series`` (a dict or frame of native-frequency series) onto ``dates``.
+
+    Each date gets the latest observation on or before it. ``lag`` shifts
+    observation dates forward first, e.g. to when a monthly print is
+    actually published.
+    """
+    if isinstance(series, pd.DataFrame):
+        series = {col: series[col].dropna() for col in series.columns}
+    dates = pd.DatetimeIndex(dates)
+    left = pd.DataFrame({"Date": dates.unique().sort_values()})
+    out = left
+    for name, values in series.items():
+        right = values.dropna().rename(name).sort_index()
+        right.index = pd.DatetimeIndex(right.index)
+        if lag is not None:
+            right.index = right.index + lag
+        right = right.rename_axis("Date").reset_index()
+        right["Date"] = right["Date"].astype(left["Date"].dtype)
+        out = pd.merge_asof(out, right, on="Date", direction="backward")
+    return out.set_index("Date").reindex(dates)
@@ -0,0 +1,306 @@
+"""Lightweight timings and counters for the pages.
+
+Pages call ``set_page`` once per run and wrap their stages in ``span``
+(``"load"``, ``"compute"`` or ``"figure"``). The shared cache reports its
+hits, misses and evictions with ``count``, and ``payload`` records the
+serialized size of a chart or table on a sample of calls.
+
+Everything is aggregated in process: a span costs two clock reads and a
+locked dictionary update, so recording stays on in production. Set
+``MARKETPULSE_METRICS=0`` to turn it off. The aggregates are exported
+
+- as Prometheus text on ``http://127.0.0.1:<port>/metrics`` when
+  ``MARKETPULSE_METRICS_PORT`` is set (JSON on ``/metrics.json``)
+- as JSON lines appended to ``MARKETPULSE_METRICS_LOG``, one record per
+  event, written in batches
+
+``python -m marketpulse.metrics <log>`` summarizes such a log.
+"""
+import argparse
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("MARKETPULSE_METRICS", "1") != "0"
+LOG_PATH = os.environ.get("MARKETPULSE_METRICS_LOG")
+PORT = os.environ.get("MARKETPULSE_METRICS_PORT")
+HOST = os.environ.get("MARKETPULSE_METRICS_HOST", "127.0.0.1")
+
+# Histogram buckets for span durations, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Serializing a figure to measure it costs about as much as sending it, so
+# only every PAYLOAD_SAMPLE-th payload per chart or table is measured
+PAYLOAD_SAMPLE = 10
+# The log is appended once this many records are buffered, or this long after the last write
+FLUSH_RECORDS = 200
+FLUSH_SECONDS = 10.0
+
+_lock = threading.Lock()
+_local = threading.local()
+_spans = {}     # (page, stage, name) -> [count, sum, max, per-bucket counts]
+_caches = {}    # (cache, event) -> count
+_payloads = {}  # (kind, name) -> [calls, samples, bytes sum, last bytes]
+_buffer = []
+_last_flush = time.monotonic()
+_log_lock = threading.Lock()
+_server = None
+
+
+def set_page(page):
+    """Label the spans recorded by this script run (thread) with ``page``."""
+    _local.page = page
+    if PORT and _server is None:
+        serve(int(PORT))
+
+
+def _page():
+    return getattr(_local, "page", "")
+
+
+def _log(record):
+    # Called with _lock held
+    global _last_flush
+    if not LOG_PATH:
+        return
+    record["ts"] = round(time.time(), 3)
+    _buffer.append(record)
+    now = time.monotonic()
+    if len(_buffer) >= FLUSH_RECORDS or now - _last_flush >= FLUSH_SECONDS:
+        _last_flush = now
+        threading.Thread(target=flush, daemon=True).start()
+
+
+def flush():
+    """Append the buffered records to ``MARKETPULSE_METRICS_LOG``."""
+    with _lock:
+        records = _buffer[:]
+        _buffer.clear()
+    if not records or not LOG_PATH:
+        return
+    lines = "".join(json.dumps(r) + "\n" for r in records)
+    try:
+        with _log_lock, open(LOG_PATH, "a") as f:
+            f.write(lines)
+    except OSError as e:
+        print(f"Failed to write metrics log {LOG_PATH}: {e}")
+
+
+atexit.register(flush)
+
+
+def observe(stage, name, seconds, page=None):
+    """Record one span of ``seconds``."""
+    if not ENABLED:
+        return
+    page = _page() if page is None else page
+    with _lock:
+        entry = _spans.get((page, stage, name))
+        if entry is None:
+            entry = _spans[(page, stage, name)] = [0, 0.0, 0.0, [0] * len(BUCKETS)]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        i = bisect.bisect_left(BUCKETS, seconds)
+        if i < len(BUCKETS):
+            entry[3][i] += 1
+        _log({"type": "span", "page": page, "stage": stage, "name": name, "seconds": round(seconds, 6)})
+
+
+@contextmanager
+def span(stage, name=""):
+    """Time the enclosed block (or decorated function) as ``stage``/``name`` of the current page."""
+    if not ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, name, time.perf_counter() - t0)
+
+
+def count(cache, event, n=1):
+    """Count ``n`` cache events (``"hit"``, ``"miss"``, ``"eviction"``) for ``cache``."""
+    if not ENABLED:
+        return
+    with _lock:
+        _caches[(cache, event)] = _caches.get((cache, event), 0) + n
+        _log({"type": "cache", "page": _page(), "cache": cache, "event": event, "n": n})
+
+
+def _size(obj):
+    if hasattr(obj, "to_plotly_json"):
+        return len(obj.to_json())
+    if hasattr(obj, "memory_usage"):
+        usage = obj.memory_usage(index=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    return len(obj)
+
+
+def payload(kind, name, obj):
+    """Record the size of a chart (plotly figure) or table sent to the browser, sampled."""
+    if not ENABLED:
+        return obj
+    with _lock:
+        entry = _payloads.get((kind, name))
+        if entry is None:
+            entry = _payloads[(kind, name)] = [0, 0, 0, 0]
+        entry[0] += 1
+        sample = (entry[0] - 1) % PAYLOAD_SAMPLE == 0
+    if sample:
+        size = _size(obj)
+        with _lock:
+            entry[1] += 1
+            entry[2] += size
+            entry[3] = size
+            _log({"type": "payload", "page": _page(), "kind": kind, "name": name, "bytes": size})
+    return obj
+
+
+def snapshot():
+    """The aggregates recorded so far, as plain dicts."""
+    with _lock:
+        return {
+            "spans": [
+                {"page": p, "stage": s, "name": n, "count": c, "sum": total, "max": top,
+                 "buckets": dict(zip(BUCKETS, buckets))}
+                for (p, s, n), (c, total, top, buckets) in _spans.items()
+            ],
+            "caches": [{"cache": c, "event": e, "count": v} for (c, e), v in _caches.items()],
+            "payloads": [
+                {"kind": k, "name": n, "calls": calls, "samples": samples, "bytes_sum": total, "last_bytes": last}
+                for (k, n), (calls, samples, total, last) in _payloads.items()
+            ],
+        }
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _caches.clear()
+        _payloads.clear()
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def prometheus_text():
+    """The aggregates in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = [
+        "# HELP marketpulse_span_seconds Time spent in instrumented page stages.",
+        "# TYPE marketpulse_span_seconds histogram",
+    ]
+    for s in data["spans"]:
+        labels = dict(page=s["page"], stage=s["stage"], name=s["name"])
+        cumulative = 0
+        for bound, n in s["buckets"].items():
+            cumulative += n
+            lines.append(f"marketpulse_span_seconds_bucket{_labels(**labels, le=bound)} {cumulative}")
+        lines.append(f"marketpulse_span_seconds_bucket{_labels(**labels, le='+Inf')} {s['count']}")
+        lines.append(f"marketpulse_span_seconds_sum{_labels(**labels)} {s['sum']:.6f}")
+        lines.append(f"marketpulse_span_seconds_count{_labels(**labels)} {s['count']}")
+    lines += [
+        "# HELP marketpulse_cache_events_total Cache hits, misses and evictions.",
+        "# TYPE marketpulse_cache_events_total counter",
+    ]
+    for c in data["caches"]:
+        lines.append(f"marketpulse_cache_events_total{_labels(cache=c['cache'], event=c['event'])} {c['count']}")
+    lines += [
+        "# HELP marketpulse_payload_bytes Serialized size of sampled charts and tables.",
+        "# TYPE marketpulse_payload_bytes summary",
+    ]
+    for p in data["payloads"]:
+        labels = _labels(kind=p["kind"], name=p["name"])
+        lines.append(f"marketpulse_payload_bytes_sum{labels} {p['bytes_sum']}")
+        lines.append(f"marketpulse_payload_bytes_count{labels} {p['samples']}")
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = prometheus_text().encode(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(snapshot()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host=HOST):
+    """Serve ``/metrics`` from a background thread (once per process)."""
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((host, port), _Handler)
+        except OSError as e:
+            # e.g. a second worker on the same host; it keeps recording, unexported
+            print(f"Failed to serve metrics on {host}:{port}: {e}")
+            _server = False
+            return None
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(path):
+    """Per-stage count, p50, p95 and max, and per-cache hit rates, from a JSON-lines log."""
+    spans, caches = {}, {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["type"] == "span":
+                spans.setdefault((record["page"], record["stage"], record["name"]), []).append(record["seconds"])
+            elif record["type"] == "cache":
+                events = caches.setdefault(record["cache"], {})
+                events[record["event"]] = events.get(record["event"], 0) + record["n"]
+    lines = [f"{'page':24} {'stage':8} {'name':28} {'count':>6} {'p50':>8} {'p95':>8} {'max':>8}"]
+    for (page, stage, name), values in sorted(spans.items()):
+        lines.append(f"{page:24} {stage:8} {name:28} {len(values):6} "
+                     f"{_percentile(values, 0.5) * 1000:6.1f}ms {_percentile(values, 0.95) * 1000:6.1f}ms "
+                     f"{max(values) * 1000:6.1f}ms")
+    if caches:
+        lines.append(f"\n{'cache':32} {'hits':>7} {'misses':>7} {'evictions':>9} {'hit rate':>8}")
+        for cache, events in sorted(caches.items()):
+            hits, misses = events.get("hit", 0), events.get("miss", 0)
+            rate = hits / (hits + misses) if hits + misses else float("nan")
+            lines.append(f"{cache:32} {hits:7} {misses:7} {events.get('eviction', 0):9} {rate:8.1%}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a MarketPulse metrics log.")
+    parser.add_argument("log", nargs="?", default=LOG_PATH, help="JSON-lines log (default: $MARKETPULSE_METRICS_LOG)")
+    args = parser.parse_args(argv)
+    if not args.log:
+        parser.error("no log given and MARKETPULSE_METRICS_LOG is not set")
+    print(summarize(args.log))
+
+
+if __name__ == "__main__":
+    main()
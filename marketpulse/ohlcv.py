@@ -0,0 +1,157 @@
+"""Local OHLCV cache keyed by symbol and interval.
+
+Each (symbol, interval) is stored once as a full series in the columnar
+store. Refreshes download only the bars after the last stored one, and any
+``period`` is served by slicing the stored series.
+
+Splits and dividends restate the whole adjusted history, so a refresh also
+re-downloads the last complete stored bar; if the provider now reports it
+differently, the symbol's full history is downloaded again rather than
+splicing adjusted bars onto unadjusted ones.
+"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import providers, store
+
+COLUMNS = providers.OHLCV_COLUMNS
+
+# How long a series is trusted before the next read checks for new bars
+REFRESH_SECONDS = 15 * 60
+
+PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=1), "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1), "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6), "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2), "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+_lock = threading.Lock()
+_checked = {}
+
+
+def _dataset(symbol, interval):
+    return f"ohlcv/{interval}/{providers.check_symbol(symbol)}"
+
+
+def load(symbol, interval="1d", columns=None, start=None):
+    """Stored bars for ``symbol`` (optionally from ``start``), or an empty frame."""
+    name = _dataset(symbol, interval)
+    if not store.exists(name):
+        return pd.DataFrame(columns=columns or COLUMNS, index=pd.DatetimeIndex([], name="Date"))
+    return store.read_frame(name, columns=columns, start=start)
+
+
+def stored_symbols(interval="1d", suffix=""):
+    """Symbols with cached bars, optionally only those ending in ``suffix``."""
+    folder = store.path_for(_dataset("X", interval)).parent
+    if not folder.exists():
+        return []
+    return sorted(p.name[:-len(".arrow")] for p in folder.glob(f"*{suffix}.arrow"))
+
+
+def slice_period(df, period):
+    """Bars covering ``period`` (yfinance notation) up to the last stored bar."""
+    if df.empty or period == "max":
+        return df
+    end = df.index.max()
+    if period == "ytd":
+        start = pd.Timestamp(year=end.year, month=1, day=1)
+    else:
+        start = end - PERIOD_OFFSETS[period]
+    return df.loc[start:]
+
+
+def _scheduled():
+    from . import scheduler
+    return scheduler.is_active()
+
+
+def refresh(symbols, interval="1d", max_workers=8, force=False):
+    """Append the missing bars for ``symbols`` and return those that changed.
+
+    Symbols checked within the last ``REFRESH_SECONDS`` are skipped unless
+    ``force`` is set. While the background scheduler is running it keeps
+    stored symbols fresh, so only symbols with no bars yet are fetched.
+    Symbols with the same last stored bar are fetched in one batched
+    provider call.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not force and _scheduled():
+        symbols = [s for s in symbols if not store.exists(_dataset(s, interval))]
+    now = time.monotonic()
+    with _lock:
+        due = [s for s in symbols
+               if force or now - _checked.get((s, interval), -REFRESH_SECONDS) >= REFRESH_SECONDS]
+        for symbol in due:
+            _checked[(symbol, interval)] = now
+    if not due:
+        return []
+
+    stored = {symbol: load(symbol, interval) for symbol in due}
+    by_start = {}
+    for symbol, df in stored.items():
+        # Re-fetch the last stored bar (it may have been a partial one) and the
+        # complete one before it, which tells whether the history was restated
+        start = None if df.empty else df.index[max(len(df) - 2, 0)].strftime("%Y-%m-%d")
+        by_start.setdefault(start, []).append(symbol)
+
+    changed, restated = [], []
+    for start, group in by_start.items():
+        fetched = _fetch(group, start, interval, max_workers)
+        for symbol, new in fetched.items():
+            old = stored[symbol]
+            if _restated(old, new):
+                restated.append(symbol)
+                continue
+            merged = new if old.empty else pd.concat([old[old.index < new.index.min()], new])
+            if old.empty or not merged.equals(old):
+                store.write_frame(_dataset(symbol, interval), merged, index_name="Date")
+                changed.append(symbol)
+    if restated:
+        for symbol, new in _fetch(restated, None, interval, max_workers).items():
+            store.write_frame(_dataset(symbol, interval), new, index_name="Date")
+            changed.append(symbol)
+    return changed
+
+
+def _fetch(symbols, start, interval, max_workers):
+    try:
+        return providers.get_provider().price_history(
+            symbols, start=start, interval=interval, max_workers=max_workers)
+    except Exception as e:
+        print(f"OHLCV download failed for {symbols}: {e}")
+        with _lock:
+            for symbol in symbols:
+                _checked.pop((symbol, interval), None)
+        return {}
+
+
+def _restated(old, new):
+    # The first re-fetched bar is the last complete stored one; a split or
+    # dividend adjustment shows up as different values for it
+    if len(old) < 2 or new.empty:
+        return False
+    date = old.index[-2]
+    if date not in new.index:
+        return True
+    columns = [c for c in COLUMNS if c in old.columns and c in new.columns]
+    before = old.loc[date, columns].to_numpy(dtype=float)
+    after = new.loc[date, columns].to_numpy(dtype=float)
+    return not np.allclose(before, after, rtol=1e-6, equal_nan=True)
+
+
+def get_history(symbol, period="1y", interval="1d"):
+    """Bars for ``symbol`` over ``period``, fetching only what is missing."""
+    refresh([symbol], interval)
+    return slice_period(load(symbol, interval), period)
+
+
+def get_many(symbols, period="1y", interval="1d", max_workers=8):
+    """Like ``get_history`` for several symbols, refreshed in one batch."""
+    refresh(symbols, interval, max_workers=max_workers)
+    return {symbol: slice_period(load(symbol, interval), period) for symbol in symbols}
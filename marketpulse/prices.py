@@ -0,0 +1,39 @@
+"""US price panel backed by the columnar store."""
+import pandas as pd
+
+from . import store
+
+PRICE_PICKLE = store.ROOT / "price_data.pkl"
+DATASET = "price_panel"
+
+
+def _flatten(df):
+    df = df.copy()
+    df.index = pd.to_datetime(df.index)
+
+    # Flatten MultiIndex
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = ['_'.join(map(str, col)).strip() for col in df.columns]
+    else:
+        df.columns = [str(col).strip() for col in df.columns]
+    return df
+
+
+def _describe(df):
+    # Stored with the frame so the coverage filter never has to scan the data
+    return {"coverage": {col: float(share) for col, share in df.notna().mean().items()}}
+
+
+def load_price_panel(columns=None, start=None, end=None, min_coverage=0.7):
+    """Load the flattened price panel.
+
+    Only columns whose non-NaN share exceeds ``min_coverage`` are returned,
+    optionally narrowed to ``columns`` and an inclusive ``start``/``end`` range.
+    """
+    store.import_pickle(DATASET, PRICE_PICKLE, _flatten, describe=_describe, index_name="Date")
+    coverage = store.read_metadata(DATASET)["coverage"]
+    keep = [col for col, share in coverage.items() if share > min_coverage]
+    if columns is not None:
+        wanted = set(columns)
+        keep = [col for col in keep if col in wanted]
+    return store.read_frame(DATASET, columns=keep, start=start, end=end)
@@ -0,0 +1,111 @@
+"""Startup profile of the Streamlit pages.
+
+``python -m marketpulse.profile_startup [page ...]`` runs each page once in
+a fresh interpreter (as a new Streamlit worker would) through Streamlit's
+``AppTest`` harness, with ``-X importtime``. For each page it reports:
+
+- spawn: interpreter start plus importing Streamlit
+- first run: executing the page script once, up to its first full render
+- imports: time spent importing modules during that run, and the
+  top-level packages that cost the most
+
+Use ``MARKETPULSE_PROVIDER=replay`` so network calls do not distort the
+numbers. ``--json`` prints the raw measurements.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from . import store
+
+PAGES_DIR = store.ROOT / "pages"
+MARKER = "-- marketpulse page start --"
+
+_RUNNER = f"""
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+sys.stderr.write({MARKER!r} + "\\n")
+at = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+t2 = time.perf_counter()
+print(json.dumps({{"streamlit_import": t1 - t0, "first_run": t2 - t1,
+                  "exceptions": [str(e.value) for e in at.exception]}}))
+"""
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def _parse_imports(stderr):
+    # Cumulative microseconds of each top-level import made by the page
+    page, totals = False, {}
+    for line in stderr.splitlines():
+        if line.strip() == MARKER:
+            page = True
+            continue
+        match = _IMPORT_LINE.match(line)
+        if not page or not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        if len(indent) == 1:
+            root = name.split(".")[0]
+            totals[root] = totals.get(root, 0) + int(cumulative)
+    return totals
+
+
+def profile_page(path, env=None):
+    """Measure one page in a fresh interpreter and return a dict of timings."""
+    env = {**os.environ, **(env or {})}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(store.ROOT), env.get("PYTHONPATH")]))
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _RUNNER, str(path)],
+                          capture_output=True, text=True, env=env, cwd=store.ROOT)
+    wall = time.perf_counter() - started
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["no output"]
+        return {"page": Path(path).name, "error": tail[0], "wall": wall}
+    result = json.loads(lines[-1])
+    imports = _parse_imports(proc.stderr)
+    result.update({
+        "page": Path(path).name,
+        "wall": wall,
+        "spawn": wall - result["first_run"],
+        "page_imports": sum(imports.values()) / 1e6,
+        "top_imports": sorted(((name, us / 1e6) for name, us in imports.items()),
+                              key=lambda item: -item[1])[:8],
+    })
+    return result
+
+
+def report(results):
+    lines = [f"{'page':32} {'spawn':>7} {'first run':>10} {'imports':>8}  heaviest imports"]
+    for r in results:
+        if "error" in r:
+            lines.append(f"{r['page']:32} failed: {r['error']}")
+            continue
+        heavy = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in r["top_imports"][:4])
+        lines.append(f"{r['page']:32} {r['spawn']:6.2f}s {r['first_run']:9.2f}s {r['page_imports']:7.2f}s  {heavy}")
+        if r["exceptions"]:
+            lines.append(f"{'':32} exceptions: {r['exceptions']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the startup of the MarketPulse pages.")
+    parser.add_argument("pages", nargs="*", help="page scripts (default: home.py and pages/*.py)")
+    parser.add_argument("--json", action="store_true", help="print the measurements as JSON")
+    args = parser.parse_args(argv)
+
+    pages = args.pages or [store.ROOT / "home.py", *sorted(PAGES_DIR.glob("*.py"))]
+    results = [profile_page(Path(page).resolve()) for page in pages]
+    print(json.dumps(results, indent=2) if args.json else report(results))
+
+
+if __name__ == "__main__":
+    main()
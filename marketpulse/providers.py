@@ -0,0 +1,276 @@
+"""Market-data providers.
+
+Every external call the app makes goes through a ``MarketDataProvider``:
+price history, company fundamentals, FRED macro series and CFTC COT
+reports. ``LiveProvider`` talks to yfinance, FRED and the CFTC;
+``ReplayProvider`` serves the same calls from files on disk so pages can be
+benchmarked and load-tested without the network. ``RecordingProvider``
+captures live responses in the replay layout.
+
+The active provider is chosen by ``MARKETPULSE_PROVIDER``: ``live``,
+``replay`` (read from ``MARKETPULSE_REPLAY_DIR``) or ``record`` (live, with
+every response also written to ``MARKETPULSE_REPLAY_DIR``).
+"""
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import pandas as pd
+
+from . import store
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+NSE_EQUITY_LIST = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
+# Replay files when MARKETPULSE_REPLAY_DIR is not set (``python -m marketpulse.fixtures`` fills it)
+REPLAY_DIR = store.ROOT / "fixtures"
+# Tickers as Yahoo writes them (SBIN.NS, ^NSEI, M&M.NS, EURUSD=X, BRK-B); symbols end
+# up in file names, so anything else (path separators in particular) is refused
+SYMBOL_PATTERN = re.compile(r"[A-Z0-9^.&=_-]+")
+
+
+class MarketDataProvider(ABC):
+    """Interface implemented by every data source."""
+
+    @abstractmethod
+    def price_history(self, symbols, start=None, interval="1d", max_workers=8):
+        """Return ``{symbol: OHLCV frame}`` with bars from ``start`` (or all history)."""
+
+    @abstractmethod
+    def fundamentals(self, symbol):
+        """Return a dict of company metadata in yfinance ``info`` keys."""
+
+    @abstractmethod
+    def macro_series(self, series_id, observation_start=None):
+        """Return a FRED series indexed by observation date."""
+
+    @abstractmethod
+    def cot_report(self, year, report_type="legacy_fut"):
+        """Return one year of a raw CFTC report."""
+
+    @abstractmethod
+    def universe(self, exchange="NSE"):
+        """Return the listed equity symbols of ``exchange`` (without suffix)."""
+
+
+def check_symbol(symbol):
+    """Return ``symbol`` if it is a valid ticker, else raise ValueError."""
+    if not isinstance(symbol, str) or not SYMBOL_PATTERN.fullmatch(symbol) or symbol in (".", ".."):
+        raise ValueError(f"Invalid symbol {symbol!r}")
+    return symbol
+
+
+def _normalize_bars(df):
+    df = df[[c for c in OHLCV_COLUMNS if c in df.columns]].dropna(how="all")
+    if df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+    df.index.name = "Date"
+    return df
+
+
+def read_cot_file(directory, year):
+    """Read the first ``*.txt`` in ``directory`` whose name contains ``year``."""
+    matches = sorted(Path(directory).glob(f"*{year}*.txt"))
+    if not matches:
+        raise FileNotFoundError(f"No COT file for {year} in {directory}")
+    return pd.read_csv(matches[0], low_memory=False)
+
+
+class LiveProvider(MarketDataProvider):
+    """yfinance for prices and fundamentals, FRED for macro, CFTC for COT."""
+
+    def __init__(self, fred_api_key=None):
+        from dotenv import load_dotenv
+        load_dotenv()
+        self.fred_api_key = fred_api_key or os.environ.get("FRED_API_KEY")
+        self._fred = None
+
+    def price_history(self, symbols, start=None, interval="1d", max_workers=8):
+        import yfinance as yf
+
+        # One batched request; yfinance fans the symbols out over its own
+        # thread pool and shared HTTP session
+        raw = yf.download(
+            list(symbols), start=start, period=None if start is not None else "max",
+            interval=interval, group_by="ticker", auto_adjust=True, actions=False,
+            threads=max_workers, progress=False,
+        )
+        frames = {}
+        for symbol in symbols:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if symbol not in raw.columns.get_level_values(0):
+                    continue
+                df = raw[symbol]
+            else:
+                df = raw
+            df = _normalize_bars(df)
+            if not df.empty:
+                frames[symbol] = df
+        return frames
+
+    def fundamentals(self, symbol):
+        import yfinance as yf
+        return yf.Ticker(symbol).info
+
+    @property
+    def fred(self):
+        if self._fred is None:
+            if not self.fred_api_key:
+                raise RuntimeError("FRED API Key not found. Please set FRED_API_KEY in your .env file.")
+            from fredapi import Fred
+            self._fred = Fred(api_key=self.fred_api_key)
+        return self._fred
+
+    def macro_series(self, series_id, observation_start=None):
+        return self.fred.get_series(series_id, observation_start=observation_start)
+
+    def cot_report(self, year, report_type="legacy_fut"):
+        from cot_reports import cot_year
+        return cot_year(year, cot_report_type=report_type, store_txt=False, verbose=False)
+
+    def universe(self, exchange="NSE"):
+        if exchange != "NSE":
+            raise ValueError(f"Unsupported exchange: {exchange}")
+        listing = pd.read_csv(NSE_EQUITY_LIST, storage_options={"User-Agent": "Mozilla/5.0"})
+        listing.columns = [c.strip() for c in listing.columns]
+        return listing.loc[listing["SERIES"].str.strip() == "EQ", "SYMBOL"].str.strip().tolist()
+
+
+class ReplayProvider(MarketDataProvider):
+    """Serves recorded data from ``root``.
+
+    Layout::
+
+        prices/<interval>/<symbol>.csv     OHLCV with a Date column
+        fundamentals/<symbol>.json
+        macro/<series_id>.csv              date,value
+        cot/<report_type>/<...year...>.txt raw CFTC text files
+        universe/<exchange>.txt            one symbol per line
+
+    ``latency`` adds a fixed delay per call to model a remote feed
+    reproducibly.
+    """
+
+    def __init__(self, root, latency=0.0):
+        self.root = Path(root)
+        self.latency = latency
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def price_history(self, symbols, start=None, interval="1d", max_workers=8):
+        self._wait()
+        frames = {}
+        for symbol in symbols:
+            path = self.root / "prices" / interval / f"{check_symbol(symbol)}.csv"
+            if not path.exists():
+                continue
+            df = _normalize_bars(pd.read_csv(path, index_col="Date", parse_dates=["Date"]))
+            if start is not None:
+                df = df.loc[pd.Timestamp(start):]
+            if not df.empty:
+                frames[symbol] = df
+        return frames
+
+    def fundamentals(self, symbol):
+        self._wait()
+        path = self.root / "fundamentals" / f"{check_symbol(symbol)}.json"
+        return json.loads(path.read_text()) if path.exists() else {}
+
+    def macro_series(self, series_id, observation_start=None):
+        self._wait()
+        df = pd.read_csv(self.root / "macro" / f"{check_symbol(series_id)}.csv", index_col=0, parse_dates=True)
+        series = df.iloc[:, 0].rename(None)
+        if observation_start is not None:
+            series = series.loc[pd.Timestamp(observation_start):]
+        return series
+
+    def cot_report(self, year, report_type="legacy_fut"):
+        self._wait()
+        return read_cot_file(self.root / "cot" / report_type, year)
+
+    def universe(self, exchange="NSE"):
+        self._wait()
+        path = self.root / "universe" / f"{exchange}.txt"
+        return path.read_text().split() if path.exists() else []
+
+
+class RecordingProvider(MarketDataProvider):
+    """Passes calls to ``inner`` and saves each response in the replay layout."""
+
+    def __init__(self, inner, root):
+        self.inner = inner
+        self.root = Path(root)
+
+    def _path(self, *parts):
+        path = self.root.joinpath(*parts)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def price_history(self, symbols, start=None, interval="1d", max_workers=8):
+        frames = self.inner.price_history(symbols, start=start, interval=interval, max_workers=max_workers)
+        for symbol, df in frames.items():
+            path = self._path("prices", interval, f"{check_symbol(symbol)}.csv")
+            if path.exists():
+                old = pd.read_csv(path, index_col="Date", parse_dates=["Date"])
+                df = pd.concat([old[old.index < df.index.min()], df])
+            df.to_csv(path)
+        return frames
+
+    def fundamentals(self, symbol):
+        info = self.inner.fundamentals(symbol)
+        self._path("fundamentals", f"{check_symbol(symbol)}.json").write_text(json.dumps(info, default=str))
+        return info
+
+    def macro_series(self, series_id, observation_start=None):
+        series = self.inner.macro_series(series_id, observation_start=observation_start)
+        path = self._path("macro", f"{check_symbol(series_id)}.csv")
+        if path.exists() and observation_start is not None and not series.empty:
+            old = pd.read_csv(path, index_col=0, parse_dates=True).iloc[:, 0]
+            series = pd.concat([old[old.index < series.index.min()], series])
+        series.rename("value").to_csv(path, index_label="date")
+        return series
+
+    def cot_report(self, year, report_type="legacy_fut"):
+        df = self.inner.cot_report(year, report_type=report_type)
+        df.to_csv(self._path("cot", report_type, f"{year}.txt"), index=False)
+        return df
+
+    def universe(self, exchange="NSE"):
+        symbols = self.inner.universe(exchange)
+        self._path("universe", f"{exchange}.txt").write_text("\n".join(symbols))
+        return symbols
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """The process-wide provider, built from the environment on first use."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            kind = os.environ.get("MARKETPULSE_PROVIDER", "live")
+            root = os.environ.get("MARKETPULSE_REPLAY_DIR", REPLAY_DIR)
+            if kind == "replay":
+                _provider = ReplayProvider(root, latency=float(os.environ.get("MARKETPULSE_REPLAY_LATENCY", 0)))
+            elif kind == "record":
+                _provider = RecordingProvider(LiveProvider(), root)
+            elif kind == "live":
+                _provider = LiveProvider()
+            else:
+                raise ValueError(f"Unknown MARKETPULSE_PROVIDER {kind!r}; expected live, replay or record")
+        return _provider
+
+
+def set_provider(provider):
+    """Replace the process-wide provider (e.g. with a ``ReplayProvider`` in benchmarks)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
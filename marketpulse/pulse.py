@@ -0,0 +1,195 @@
+"""Market Pulse score per asset and date.
+
+Each score blends components scaled to [-1, 1]:
+
+- trend: distance of the close from its 200-day SMA
+- momentum: 63-day return relative to its volatility
+- positioning: speculators' COT ``Long %`` against its last three years
+- breadth: share of stored NSE stocks above their 50-day SMA (NSE only)
+- macro: 10-year yield changes and CPI inflation, shared by every asset
+
+into ``score = 50 + 50 * weighted mean`` of the components available on
+that date. The scores are computed in batch and stored as one row per
+(date, asset); an update only computes the dates after the last stored
+one, reading just enough history to warm the indicators up.
+"""
+import numpy as np
+import pandas as pd
+
+from . import cot, indicators, macro, ohlcv, prices, scanner, store
+
+SCORES = "pulse/scores"
+LATEST = "pulse/latest"
+
+WEIGHTS = {"trend": 0.3, "momentum": 0.25, "positioning": 0.2, "breadth": 0.25, "macro": 0.15}
+COMPONENTS = list(WEIGHTS)
+
+NSE = "NSE"
+NSE_INDEX = "^NSEI"
+
+# History read before the first date being scored: covers the 156-week COT
+# window, the 200-day SMA and the 12-month CPI change
+LOOKBACK = pd.DateOffset(years=4)
+
+TREND_BAND = 0.10
+MOMENTUM_WINDOW = 63
+POSITIONING_WEEKS = 156
+
+# FRED dates monthly observations at the start of the month; they are only
+# published around the middle of the following month
+MACRO_LAG = pd.DateOffset(months=1, days=14)
+
+
+def _as_of(frame, dates):
+    # Latest value known on each of ``dates``
+    return frame.reindex(frame.index.union(dates)).ffill().reindex(dates)
+
+
+def _price_components(close):
+    values = indicators.compute_many(close, [("sma", 200), ("vol", MOMENTUM_WINDOW)])
+    trend = ((close / values[("sma", 200)] - 1) / TREND_BAND).clip(-1, 1)
+    move = close.pct_change(MOMENTUM_WINDOW, fill_method=None)
+    risk = values[("vol", MOMENTUM_WINDOW)] / 100 * (MOMENTUM_WINDOW / indicators.TRADING_DAYS) ** 0.5
+    momentum = np.tanh(move / risk / 2)
+    return {"trend": trend, "momentum": momentum}
+
+
+def _per_asset_components(close):
+    # The panel mixes calendars (crypto trades at weekends), so each asset's
+    # windows run over its own bars rather than over the panel's rows
+    parts = [_price_components(close[[asset]].dropna()) for asset in close.columns]
+    return {name: pd.concat([part[name] for part in parts], axis=1).reindex(close.index)
+            for name in ("trend", "momentum")}
+
+
+def _positioning(start, dates):
+    z = cot.positioning_zscore(POSITIONING_WEEKS, start=start)
+    if z.empty:
+        return pd.DataFrame(index=dates)
+    # Weekly labels close the week the report covers, so the as-of join
+    # never uses a report before it was published
+    return np.tanh(_as_of(z, dates) / 2)
+
+
+def macro_component(start=None):
+    """Monthly macro backdrop from FRED: falling yields and tame inflation score high.
+
+    Dated by observation; apply ``MACRO_LAG`` before joining onto prices.
+    """
+    try:
+        series = macro.load_many(["GS10", "CPIAUCSL"])
+    except Exception as e:
+        print(f"Macro series unavailable: {e}")
+        return pd.Series(dtype=float)
+    if start is not None:
+        first = pd.Timestamp(start) - pd.DateOffset(years=1)
+        series = {k: v.loc[first:] for k, v in series.items()}
+    rates = -np.tanh(series["GS10"].diff(3) / 0.5)
+    inflation = -np.tanh((series["CPIAUCSL"].pct_change(12, fill_method=None) * 100 - 2.5) / 2)
+    return pd.concat([rates, inflation], axis=1).mean(axis=1).dropna()
+
+
+def _stack(components, close):
+    present = close.notna().stack()
+    table = pd.DataFrame({name: frame.reindex_like(close).stack() for name, frame in components.items()})
+    table = table[present.reindex(table.index, fill_value=False)]
+    table.index.names = ["Date", "Asset"]
+    return table.reset_index()
+
+
+def _asset_scores(start):
+    close = prices.load_price_panel(start=start, min_coverage=0)
+    close.columns = [c.split("_", 1)[0] for c in close.columns]
+    components = _per_asset_components(close)
+    components["positioning"] = _positioning(start, close.index)
+    return _stack(components, close)
+
+
+def _nse_scores(start):
+    index = ohlcv.load(NSE_INDEX, columns=["Close"], start=start)["Close"]
+    if index.empty:
+        return pd.DataFrame(columns=["Date", "Asset"])
+    close = index.to_frame(NSE)
+    components = _price_components(close)
+    stocks = scanner.load_panel(ohlcv.stored_symbols(suffix=scanner.SUFFIX), fields=("Close",),
+                                lookback=None, start=start)["Close"]
+    if not stocks.empty:
+        above = stocks > indicators.compute_many(stocks, [("sma", 50)])[("sma", 50)]
+        counted = above.where(stocks.notna()).notna().sum(axis=1)
+        share = above.sum(axis=1) / counted.replace(0, np.nan)
+        components["breadth"] = _as_of((share * 2 - 1).to_frame(NSE), close.index)
+    return _stack(components, close)
+
+
+def compute_scores(since=None):
+    """Score every asset on each date after ``since`` (all history when None)."""
+    start = None if since is None else pd.Timestamp(since) - LOOKBACK
+    table = pd.concat([_asset_scores(start), _nse_scores(start)], ignore_index=True)
+    table = table.reindex(columns=["Date", "Asset", *COMPONENTS])
+    dates = pd.DatetimeIndex(table["Date"].unique())
+    table["macro"] = table["Date"].map(macro.align({"macro": macro_component(start)}, dates, lag=MACRO_LAG)["macro"])
+
+    values = table[COMPONENTS].to_numpy(dtype=float)
+    weights = np.array([WEIGHTS[c] for c in COMPONENTS])
+    have = ~np.isnan(values)
+    with np.errstate(invalid="ignore"):
+        blend = (np.where(have, values, 0.0) * weights).sum(axis=1) / (have * weights).sum(axis=1)
+    table["score"] = 50 + 50 * blend
+    # A score needs at least the asset's own trend
+    table = table[table["trend"].notna()]
+    if since is not None:
+        table = table[table["Date"] > pd.Timestamp(since)]
+    return table.sort_values(["Date", "Asset"], ignore_index=True)
+
+
+def _save(table):
+    store.write_frame(SCORES, table, sort_by="Date",
+                      metadata={"last_date": table["Date"].max().isoformat()})
+    latest = table.drop_duplicates(subset=["Asset"], keep="last")
+    store.write_frame(LATEST, latest.sort_values("score", ascending=False, ignore_index=True))
+
+
+def update_scores():
+    """Score the dates not yet stored and return the number of new rows.
+
+    Each asset keeps its own last stored date, so an asset whose prices or
+    COT week arrive later than the others still gets exactly its new rows.
+    """
+    if not store.exists(SCORES):
+        table = compute_scores()
+        if not table.empty:
+            _save(table)
+        return len(table)
+
+    last = store.read_frame(SCORES, columns=["Date", "Asset"]).groupby("Asset")["Date"].max()
+    since = last.min()
+    new = compute_scores(since)
+    new = new[new["Date"] > new["Asset"].map(last).fillna(since)]
+    if new.empty:
+        return 0
+    _save(pd.concat([load_scores(), new], ignore_index=True))
+    return len(new)
+
+
+def last_date():
+    """Last scored date, or None before the first build."""
+    if not store.exists(SCORES):
+        return None
+    return pd.Timestamp(store.read_metadata(SCORES)["last_date"])
+
+
+def load_scores(assets=None, start=None, end=None):
+    """Stored scores, optionally for some ``assets`` and an inclusive date range."""
+    if not store.exists(SCORES):
+        return pd.DataFrame(columns=["Date", "Asset", *COMPONENTS, "score"])
+    table = store.read_frame(SCORES, start=start, end=end)
+    if assets is not None:
+        table = table[table["Asset"].isin(assets)].reset_index(drop=True)
+    return table
+
+
+def load_latest():
+    """Latest score per asset, highest first."""
+    if not store.exists(LATEST):
+        return pd.DataFrame(columns=["Date", "Asset", *COMPONENTS, "score"])
+    return store.read_frame(LATEST)
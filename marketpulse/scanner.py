@@ -0,0 +1,254 @@
+"""Universe screener over a symbol x date panel.
+
+Features for every symbol are computed with vectorized operations on wide
+frames (one column per symbol) and stored as one row per symbol, tagged
+with the last bar they cover. A scan is then one vectorized filter over
+that table, so it stays fast for thousands of symbols; the table is only
+rebuilt when a new bar arrives.
+
+Filters are typed by users, so they are parsed rather than handed to
+``DataFrame.query`` (which can call methods): only column names, numbers,
+comparisons, ``and``/``or`` and ``+ - * /`` are accepted.
+"""
+import ast
+import operator
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from . import indicators, ohlcv, providers, store
+
+UNIVERSE = "universe/NSE"
+FEATURES = "scanner/features"
+SUFFIX = ".NS"
+
+# One year of bars plus headroom for the 200-day SMA and volatility ranks
+LOOKBACK_BARS = 520
+
+PRESETS = {
+    "Above 50-day SMA": "close > sma_50",
+    "Above 200-day SMA": "close > sma_200",
+    "50-day SMA above 200-day SMA": "sma_50 > sma_200",
+    "Volatility in bottom 20% of its year": "vol_pct <= 20",
+    "Volatility in top 20% of its year": "vol_pct >= 80",
+    "Within 5% of 52-week high": "dist_52w_high >= -5",
+    "Volume spike (2x 20-day average)": "volume_ratio >= 2",
+    "Up over 20 days": "return_20d > 0",
+}
+
+
+def load_universe(refresh=False):
+    """NSE equity symbols (without suffix), cached in the store."""
+    if refresh or not store.exists(UNIVERSE):
+        symbols = providers.get_provider().universe("NSE")
+        if symbols:
+            store.write_frame(UNIVERSE, pd.DataFrame({"Symbol": sorted(symbols)}))
+    if not store.exists(UNIVERSE):
+        return []
+    return store.read_frame(UNIVERSE)["Symbol"].tolist()
+
+
+def _load_chunk(symbols, fields, lookback, start):
+    frames = {field: {} for field in fields}
+    for symbol in symbols:
+        bars = ohlcv.load(symbol, columns=list(fields), start=start)
+        if lookback:
+            bars = bars.iloc[-lookback:]
+        if bars.empty:
+            continue
+        for field in fields:
+            frames[field][symbol] = bars[field]
+    return {field: pd.DataFrame(cols) for field, cols in frames.items()}
+
+
+def _chunks(items, n):
+    size = max(1, -(-len(items) // n))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def load_panel(symbols, fields=("Close", "Volume"), lookback=LOOKBACK_BARS, start=None, max_workers=None):
+    """Wide date x symbol frames per field, read from the OHLCV cache in parallel.
+
+    Each symbol contributes its last ``lookback`` bars (all when None) from
+    ``start`` onwards. Chunks are read on threads (the reads are memory-mapped
+    and release the GIL), not forked processes, since this also runs inside
+    the threaded Streamlit server.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    chunks = _chunks(list(symbols), max_workers * 4)
+    if max_workers == 1 or len(chunks) == 1:
+        parts = [_load_chunk(chunk, fields, lookback, start) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            n = len(chunks)
+            parts = list(pool.map(_load_chunk, chunks, [fields] * n, [lookback] * n, [start] * n))
+    panel = {}
+    for field in fields:
+        frames = [part[field] for part in parts if not part[field].empty]
+        panel[field] = pd.concat(frames, axis=1).sort_index() if frames else pd.DataFrame()
+    return panel
+
+
+def _percentile_of_last(values, window):
+    # Percentile rank (0-100) of each column's last value within its trailing window
+    tail = values.iloc[-window:]
+    last = tail.iloc[-1]
+    valid = tail.notna().sum()
+    below = (tail.lt(last, axis=1)).sum() + 0.5 * (tail.eq(last, axis=1)).sum()
+    return (below / valid * 100).where(last.notna())
+
+
+def last_valid_dates(frame):
+    """Date of the last non-missing value in each column."""
+    present = frame.notna().to_numpy()
+    from_end = present[::-1].argmax(axis=0)
+    dates = frame.index.to_numpy()[len(frame) - 1 - from_end]
+    return pd.Series(np.where(present.any(axis=0), dates, np.datetime64("NaT")), index=frame.columns)
+
+
+def _align_last_bars(frame, lag):
+    # Shift every column down by its ``lag`` rows, so its last bar lands on the final row
+    values = frame.to_numpy(dtype=float)
+    idx = np.arange(len(frame))[:, None] - lag[None, :]
+    aligned = values[np.maximum(idx, 0), np.arange(values.shape[1])]
+    aligned[idx < 0] = np.nan
+    return pd.DataFrame(aligned, index=frame.index, columns=frame.columns)
+
+
+def compute_features(close, volume):
+    """One row of screening features per symbol from wide close/volume frames.
+
+    The panel is ragged (symbols that stopped trading end early), so every
+    symbol is first shifted to end at its own last close; its features then
+    describe that bar, tagged in ``last_bar``.
+    """
+    last_bar = last_valid_dates(close)
+    lag = close.notna().to_numpy()[::-1].argmax(axis=0)
+    close = _align_last_bars(close, lag)
+    volume = _align_last_bars(volume.reindex(columns=close.columns), lag)
+    last = close.iloc[-1]
+    values = indicators.compute_many(close, [("sma", 20), ("sma", 50), ("sma", 200), ("vol", 20)])
+    sma = {w: values[("sma", w)].iloc[-1] for w in (20, 50, 200)}
+    vol = values[("vol", 20)]
+    high = close.iloc[-252:].max()
+    avg_volume = volume.iloc[-21:-1].mean().where(volume.iloc[-21:-1].notna().sum() == 20)
+    features = pd.DataFrame({
+        "close": last,
+        "sma_20": sma[20],
+        "sma_50": sma[50],
+        "sma_200": sma[200],
+        "volatility_20d": vol.iloc[-1],
+        "vol_pct": _percentile_of_last(vol, 252),
+        "dist_52w_high": (last / high - 1) * 100,
+        "volume": volume.iloc[-1],
+        "volume_ratio": volume.iloc[-1] / avg_volume,
+        "return_1d": close.pct_change(1, fill_method=None).iloc[-1] * 100,
+        "return_5d": close.pct_change(5, fill_method=None).iloc[-1] * 100,
+        "return_20d": close.pct_change(20, fill_method=None).iloc[-1] * 100,
+        "last_bar": last_bar,
+    })
+    features.index.name = "Symbol"
+    return features.replace([np.inf, -np.inf], np.nan)
+
+
+def build_features(symbols=None, max_workers=None):
+    """Recompute and store the feature table for ``symbols`` (default: the universe).
+
+    ``max_workers`` threads read the bars; the features themselves are a
+    few vectorized passes over the whole panel in this process.
+    """
+    if symbols is None:
+        symbols = [f"{s}{SUFFIX}" for s in load_universe()]
+    panel = load_panel(symbols, max_workers=max_workers)
+    close, volume = panel["Close"], panel["Volume"]
+    if close.empty:
+        return pd.DataFrame()
+    features = compute_features(close, volume)
+    features.index = features.index.str.removesuffix(SUFFIX)
+    last_bar = close.index.max()
+    store.write_frame(FEATURES, features, index_name="Symbol",
+                      metadata={"last_bar": last_bar.isoformat(), "symbols": len(features)})
+    return features
+
+
+def features_last_bar():
+    """Last bar covered by the stored feature table, or None."""
+    if not store.exists(FEATURES):
+        return None
+    return pd.Timestamp(store.read_metadata(FEATURES)["last_bar"])
+
+
+def load_features():
+    if not store.exists(FEATURES):
+        return pd.DataFrame()
+    return store.read_frame(FEATURES)
+
+
+_COMPARISONS = {
+    ast.Gt: operator.gt, ast.GtE: operator.ge, ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+_ARITHMETIC = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+_UNARY = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+
+def _evaluate(node, features):
+    # Walks the whitelisted subset of Python expressions; anything else is rejected
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, features)
+    if isinstance(node, ast.BoolOp):
+        values = [_evaluate(v, features) for v in node.values]
+        combine = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+        result = values[0]
+        for value in values[1:]:
+            result = combine(result, value)
+        return result
+    if isinstance(node, ast.Compare):
+        left, result = _evaluate(node.left, features), True
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _COMPARISONS:
+                raise ValueError(f"unsupported comparison {type(op).__name__}")
+            right = _evaluate(comparator, features)
+            result = result & _COMPARISONS[type(op)](left, right)
+            left = right
+        return result
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+        return _ARITHMETIC[type(node.op)](_evaluate(node.left, features), _evaluate(node.right, features))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY:
+        return _UNARY[type(node.op)](_evaluate(node.operand, features))
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in features.columns:
+            raise ValueError(f"unknown column {node.id!r}")
+        return features[node.id]
+    raise ValueError(f"{type(node).__name__} is not allowed in a filter")
+
+
+def filter_mask(features, expression):
+    """Boolean mask of the rows of ``features`` matching ``expression``.
+
+    ``expression`` may use column names, numbers, comparisons, ``and``/``or``,
+    ``+ - * /`` and parentheses; anything else raises ValueError.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"cannot parse {expression!r}: {e.msg}") from None
+    mask = _evaluate(tree, features)
+    if not isinstance(mask, pd.Series) or mask.dtype != bool:
+        raise ValueError(f"{expression!r} is not a condition")
+    return mask
+
+
+def scan(features, expressions, sort_by="return_20d", ascending=False):
+    """Symbols matching every expression in ``expressions`` (see ``filter_mask``)."""
+    result = features
+    for expression in expressions:
+        if expression.strip():
+            result = result[filter_mask(result, expression)]
+    if sort_by in result.columns:
+        result = result.sort_values(sort_by, ascending=ascending)
+    return result
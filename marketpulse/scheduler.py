@@ -0,0 +1,285 @@
+"""Background refresh of the shared store.
+
+Run ``python -m marketpulse.scheduler`` next to the Streamlit server. Each
+dataset is refreshed on its own cadence and written atomically, so pages
+only ever read finished data:
+
+- bars: daily NSE bars, after the close (16:30 IST, weekdays)
+- cot: the weekly COT report, and every report type in the partitioned
+  COT store, on release day (Friday 15:30 ET)
+- fundamentals: the snapshot of the NSE universe, daily (18:00 IST); only
+  symbols with an expired field are fetched
+- macro: the FRED series, monthly (the 15th, after the CPI release)
+- derived: scanner features, setups and pulse scores, after any of the above
+
+Every job records its last run, duration, outcome and how old its newest
+data is in ``scheduler/status.json`` under the data directory; the file
+also carries a heartbeat. While the heartbeat is fresh, pages skip their
+own refreshes of data the scheduler already maintains.
+"""
+import argparse
+import json
+import os
+import time
+import traceback
+
+import pandas as pd
+
+from . import store
+
+STATUS = "scheduler/status"
+POLL_SECONDS = 60
+# A failed job is retried after this long rather than on every check
+RETRY_SECONDS = 15 * 60
+
+# Tracked even before any page has asked for them
+WATCHLIST = [
+    "^NSEI", "^BSESN", "^NSEBANK",
+    "RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS", "SBIN.NS", "KOTAKBANK.NS",
+]
+
+
+def daily(hour, minute, tz, weekdays=range(5)):
+    """Cadence firing at ``hour:minute`` local time on ``weekdays`` (Monday is 0)."""
+    weekdays = set(weekdays)
+
+    def last_slot(now):
+        local = now.tz_convert(tz)
+        slot = local.normalize() + pd.Timedelta(hours=hour, minutes=minute)
+        while slot > local or slot.weekday() not in weekdays:
+            slot = (slot - pd.Timedelta(days=1)).normalize() + pd.Timedelta(hours=hour, minutes=minute)
+        return slot.tz_convert("UTC")
+
+    return last_slot
+
+
+def weekly(weekday, hour, minute, tz):
+    return daily(hour, minute, tz, weekdays=[weekday])
+
+
+def monthly(day, hour, minute, tz):
+    def last_slot(now):
+        local = now.tz_convert(tz)
+        slot = local.replace(day=day, hour=hour, minute=minute, second=0, microsecond=0, nanosecond=0)
+        if slot > local:
+            slot = slot - pd.DateOffset(months=1)
+        return slot.tz_convert("UTC")
+
+    return last_slot
+
+
+class Job:
+    """A named refresh with either a cadence or upstream jobs it follows.
+
+    ``run`` does the work; ``as_of`` returns the date of the newest data the
+    job maintains, used to report staleness.
+    """
+
+    def __init__(self, name, run, cadence=None, after=(), as_of=None):
+        self.name = name
+        self.run = run
+        self.cadence = cadence
+        self.after = tuple(after)
+        self.as_of = as_of
+
+    def is_due(self, now, jobs_status):
+        state = jobs_status.get(self.name, {})
+        if state.get("status") == "failed" and (now - pd.Timestamp(state["last_run"])).total_seconds() < RETRY_SECONDS:
+            return False
+        last = state.get("last_success")
+        if last is None:
+            return True
+        last = pd.Timestamp(last)
+        if self.cadence is not None and self.cadence(now) > last:
+            return True
+        for upstream in self.after:
+            done = jobs_status.get(upstream, {}).get("last_success")
+            if done is not None and pd.Timestamp(done) > last:
+                return True
+        return False
+
+
+# Job bodies import their modules when they run, so pages that only ask
+# is_active() do not load the whole package
+
+
+def refresh_bars():
+    from . import ohlcv
+    symbols = list(dict.fromkeys(WATCHLIST + ohlcv.stored_symbols()))
+    ohlcv.refresh(symbols, force=True)
+
+
+def bars_as_of():
+    from . import ohlcv
+    bars = ohlcv.load(WATCHLIST[0], columns=["Close"])
+    return None if bars.empty else bars.index.max()
+
+
+def refresh_cot():
+    from . import cot, cot_store
+    cot.update_history()
+    for report_type in cot_store.stored_reports():
+        cot_store.update(report_type)
+
+
+def cot_as_of():
+    from . import cot
+    return cot.last_report_date()
+
+
+def refresh_fundamentals():
+    from . import fundamentals, scanner
+    # Indices have no fundamentals
+    symbols = [s for s in WATCHLIST if not s.startswith("^")] + fundamentals.stored_symbols()
+    if store.exists(scanner.UNIVERSE):
+        symbols += [f"{s}{scanner.SUFFIX}" for s in scanner.load_universe()]
+    fundamentals.refresh(symbols)
+
+
+def fundamentals_as_of():
+    from . import fundamentals
+    return fundamentals.refreshed_at()
+
+
+def refresh_macro():
+    from . import macro
+    macro.refresh()
+
+
+def macro_as_of():
+    from . import macro
+    dates = [macro.last_observation(series_id) for series_id in macro.SERIES]
+    dates = [d for d in dates if d is not None]
+    return min(dates) if dates else None
+
+
+def refresh_derived():
+    from . import pulse, scanner, setups
+    if store.exists(scanner.UNIVERSE):
+        scanner.build_features()
+    setups.build_setups()
+    pulse.update_scores()
+
+
+def derived_as_of():
+    from . import pulse
+    return pulse.last_date()
+
+
+JOBS = [
+    Job("bars", refresh_bars, cadence=daily(16, 30, "Asia/Kolkata"), as_of=bars_as_of),
+    Job("cot", refresh_cot, cadence=weekly(4, 15, 30, "America/New_York"), as_of=cot_as_of),
+    Job("fundamentals", refresh_fundamentals, cadence=daily(18, 0, "Asia/Kolkata"), as_of=fundamentals_as_of),
+    Job("macro", refresh_macro, cadence=monthly(15, 9, 0, "America/New_York"), as_of=macro_as_of),
+    Job("derived", refresh_derived, after=("bars", "cot", "macro"), as_of=derived_as_of),
+]
+
+
+def _now():
+    return pd.Timestamp.now("UTC")
+
+
+def _with_staleness(status, now):
+    for state in status.get("jobs", {}).values():
+        as_of = state.get("data_as_of")
+        state["staleness_seconds"] = None if as_of is None else (now - pd.Timestamp(as_of).tz_localize("UTC")).total_seconds()
+    return status
+
+
+def status():
+    """The scheduler status with staleness measured now, or an empty dict."""
+    return _with_staleness(store.read_json(STATUS, default={}), _now())
+
+
+def is_active(now=None):
+    """True while a scheduler process is heartbeating."""
+    state = store.read_json(STATUS)
+    if not state or not state.get("heartbeat"):
+        return False
+    age = ((now or _now()) - pd.Timestamp(state["heartbeat"])).total_seconds()
+    return age <= 3 * state.get("poll_seconds", POLL_SECONDS)
+
+
+def run_job(job, state):
+    """Run ``job`` and record its outcome in ``state`` (the ``jobs`` dict of the status)."""
+    entry = state.setdefault(job.name, {"runs": 0, "failures": 0})
+    started = _now()
+    t0 = time.perf_counter()
+    entry["last_run"] = started.isoformat()
+    try:
+        job.run()
+    except Exception as e:
+        entry["status"] = "failed"
+        entry["error"] = f"{type(e).__name__}: {e}"
+        entry["failures"] += 1
+        print(f"Job {job.name} failed: {e}")
+        traceback.print_exc()
+    else:
+        entry["status"] = "ok"
+        entry["error"] = None
+        entry["last_success"] = started.isoformat()
+    entry["runs"] += 1
+    entry["duration_seconds"] = round(time.perf_counter() - t0, 3)
+    if job.as_of is not None:
+        try:
+            as_of = job.as_of()
+            entry["data_as_of"] = None if as_of is None else pd.Timestamp(as_of).isoformat()
+        except Exception as e:
+            print(f"Job {job.name}: could not read data date: {e}")
+    print(f"Job {job.name} {entry['status']} in {entry['duration_seconds']}s")
+    return entry
+
+
+def _write_status(state, poll_seconds, heartbeat):
+    now = _now()
+    previous = store.read_json(STATUS, default={})
+    store.write_json(STATUS, _with_staleness({
+        # Only the long-running loop heartbeats; one-off runs keep the last beat
+        "heartbeat": now.isoformat() if heartbeat else previous.get("heartbeat"),
+        "pid": os.getpid() if heartbeat else previous.get("pid"),
+        "poll_seconds": poll_seconds,
+        "jobs": state,
+    }, now))
+
+
+def run_pending(jobs=None, force=(), poll_seconds=POLL_SECONDS, heartbeat=False):
+    """Run every due job (and those named in ``force``) once, in order."""
+    jobs = jobs or JOBS
+    state = store.read_json(STATUS, default={}).get("jobs", {})
+    ran = []
+    for job in jobs:
+        if job.name in force or job.is_due(_now(), state):
+            run_job(job, state)
+            ran.append(job.name)
+            _write_status(state, poll_seconds, heartbeat)
+    if not ran:
+        _write_status(state, poll_seconds, heartbeat)
+    return ran
+
+
+def run_forever(poll_seconds=POLL_SECONDS):
+    print(f"Scheduler started, checking every {poll_seconds}s")
+    while True:
+        run_pending(poll_seconds=poll_seconds, heartbeat=True)
+        time.sleep(poll_seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep the MarketPulse data store fresh.")
+    parser.add_argument("--once", action="store_true", help="run the due jobs once and exit")
+    parser.add_argument("--job", action="append", default=[], choices=[job.name for job in JOBS],
+                        help="run this job now regardless of its cadence (repeatable)")
+    parser.add_argument("--poll", type=int, default=POLL_SECONDS, help="seconds between checks")
+    parser.add_argument("--status", action="store_true", help="print the current status and exit")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        print(json.dumps(status(), indent=2))
+    elif args.once or args.job:
+        run_pending(force=args.job, poll_seconds=args.poll)
+    else:
+        run_forever(args.poll)
+
+
+if __name__ == "__main__":
+    main()
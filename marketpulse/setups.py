@@ -0,0 +1,211 @@
+"""Technical setups detected across every stored symbol at once.
+
+Each detector works on a wide date x symbol close panel and returns, for
+each symbol's last bar, which symbols show the setup and how strong it is
+(0 to 1). The panel is ragged (symbols that stopped trading end early), so
+every symbol is read at the last row it has a close, and a symbol whose
+indicator is missing there is never reported.
+Indicators come from ``indicators.compute_many``, so every SMA, rolling
+std and volatility window is one cumulative sum over the whole panel, and
+the detection itself is a handful of array operations. Ranking uses
+``np.argpartition``, so picking the top ``k`` does not sort the universe.
+"""
+import numpy as np
+import pandas as pd
+
+from . import cot, indicators, ohlcv, prices, scanner, store
+
+SETUPS_TABLE = "setups/latest"
+
+SQUEEZE_WINDOW = 20
+SQUEEZE_HISTORY = 126
+SQUEEZE_PERCENTILE = 10
+CROSS_RECENT = 5
+CONTRACTION_RATIO = 0.6
+COT_EXTREME = 2.0
+
+SETUPS = {
+    "Bollinger squeeze": "20-day band width in the bottom 10% of the last six months",
+    "Golden cross": "50-day SMA crossed above the 200-day SMA in the last 5 bars",
+    "Death cross": "50-day SMA crossed below the 200-day SMA in the last 5 bars",
+    "EMA bullish cross": "20-day EMA crossed above the 50-day EMA in the last 5 bars",
+    "EMA bearish cross": "20-day EMA crossed below the 50-day EMA in the last 5 bars",
+    "Volatility contraction": "20-day volatility below 60% of its 100-day level",
+    "COT long extreme in uptrend": "Speculators' Long % 2+ std above normal, price above its 200-day SMA",
+    "COT short extreme in downtrend": "Speculators' Long % 2+ std below normal, price below its 200-day SMA",
+}
+
+COLUMNS = ["Symbol", "Setup", "Direction", "Strength", "Close", "Date"]
+
+
+def last_rows(close):
+    """Row of each symbol's last close (the final row for a symbol with none)."""
+    present = close.notna().to_numpy()
+    return len(close) - 1 - present[::-1].argmax(axis=0)
+
+
+def _rows(frame, rows):
+    return np.full(frame.shape[1], len(frame) - 1) if rows is None else rows
+
+
+def _window(frame, rows, n):
+    # The ``n`` rows of every column ending at its row in ``rows``; NaN before the first row
+    values = frame.to_numpy(dtype=float)
+    idx = rows[None, :] - np.arange(n - 1, -1, -1)[:, None]
+    window = values[np.maximum(idx, 0), np.arange(values.shape[1])]
+    window[idx < 0] = np.nan
+    return window
+
+
+def bollinger_squeeze(close, values, rows=None):
+    """Band width percentile of each symbol's last bar within ``SQUEEZE_HISTORY`` bars."""
+    rows = last_rows(close) if rows is None else rows
+    middle, upper, lower = indicators.bollinger(
+        close, SQUEEZE_WINDOW, 2, middle=values[("sma", SQUEEZE_WINDOW)], std=values[("std", SQUEEZE_WINDOW)])
+    width = _window((upper - lower) / middle, rows, SQUEEZE_HISTORY)
+    last = width[-1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = ((width < last).sum(axis=0) + 0.5 * (width == last).sum(axis=0)) / (~np.isnan(width)).sum(axis=0) * 100
+    # No band width on the last bar means no percentile, not the lowest one
+    pct[np.isnan(last)] = np.nan
+    hit = (pct <= SQUEEZE_PERCENTILE) & ~np.isnan(last)
+    return hit, 1 - pct / 100
+
+
+def crossover(fast, slow, recent=CROSS_RECENT, rows=None):
+    """Symbols where ``fast`` crossed ``slow`` within the last ``recent`` bars.
+
+    Returns ``(up, down, strength)``; strength is 1 on the bar of the cross
+    and fades with every bar since. ``rows`` (see ``last_rows``) is each
+    symbol's last bar; by default the final row.
+    """
+    diff = _window(fast - slow, _rows(fast, rows), recent + 1)
+    above = diff > 0
+    below = diff < 0
+    up = above[1:] & ~above[:-1] & ~np.isnan(diff[:-1])
+    down = below[1:] & ~below[:-1] & ~np.isnan(diff[:-1])
+    # Only the latest cross counts, and it must still hold on the last bar
+    crossed = up | down
+    last_cross = recent - 1 - np.argmax(crossed[::-1], axis=0)
+    any_cross = crossed.any(axis=0)
+    columns = np.arange(diff.shape[1])
+    is_up = any_cross & up[last_cross, columns] & above[-1]
+    is_down = any_cross & down[last_cross, columns] & below[-1]
+    strength = np.where(any_cross, 1 - (recent - 1 - last_cross) / recent, np.nan)
+    return is_up, is_down, strength
+
+
+def volatility_contraction(values, rows=None):
+    short, long = values[("vol", 20)], values[("vol", 100)]
+    rows = _rows(short, rows)
+    short, long = _window(short, rows, 1)[0], _window(long, rows, 1)[0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = short / long
+    hit = (ratio < CONTRACTION_RATIO) & ~np.isnan(ratio)
+    return hit, np.clip(1 - ratio, 0, 1)
+
+
+def detect(close, positioning=None):
+    """All setups on the last bar of ``close`` as one row per (symbol, setup).
+
+    ``positioning`` is an optional row of COT ``Long %`` z-scores indexed
+    like ``close.columns``.
+    """
+    if close.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    specs = [("sma", SQUEEZE_WINDOW), ("std", SQUEEZE_WINDOW), ("sma", 50), ("sma", 200),
+             ("ema", 20), ("ema", 50), ("vol", 20), ("vol", 100)]
+    values = indicators.compute_many(close, specs)
+    rows = last_rows(close)
+    last_close = _window(close, rows, 1)[0]
+    last_date = scanner.last_valid_dates(close).to_numpy()
+    found = []
+
+    def add(setup, direction, hit, strength):
+        hit = np.asarray(hit, dtype=bool) & ~np.isnan(strength)
+        found.append(pd.DataFrame({
+            "Symbol": close.columns[hit], "Setup": setup, "Direction": direction,
+            "Strength": np.clip(strength[hit], 0, 1), "Close": last_close[hit], "Date": last_date[hit],
+        }))
+
+    add("Bollinger squeeze", "Neutral", *bollinger_squeeze(close, values, rows))
+    up, down, strength = crossover(values[("sma", 50)], values[("sma", 200)], rows=rows)
+    add("Golden cross", "Bullish", up, strength)
+    add("Death cross", "Bearish", down, strength)
+    up, down, strength = crossover(values[("ema", 20)], values[("ema", 50)], rows=rows)
+    add("EMA bullish cross", "Bullish", up, strength)
+    add("EMA bearish cross", "Bearish", down, strength)
+    add("Volatility contraction", "Neutral", *volatility_contraction(values, rows))
+
+    if positioning is not None:
+        z = positioning.reindex(close.columns).to_numpy(dtype=float)
+        sma_200 = _window(values[("sma", 200)], rows, 1)[0]
+        with np.errstate(invalid="ignore"):
+            uptrend = last_close > sma_200
+            downtrend = last_close < sma_200
+            add("COT long extreme in uptrend", "Bullish", (z >= COT_EXTREME) & uptrend, np.abs(z) / 3)
+            add("COT short extreme in downtrend", "Bearish", (z <= -COT_EXTREME) & downtrend, np.abs(z) / 3)
+
+    found = [part for part in found if not part.empty]
+    if not found:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(found, ignore_index=True)
+
+
+def top_k(setups, k=20, by="Strength"):
+    """The ``k`` highest rows of ``setups`` by ``by``, sorted, without a full sort."""
+    if len(setups) <= k:
+        return setups.sort_values(by, ascending=False, ignore_index=True)
+    values = setups[by].to_numpy(dtype=float)
+    idx = np.argpartition(np.nan_to_num(values, nan=-np.inf), len(values) - k)[len(values) - k:]
+    idx = idx[np.argsort(-values[idx], kind="stable")]
+    return setups.iloc[idx].reset_index(drop=True)
+
+
+def _cot_universe():
+    # COT assets by code, with their latest positioning z-score
+    close = prices.load_price_panel(min_coverage=0)
+    close = close.iloc[-scanner.LOOKBACK_BARS:]
+    close.columns = [c.split("_", 1)[0] for c in close.columns]
+    z = cot.positioning_zscore()
+    positioning = z.ffill().iloc[-1] if not z.empty else None
+    # Each asset on its own bars, since crypto trades at weekends
+    parts = [detect(close[[asset]].dropna(), None if positioning is None else positioning)
+             for asset in close.columns]
+    return pd.concat(parts, ignore_index=True)
+
+
+def build_setups(symbols=None):
+    """Detect setups for the stored NSE symbols and the COT assets and store them."""
+    if symbols is None:
+        symbols = ohlcv.stored_symbols(suffix=scanner.SUFFIX)
+    frames = []
+    last_bar = None
+    close = scanner.load_panel(symbols, fields=("Close",))["Close"]
+    if not close.empty:
+        nse = detect(close)
+        nse["Symbol"] = nse["Symbol"].str.removesuffix(scanner.SUFFIX)
+        nse["Market"] = "NSE"
+        frames.append(nse)
+        last_bar = close.index.max()
+    cot_setups = _cot_universe()
+    cot_setups["Market"] = "COT"
+    frames.append(cot_setups)
+    setups = pd.concat(frames, ignore_index=True)
+    if last_bar is None:
+        last_bar = setups["Date"].max()
+    store.write_frame(SETUPS_TABLE, setups, metadata={"last_bar": pd.Timestamp(last_bar).isoformat()})
+    return setups
+
+
+def setups_last_bar():
+    """Last bar covered by the stored setups, or None."""
+    if not store.exists(SETUPS_TABLE):
+        return None
+    return pd.Timestamp(store.read_metadata(SETUPS_TABLE)["last_bar"])
+
+
+def load_setups():
+    if not store.exists(SETUPS_TABLE):
+        return pd.DataFrame(columns=COLUMNS + ["Market"])
+    return store.read_frame(SETUPS_TABLE)
@@ -0,0 +1,215 @@
+"""Columnar, memory-mapped storage for the datasets the pages read.
+
+Frames are written as uncompressed Arrow IPC (Feather v2) files. Reading
+memory-maps the file, so every Streamlit worker on the host shares the same
+page-cache pages and only touches the columns and rows it asks for.
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(os.environ.get("MARKETPULSE_DATA_DIR", ROOT / "data"))
+
+_META_KEY = b"marketpulse"
+
+
+def path_for(name):
+    return DATA_DIR / f"{name}.arrow"
+
+
+def exists(name):
+    return path_for(name).exists()
+
+
+def write_frame(name, df, index_name=None, sort_by=None, metadata=None, group_by=None):
+    """Atomically write ``df`` as dataset ``name``.
+
+    A named index is stored as a regular column so that it can be used for
+    range reads. ``sort_by`` is recorded so readers know which column they
+    can binary-search. With ``group_by`` the rows are sorted by that column
+    first and the row range of each group is recorded, so one group can be
+    read (and range-searched) without scanning the others.
+    """
+    df = df.copy(deep=False)
+    if index_name is not None:
+        df.index.name = index_name
+        df = df.reset_index()
+        sort_by = sort_by or index_name
+    if group_by is not None:
+        df = df.sort_values([group_by, *([sort_by] if sort_by else [])], kind="stable", ignore_index=True)
+        values = df[group_by].astype(str).to_numpy()
+        firsts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]]) if len(values) else np.array([], dtype=int)
+        ends = np.r_[firsts[1:], len(values)]
+        metadata = {**(metadata or {}), "group_by": group_by,
+                    "groups": {values[lo]: [int(lo), int(hi)] for lo, hi in zip(firsts, ends)}}
+    elif sort_by is not None:
+        df = df.sort_values(sort_by, kind="stable", ignore_index=True)
+
+    # Keep NaN as NaN instead of turning it into Arrow nulls, so float
+    # columns come back from the memory map without a copy.
+    arrays, names = [], []
+    for col in df.columns:
+        values = df[col]
+        if values.dtype.kind == "f":
+            arrays.append(pa.array(values.to_numpy(), from_pandas=False))
+        else:
+            arrays.append(pa.Array.from_pandas(values))
+        names.append(str(col))
+    meta = {"index": index_name, "sort_by": sort_by, **(metadata or {})}
+    table = pa.Table.from_arrays(arrays, names=names)
+    table = table.replace_schema_metadata({_META_KEY: json.dumps(meta, default=str)})
+
+    def write(f):
+        with pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+
+    _atomic_write(path_for(name), write)
+
+
+def _atomic_write(path, write):
+    # Readers see either the old file or the complete new one, never a partial write
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def write_json(name, data):
+    """Atomically write ``data`` as ``<name>.json`` next to the datasets."""
+    payload = json.dumps(data, indent=2, default=str).encode()
+    _atomic_write(DATA_DIR / f"{name}.json", lambda f: f.write(payload))
+
+
+def read_json(name, default=None):
+    path = DATA_DIR / f"{name}.json"
+    if not path.exists():
+        return default
+    return json.loads(path.read_text())
+
+
+def _open(name):
+    source = pa.memory_map(str(path_for(name)), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def _schema(name):
+    return pa.ipc.open_file(pa.memory_map(str(path_for(name)), "r")).schema
+
+
+def read_metadata(name):
+    raw = (_schema(name).metadata or {}).get(_META_KEY)
+    return json.loads(raw) if raw else {}
+
+
+def read_columns(name):
+    schema = _schema(name)
+    index_name = json.loads(schema.metadata[_META_KEY]).get("index")
+    return [c for c in schema.names if c != index_name]
+
+
+def _date_range(table, key, start, end):
+    # Rows of ``table`` (sorted by ``key``) in [start, end], found by binary search
+    dates = table.column(key).to_numpy()
+    lo = 0 if start is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), "left")
+    hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), "right")
+    return table.slice(lo, max(hi - lo, 0))
+
+
+def _select(name, columns=None, start=None, end=None, group=None):
+    # The Arrow table of ``name`` limited to ``columns``, some groups and rows in [start, end]
+    table = _open(name)
+    meta = json.loads(table.schema.metadata[_META_KEY])
+    index_name = meta.get("index")
+    key = meta.get("sort_by")
+    grouped = meta.get("group_by") is not None
+    ranged = key is not None and (start is not None or end is not None)
+
+    if columns is not None:
+        keep = [c for c in columns if c != index_name]
+        if index_name is not None:
+            keep = [index_name] + keep
+        elif key is not None and key not in keep and ranged:
+            keep = keep + [key]
+        table = table.select(keep)
+
+    if group is not None:
+        if not grouped:
+            raise ValueError(f"Dataset {name} is not grouped")
+        parts = []
+        for g in ([group] if isinstance(group, str) else group):
+            lo, hi = meta["groups"].get(str(g), (0, 0))
+            part = table.slice(lo, hi - lo)
+            parts.append(_date_range(part, key, start, end) if ranged else part)
+        table = pa.concat_tables(parts) if parts else table.slice(0, 0)
+    elif ranged and grouped:
+        # Sorted only within each group, so across groups it is a filter
+        dates = table.column(key).to_numpy()
+        mask = np.ones(len(dates), dtype=bool)
+        if start is not None:
+            mask &= dates >= np.datetime64(pd.Timestamp(start))
+        if end is not None:
+            mask &= dates <= np.datetime64(pd.Timestamp(end))
+        table = table.filter(pa.array(mask))
+    elif ranged:
+        table = _date_range(table, key, start, end)
+    return table, index_name
+
+
+def _to_frame(table, index_name, columns):
+    df = table.to_pandas(split_blocks=True, self_destruct=False)
+    if index_name is not None:
+        df = df.set_index(index_name)
+    if columns is not None and index_name is None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+def read_frame(name, columns=None, start=None, end=None, group=None):
+    """Read dataset ``name``, optionally limited to ``columns`` and a date range.
+
+    ``start``/``end`` are inclusive and apply to the column the dataset was
+    sorted by, so the row range is found by binary search. ``group`` (one
+    value or a list) reads only those groups of a dataset written with
+    ``group_by``.
+    """
+    table, index_name = _select(name, columns, start, end, group)
+    return _to_frame(table, index_name, columns)
+
+
+def iter_frames(name, columns=None, start=None, end=None, rows=50_000, group=None):
+    """``read_frame`` in frames of at most ``rows`` rows, converted one at a time."""
+    table, index_name = _select(name, columns, start, end, group)
+    # An empty range still yields one (empty) frame, so writers get the columns
+    for offset in range(0, max(table.num_rows, 1), rows):
+        yield _to_frame(table.slice(offset, rows), index_name, columns)
+
+
+def import_pickle(name, pickle_path, prepare, describe=None, **write_kwargs):
+    """Convert a legacy pickle into dataset ``name`` if it is missing or stale.
+
+    ``prepare`` turns the unpickled object into the frame to store and the
+    optional ``describe`` derives metadata from that frame. Returns True when
+    a conversion happened.
+    """
+    pickle_path = Path(pickle_path)
+    if not pickle_path.exists():
+        return False
+    target = path_for(name)
+    if target.exists() and target.stat().st_mtime >= pickle_path.stat().st_mtime:
+        return False
+    df = prepare(pd.read_pickle(pickle_path))
+    if describe is not None:
+        write_kwargs["metadata"] = {**write_kwargs.get("metadata", {}), **describe(df)}
+    write_frame(name, df, **write_kwargs)
+    return True
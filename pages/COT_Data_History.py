@@ -1,92 +1,57 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from cot_reports import cot_year
-from datetime import datetime
-import os
-import pickle
+from marketpulse import cache, charts, cot, cot_store, metrics, scheduler
 
 st.set_page_config(page_title="COT Report Dashboard", layout="wide")
+metrics.set_page("COT_Data_History")
 
-# Asset mappings
-assets = {
-    "ZAR": "So African Rand", "GBP": "EURO FX/BRITISH POUND XRATE", "COPPER": "Copper",
-    "JPY": "Japanese Yen", "US10T": "ULTRA UST 10Y", "USOil": "Crude Oil",
-    "EUR": "Euro", "USD": "USD INDEX", "CAD": "Canadian Dollar", "SILVER": "Silver",
-    "CHF": "Swiss Franc", "BTC": "Bitcoin", "Gold": "Gold", "AUD": "Australian Dollar",
-    "RUSSELL": "RUSSELL 2000 ANNUAL DIVIDEND", "NZD": "NZ DOLLAR", "NIKKEI": "NIKKEI STOCK AVERAGE YEN DENOM",
-    "PLATINUM": "Platinum", "NASDAQ": "NASDAQ-100 Consolidated", "SPX": "S&P 500 Index",
-    "DOW": "DOW JONES U.S. REAL ESTATE IDX"
-}
-
-display_names = {
-    "ZAR": "South African Rand", "GBP": "British Pound Sterling", "COPPER": "Copper Metal",
-    "JPY": "Japanese Yen", "US10T": "US 10-Year Treasury", "USOil": "Crude Oil (WTI)",
-    "EUR": "Euro Currency", "USD": "US Dollar Index", "CAD": "Canadian Dollar (CAD)", 
-    "SILVER": "Silver Commodity", "CHF": "Swiss Franc (CHF)", "BTC": "Bitcoin (BTC)",
-    "Gold": "GOLD", "AUD": "Australian Dollar (AUD)", "RUSSELL": "Russell 2000 Index",
-    "NZD": "New Zealand Dollar", "NIKKEI": "Nikkei 225 Stock Index", 
-    "PLATINUM": "Platinum Metal", "NASDAQ": "NASDAQ-100 Index", "SPX": "S&P 500 ANNUAL DIVIDEND INDEX",
-    "DOW": "Dow Jones Industrial Average"
-}
-
-# Load COT data (cached to disk for speed)
-@st.cache_data
+# Load the COT analytics (memory-mapped from the shared store, indexed by
+# Asset and Date and precomputed for every asset whenever the history changes).
+# On a cache miss only reports newer than the last ingested week are fetched,
+# unless the background scheduler is already keeping the history current.
+@cache.cached("cot/analytics", ttl="6h")
 def get_cot_data():
-    if os.path.exists("cot_data.pkl"):
-        with open("cot_data.pkl", "rb") as f:
-            df = pickle.load(f)
-    else:
-        df_list = []
-        for year in range(2006, datetime.now().year + 1):
-            try:
-                df = cot_year(year, cot_report_type="legacy_fut", store_txt=False)
-                df_list.append(df)
-            except Exception as e:
-                print(f"Failed for {year}: {e}")
-        df = pd.concat(df_list, ignore_index=True)
-        df["Date"] = pd.to_datetime(df["As of Date in Form YYYY-MM-DD"])
-        df = df.rename(columns={
-            "Market and Exchange Names": "Asset",
-            "Noncommercial Positions-Long (All)": "Long",
-            "Noncommercial Positions-Short (All)": "Short"
-        })
-        df = df[["Date", "Asset", "Long", "Short"]].dropna()
-        df["Asset"] = df["Asset"].apply(lambda x: next((a for a, v in assets.items() if v.lower() in x.lower()), None))
-        df.dropna(inplace=True)
-        df = df.groupby(["Asset", pd.Grouper(key="Date", freq="W")]).sum().reset_index()
-        df["Long %"] = (df["Long"] / (df["Long"] + df["Short"])) * 100
-        with open("cot_data.pkl", "wb") as f:
-            pickle.dump(df, f)
-    return df
+    if not scheduler.is_active():
+        try:
+            cot.update_history()
+        except Exception as e:
+            print(f"COT update failed: {e}")
+    return cot.load_analytics()
 
 # Load data
-df = get_cot_data()
+with metrics.span("load", "analytics"):
+    df = get_cot_data()
+if df is None or df.empty:
+    st.warning("No COT history stored yet.")
+    st.stop()
 
 st.title("📈 Commitments of Traders (COT) Dashboard")
 
 # Sidebar filters (reverted to date input)
 with st.sidebar:
     with st.expander("🔧 Filters", expanded=True):
-        asset = st.selectbox("Select Asset", options=list(assets.keys()), format_func=lambda x: display_names.get(x, x))
-        asset_df = df[df["Asset"] == asset]
-        min_date, max_date = asset_df["Date"].min(), asset_df["Date"].max()
-        date_range = st.date_input("Date Range", [min_date, max_date], min_value=min_date, max_value=max_date)
+        asset = st.selectbox("Select Asset", options=list(cot.ASSETS.keys()), format_func=lambda x: cot.DISPLAY_NAMES.get(x, x))
+        # Assets can be listed before the CFTC reports them (or after they stop)
+        has_rows = asset in df.index.unique(level="Asset")
+        if has_rows:
+            # One asset's weeks are a contiguous, date-sorted slice of the table
+            asset_df = df.loc[asset]
+            min_date, max_date = asset_df.index[0], asset_df.index[-1]
+            date_range = st.date_input("Date Range", [min_date, max_date], min_value=min_date, max_value=max_date)
         show_theme = st.checkbox("🌙 Dark Mode", value=True)
 
+if not has_rows:
+    st.info(f"No COT reports stored for {cot.DISPLAY_NAMES.get(asset, asset)} yet.")
+    st.stop()
+
 # Protect against incomplete date_range input
 if len(date_range) < 2:
     st.warning("Please select a complete date range.")
     st.stop()
 
 # Apply filter
-filtered = asset_df[
-    (asset_df["Date"] >= pd.to_datetime(date_range[0])) &
-    (asset_df["Date"] <= pd.to_datetime(date_range[1]))
-]
-
-# Sidebar date range bounds
-min_date, max_date = asset_df["Date"].min(), asset_df["Date"].max()
+filtered = asset_df.loc[pd.to_datetime(date_range[0]):pd.to_datetime(date_range[1])]
 
 # Main date range slider (Streamlit UI)
 st.markdown("### 📅 Adjust Date Range")
@@ -99,51 +64,105 @@ selected_range = st.slider(
 )
 
 # Apply filter based on Streamlit slider
-filtered = asset_df[
-    (asset_df["Date"] >= pd.to_datetime(selected_range[0])) &
-    (asset_df["Date"] <= pd.to_datetime(selected_range[1]))
-]
+filtered = asset_df.loc[pd.to_datetime(selected_range[0]):pd.to_datetime(selected_range[1])]
 
 # Plotly chart with the internal rangeslider enabled
-fig = go.Figure()
-
-fig.add_trace(go.Bar(x=filtered["Date"], y=filtered["Long"], name="Long", marker_color="blue"))
-fig.add_trace(go.Bar(x=filtered["Date"], y=filtered["Short"], name="Short", marker_color="red"))
-
-fig.add_trace(go.Scatter(
-    x=filtered["Date"], y=filtered["Long %"],
-    mode="lines", line=dict(shape="hv", color="orange", width=3),
-    name="Long %", yaxis="y2"
-))
-
-fig.add_trace(go.Scatter(
-    x=filtered["Date"], y=[50] * len(filtered),
-    mode="lines", name="50% Reference",
-    line=dict(color="gray", dash="dot"), yaxis="y2", showlegend=False
-))
-
-# Chart layout with internal Plotly rangeslider
-fig.update_layout(
-    barmode="stack",
-    title=f"{display_names.get(asset, asset)} - COT Weekly Positions",
-    template="plotly_dark" if show_theme else "plotly_white",
-    xaxis=dict(
-        title="Date",
-        type="date",
-        range=[selected_range[0], selected_range[1]],
-        rangeslider=dict(visible=True)
-    ),
-    yaxis=dict(title="Positions"),
-    yaxis2=dict(
-        title="Long %",
-        overlaying="y",
-        side="right",
-        range=[0, 100],
-        showgrid=False
-    ),
-    hovermode="x unified",
-    height=600
-)
-
-# Show the chart
-st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+with metrics.span("figure", "positions"):
+    fig = go.Figure()
+
+    # charts.bar/line downsample long ranges to the chart width before they are sent
+    fig.add_trace(charts.bar(filtered["Long"], name="Long", marker_color="blue"))
+    fig.add_trace(charts.bar(filtered["Short"], name="Short", marker_color="red"))
+
+    # Not WebGL: the rangeslider below only draws SVG traces
+    fig.add_trace(charts.line(
+        filtered["Long %"],
+        line=dict(shape="hv", color="orange", width=3),
+        name="Long %", yaxis="y2", webgl=False
+    ))
+
+    # 50% reference as a layout shape rather than a trace with one point per week
+    charts.reference_line(fig, 50, yref="y2")
+
+    # Chart layout with internal Plotly rangeslider
+    fig.update_layout(
+        barmode="stack",
+        title=f"{cot.DISPLAY_NAMES.get(asset, asset)} - COT Weekly Positions",
+        template="plotly_dark" if show_theme else "plotly_white",
+        xaxis=dict(
+            title="Date",
+            type="date",
+            range=[selected_range[0], selected_range[1]],
+            rangeslider=dict(visible=True)
+        ),
+        yaxis=dict(title="Positions"),
+        yaxis2=dict(
+            title="Long %",
+            overlaying="y",
+            side="right",
+            range=[0, 100],
+            showgrid=False
+        ),
+        hovermode="x unified",
+        height=600
+    )
+
+    # Show the chart
+    st.plotly_chart(metrics.payload("chart", "positions", fig), use_container_width=True)
+
+# Positioning analytics for the same asset and range
+st.markdown("### 🧭 Net Positioning")
+window = st.radio("Lookback (weeks)", cot.ANALYTICS_WINDOWS, index=1, horizontal=True)
+with metrics.span("figure", "cot_index"):
+    fig_index = go.Figure()
+    fig_index.add_trace(charts.line(filtered[f"COT Index {window}w"], name=f"COT Index {window}w",
+                                    line=dict(color="orange")))
+    fig_index.add_trace(charts.line(filtered[f"Z-Score {window}w"], name=f"Z-Score {window}w",
+                                    line=dict(color="lightblue"), yaxis="y2"))
+    # Readings above 80 or below 20 are the usual extremes
+    for level in (20, 80):
+        charts.reference_line(fig_index, level)
+    fig_index.update_layout(
+        title=f"{cot.DISPLAY_NAMES.get(asset, asset)} - COT Index and Z-Score ({window} weeks)",
+        template="plotly_dark" if show_theme else "plotly_white",
+        yaxis=dict(title="COT Index", range=[0, 100]),
+        yaxis2=dict(title="Z-Score", overlaying="y", side="right", showgrid=False),
+        hovermode="x unified", height=450
+    )
+    st.plotly_chart(metrics.payload("chart", "cot_index", fig_index), use_container_width=True)
+
+# Latest week of every asset, most stretched positioning first
+st.markdown("### 🏁 Positioning Extremes")
+metric = st.selectbox("Rank by", [f"Z-Score {w}w" for w in cot.ANALYTICS_WINDOWS] + [f"COT Index {w}w" for w in cot.ANALYTICS_WINDOWS])
+with metrics.span("compute", "extremes"):
+    ranking = cot.extremes(df, metric)
+ranking["Asset"] = ranking["Asset"].map(lambda x: cot.DISPLAY_NAMES.get(x, x))
+columns = ["Asset", "Date", "Net", "Net Change", "Long %", metric]
+st.dataframe(ranking[columns].round({"Long %": 1, metric: 2}), use_container_width=True, hide_index=True)
+
+# Trader categories from the other CFTC reports, when any have been ingested
+# (python -m marketpulse.cot_store). Only this asset's slice of the years in
+# range is read, whichever reports are stored.
+reports = cot_store.stored_reports()
+if reports:
+    st.markdown("### 👥 Positions by Trader Category")
+    report_type = st.selectbox("Report", reports, format_func=lambda r: r.replace("_", " ").title())
+    chosen = st.multiselect("Trader categories", cot_store.categories(report_type),
+                            default=cot_store.categories(report_type))
+    with metrics.span("load", "categories"):
+        by_category = cot_store.query(report_type, asset, selected_range[0], selected_range[1], categories=chosen)
+    if by_category.empty:
+        st.info(f"No {report_type} positions stored for {cot.DISPLAY_NAMES.get(asset, asset)} in this range.")
+    else:
+        with metrics.span("figure", "categories"):
+            net = by_category.droplevel("Asset").pivot(columns="Category", values="Net")
+            fig_categories = go.Figure()
+            for category in net.columns:
+                fig_categories.add_trace(charts.line(net[category], name=category))
+            charts.reference_line(fig_categories, 0)
+            fig_categories.update_layout(
+                title=f"{cot.DISPLAY_NAMES.get(asset, asset)} - Net Positions by Trader Category",
+                template="plotly_dark" if show_theme else "plotly_white",
+                yaxis=dict(title="Net Contracts"), hovermode="x unified", height=450
+            )
+            st.plotly_chart(metrics.payload("chart", "categories", fig_categories), use_container_width=True)
@@ -1,45 +1,29 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import yfinance as yf
-from datetime import datetime
-from fredapi import Fred
-from dotenv import load_dotenv
-import os
 from collections import defaultdict
+from marketpulse import cache, macro, metrics, ohlcv, prices
+from marketpulse.correlation import (ENGINE_MAX_COLUMNS, RollingCorrelationEngine, blockwise_corr, cluster_order,
+                                     pairwise_corr, top_pairs)
 
-# Load environment variables
-load_dotenv()
-FRED_API_KEY = "a9e4dd54b454e8828d8ef26a11dd314d"
-if not FRED_API_KEY:
-    st.error("FRED API Key not found. Please set it in your .env file.")
-    st.stop()
-
-fred = Fred(api_key=FRED_API_KEY)
+# Above this many assets the heatmap is drawn without per-cell labels
+TEXT_LABEL_LIMIT = 30
 
 # Page config
 st.set_page_config(page_title="📈 Market Correlation Matrix", layout="wide")
 st.title("📈 Market Correlation Heatmap")
+metrics.set_page("Correlation-Heatmap")
 
 # Market selector
 market = st.selectbox("Select Market", ["US Market", "Indian Market"])
 
 # Load data functions
-@st.cache_data
-def load_us_data():
-    df = pd.read_pickle("price_data.pkl")
-    df.index = pd.to_datetime(df.index)
-
-    # Flatten MultiIndex
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = ['_'.join(map(str, col)).strip() for col in df.columns]
-    else:
-        df.columns = [str(col).strip() for col in df.columns]
-
-    df = df.loc[:, df.notna().mean() > 0.7]
-    return df
+@cache.cached("correlation/us_prices")
+def load_us_data(min_coverage=0.7):
+    # Memory-mapped from the shared store; the coverage filter uses stored metadata
+    return prices.load_price_panel(min_coverage=min_coverage)
 
-@st.cache_data
+@cache.cached("correlation/india_prices", ttl="6h")
 def load_india_data():
     tickers = {
         "RELIANCE": "RELIANCE.NS",
@@ -50,30 +34,36 @@ def load_india_data():
         "SBIN": "SBIN.NS",
         "KOTAKBANK": "KOTAKBANK.NS"
     }
-    data = yf.download(list(tickers.values()), period="max")["Adj Close"]
-    data.columns = list(tickers.keys())
-    return data
+    # Bars come from the local OHLCV cache (closes are dividend/split adjusted)
+    series = ohlcv.get_many(list(tickers.values()), "max")
+    return pd.DataFrame({name: series[symbol]["Close"] for name, symbol in tickers.items()})
 
-@st.cache_data
+@cache.cached("correlation/us_macro", ttl="6h")
 def load_us_macro_data():
-    macro = {
-        "USInfl_Inflation": fred.get_series("CPIAUCSL"),  # Consumer Price Index
-        "USGDP_GDP": fred.get_series("GDP"),             # Gross Domestic Product
-        "USBond_10Y_Bond_Rate": fred.get_series("GS10")   # 10-Year Treasury
-    }
-    df = pd.DataFrame(macro)
-    df.index = pd.to_datetime(df.index)
-    df = df.resample("D").ffill()  # Daily frequency
-    return df
+    # Native frequency from the store; aligned to the price dates below
+    series = macro.load_many(["CPIAUCSL", "GDP", "GS10"])
+    return pd.DataFrame({
+        "USInfl_Inflation": series["CPIAUCSL"],  # Consumer Price Index
+        "USGDP_GDP": series["GDP"],              # Gross Domestic Product
+        "USBond_10Y_Bond_Rate": series["GS10"]   # 10-Year Treasury
+    })
 
 # Load data
-if market == "US Market":
-    price_df = load_us_data()
-    macro_df = load_us_macro_data()
-    price_df = price_df.join(macro_df, how="outer")
-else:
-    price_df = load_india_data()
-    macro_df = None  # Not used for India
+with metrics.span("load", market):
+    if market == "US Market":
+        price_df = load_us_data()
+        try:
+            macro_df = load_us_macro_data()
+        except RuntimeError as e:
+            # No FRED key or FRED is down: the prices still make a heatmap
+            st.warning(f"Macro series unavailable, showing prices only: {e}")
+            macro_df = None
+        if macro_df is not None:
+            # Latest macro print known on each trading day
+            price_df = price_df.join(macro.align(macro_df, price_df.index))
+    else:
+        price_df = load_india_data()
+        macro_df = None  # Not used for India
 
 # Year slider
 max_date = price_df.index.max()
@@ -100,8 +90,6 @@ years_back = st.slider("Select number of years of data to include",
                        value=default_years)
 start_date = max_date - pd.DateOffset(years=years_back)
 
-# Filter by date
-filtered_df = price_df.loc[start_date:max_date]
 st.caption(f"Showing data from **{start_date.date()}** to **{max_date.date()}**")
 
 # Clean display names
@@ -116,43 +104,142 @@ def clean_display_names(tickers):
         display[ticker] = label
     return display
 
-asset_options = sorted([c for c in filtered_df.columns if pd.notna(c)])
+asset_options = sorted([c for c in price_df.columns if pd.notna(c)])
 display_names = clean_display_names(asset_options)
 
-selected_assets = st.multiselect(
-    "Select Assets to Include",
-    options=asset_options,
-    default=asset_options[:10],
-    format_func=lambda x: display_names.get(x, x)
-)
-
-if not selected_assets:
-    st.warning("Please select at least one asset to continue.")
-    st.stop()
-
-# Drop NaNs
-drop_nans = st.checkbox("Drop rows with missing values", value=True)
-selected_df = filtered_df[selected_assets]
-if drop_nans:
-    selected_df = selected_df.dropna()
+# Large-universe mode: every series, blockwise float32 maths, clustered order
+large_universe = st.checkbox("Large-universe mode (all series, clustered)", value=False)
+
+# Returns and their prefix sums are built once per asset selection (and data
+# update, hence the last date); moving the year slider only queries a window of them
+@cache.cached("correlation/engine", max_entries=32)
+def get_correlation_engine(market, assets, drop_nans, last_date, _price_df, pair=None):
+    selected_df = _price_df[list(assets)]
+    if drop_nans:
+        selected_df = selected_df.dropna()
+    if pair:
+        # Just the pair's columns, on the rows the whole selection keeps
+        selected_df = selected_df[list(pair)]
+    return RollingCorrelationEngine(selected_df)
+
+@cache.cached("correlation/large_universe", max_entries=16)
+def large_universe_correlation(market, start_date, max_date, min_overlap, _price_df):
+    returns = _price_df.loc[start_date:max_date].pct_change(fill_method=None)
+    returns = returns.loc[:, returns.notna().sum() >= min_overlap]
+    correlation = blockwise_corr(returns, min_periods=min_overlap)
+    order = cluster_order(correlation)
+    return correlation.loc[order, order]
+
+if large_universe:
+    # The whole coverage list, not just the series passing the 70% filter
+    if market == "US Market":
+        universe_df = load_us_data(min_coverage=0.0)
+        if macro_df is not None:
+            universe_df = universe_df.join(macro.align(macro_df, universe_df.index))
+    else:
+        universe_df = price_df
+    display_names = clean_display_names(sorted(universe_df.columns))
+    min_overlap = st.number_input("Minimum overlapping observations per pair", min_value=2, value=60, step=10)
+    with metrics.span("compute", "large_universe_correlation"):
+        correlation = large_universe_correlation(market, start_date, max_date, min_overlap, universe_df)
+    if len(correlation) < 2:
+        st.warning("Not enough data to compute correlation.")
+        st.stop()
+    correlation = correlation.rename(index=display_names, columns=display_names)
+else:
+    selected_assets = st.multiselect(
+        "Select Assets to Include",
+        options=asset_options,
+        default=asset_options[:10],
+        format_func=lambda x: display_names.get(x, x)
+    )
+
+    if not selected_assets:
+        st.warning("Please select at least one asset to continue.")
+        st.stop()
+
+    # Drop NaNs
+    drop_nans = st.checkbox("Drop rows with missing values", value=True)
+
+    # Daily returns & correlation
+    # The engine's prefix sums grow with the square of the selection, so wide
+    # selections get one matrix product and a pair-only engine further down
+    use_engine = len(selected_assets) <= ENGINE_MAX_COLUMNS
+    if drop_nans and not use_engine:
+        with metrics.span("compute", "complete_rows_correlation"):
+            complete = price_df[selected_assets].dropna().loc[start_date:max_date]
+            returns = complete.pct_change(fill_method=None).dropna()
+            if returns.empty:
+                st.warning("Not enough data to compute correlation.")
+                st.stop()
+            correlation, _ = pairwise_corr(returns)
+    elif drop_nans:
+        with metrics.span("compute", "engine_correlation"):
+            engine = get_correlation_engine(market, tuple(selected_assets), drop_nans, max_date, price_df)
+            if engine.count(start_date, max_date) == 0 or len(selected_assets) < 2:
+                st.warning("Not enough data to compute correlation.")
+                st.stop()
+            correlation = engine.corr(start_date, max_date)
+    else:
+        # Pairwise-complete: each pair uses every day both series have a return
+        min_overlap = st.number_input("Minimum overlapping observations per pair", min_value=2, value=60, step=10)
+        with metrics.span("compute", "pairwise_correlation"):
+            returns = price_df.loc[start_date:max_date, selected_assets].pct_change(fill_method=None)
+            correlation, overlap = pairwise_corr(returns, min_periods=min_overlap)
+        if len(selected_assets) < 2 or correlation.isna().all().all():
+            st.warning("Not enough data to compute correlation.")
+            st.stop()
+        with st.expander("Pairwise overlap (observations per pair)"):
+            st.dataframe(overlap.rename(index=display_names, columns=display_names), use_container_width=True)
+    correlation.rename(index=display_names, columns=display_names, inplace=True)
 
-# Daily returns & correlation
-returns = selected_df.pct_change().dropna()
-if returns.empty or returns.shape[1] < 2:
-    st.warning("Not enough data to compute correlation.")
+# Plot
+with metrics.span("figure", "heatmap"):
+    fig = px.imshow(
+        correlation,
+        text_auto=".2f" if len(correlation) <= TEXT_LABEL_LIMIT else False,
+        color_continuous_scale="blues",
+        zmin=-1,
+        zmax=1,
+        labels=dict(color="Correlation"),
+        title=f"Correlation Matrix of Daily Returns ({start_date.date()} to {max_date.date()})"
+    )
+    st.plotly_chart(metrics.payload("chart", "heatmap", fig), use_container_width=True)
+
+if large_universe:
+    top_k = st.slider("Pairs to list", min_value=5, max_value=50, value=10, step=5)
+    most, least = top_pairs(correlation, k=top_k)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### 🔗 Most Correlated Pairs")
+        st.dataframe(most, use_container_width=True)
+    with col2:
+        st.markdown("#### ↔️ Least Correlated Pairs")
+        st.dataframe(least, use_container_width=True)
     st.stop()
 
-correlation = returns.corr()
-correlation.rename(index=display_names, columns=display_names, inplace=True)
-
-# Plot
-fig = px.imshow(
-    correlation,
-    text_auto=".2f",
-    color_continuous_scale="blues",
-    zmin=-1,
-    zmax=1,
-    labels=dict(color="Correlation"),
-    title=f"Correlation Matrix of Daily Returns ({start_date.date()} to {max_date.date()})"
-)
-st.plotly_chart(fig, use_container_width=True)
+# Correlation over time for one pair, read from the same prefix sums
+st.markdown("### 📈 Correlation Over Time")
+col1, col2, col3 = st.columns(3)
+with col1:
+    pair_a = st.selectbox("First asset", selected_assets, format_func=lambda x: display_names.get(x, x))
+with col2:
+    pair_b = st.selectbox("Second asset", selected_assets, index=1, format_func=lambda x: display_names.get(x, x))
+with col3:
+    rolling_window = st.slider("Rolling window (trading days)", min_value=20, max_value=250, value=60, step=10)
+
+if not drop_nans:
+    # A two-column engine keeps every day the pair itself has in common
+    engine = get_correlation_engine(market, (pair_a, pair_b), False, max_date, price_df)
+elif not use_engine:
+    engine = get_correlation_engine(market, tuple(selected_assets), True, max_date, price_df, pair=(pair_a, pair_b))
+with metrics.span("compute", "rolling_pair"):
+    rolling_corr = engine.rolling_pair(pair_a, pair_b, rolling_window).loc[start_date:max_date]
+with metrics.span("figure", "rolling_pair"):
+    fig_pair = px.line(
+        rolling_corr,
+        labels=dict(value="Correlation", index="Date"),
+        title=f"{display_names.get(pair_a, pair_a)} vs {display_names.get(pair_b, pair_b)} - {rolling_window}-day Rolling Correlation"
+    )
+    fig_pair.update_layout(showlegend=False, yaxis_range=[-1, 1])
+    st.plotly_chart(metrics.payload("chart", "rolling_pair", fig_pair), use_container_width=True)
@@ -0,0 +1,72 @@
+import streamlit as st
+import pandas as pd
+from marketpulse import cache, export, fundamentals, metrics, ohlcv, scanner
+
+st.set_page_config(page_title="Data Scanner", layout="wide")
+st.title("🔍 NSE Data Scanner")
+metrics.set_page("Data_Scanner")
+
+# The feature table only changes when a new bar arrives, and the fundamentals
+# joined onto it (market_cap, pe, ...) when the snapshot is refreshed
+@cache.cached("scanner/features", max_entries=2)
+def get_features(last_bar, fundamentals_at):
+    features = scanner.load_features()
+    if fundamentals_at is not None:
+        features = features.join(fundamentals.screening())
+    return features
+
+with st.sidebar:
+    st.markdown("### ⚙️ Data")
+    if st.button("Refresh universe data"):
+        with st.spinner("Updating bars and features for the NSE universe..."):
+            symbols = scanner.load_universe(refresh=True)
+            ohlcv.refresh([f"{s}{scanner.SUFFIX}" for s in symbols], force=True)
+            scanner.build_features()
+
+last_bar = scanner.features_last_bar()
+if last_bar is None:
+    st.info("No scanner data yet. Use **Refresh universe data** in the sidebar to build it.")
+    st.stop()
+
+with metrics.span("load", "features"):
+    features = get_features(last_bar, fundamentals.refreshed_at())
+st.caption(f"**{len(features)}** symbols · features as of **{last_bar.date()}**")
+
+# Filters
+presets = st.multiselect("Filters", options=list(scanner.PRESETS), default=["Above 50-day SMA"])
+custom = st.text_input("Custom filter", "", placeholder="e.g. close > sma_20 and volume_ratio > 1.5")
+st.caption("Columns: " + ", ".join(f"`{c}`" for c in features.columns if c != "last_bar"))
+
+numeric_columns = [c for c in features.columns if c != "last_bar"]
+col1, col2 = st.columns([3, 1])
+with col1:
+    sort_by = st.selectbox("Sort by", numeric_columns, index=numeric_columns.index("return_20d"))
+with col2:
+    ascending = st.checkbox("Ascending", value=False)
+
+try:
+    with metrics.span("compute", "scan"):
+        result = scanner.scan(features, [scanner.PRESETS[p] for p in presets] + [custom], sort_by, ascending)
+except Exception as e:
+    st.error(f"⚠ Invalid filter: {e}")
+    st.stop()
+
+st.markdown(f"### 📋 {len(result)} Matches")
+st.dataframe(metrics.payload("table", "matches", result.round(2)), use_container_width=True)
+
+# Bars of every match in one file, written one symbol at a time when clicked
+with st.expander("⬇️ Export bars of the matches"):
+    col1, col2 = st.columns(2)
+    with col1:
+        bars_format = st.selectbox("Format", export.formats())
+    with col2:
+        bars_years = st.number_input("Years of history", min_value=1, max_value=30, value=5)
+    bars_symbols = [f"{s}{scanner.SUFFIX}" for s in result.index]
+    bars_start = last_bar - pd.DateOffset(years=bars_years)
+    st.download_button(
+        label=f"Download bars of {len(bars_symbols)} symbols",
+        data=export.download(export.export_bars, bars_symbols, bars_format, bars_start, last_bar),
+        file_name=f"scanner_bars_{last_bar.date()}.{bars_format}",
+        mime=export.FORMATS[bars_format],
+        disabled=not bars_symbols,
+    )
@@ -0,0 +1,63 @@
+import streamlit as st
+import plotly.graph_objects as go
+from marketpulse import cache, charts, cot, metrics, ohlcv, pulse
+
+st.set_page_config(page_title="Market Pulse Score", layout="wide")
+st.title("💓 Market Pulse Score")
+metrics.set_page("Market_Pulse_Score")
+
+# Scores are precomputed in batch, so the page only reads the stored tables.
+# They are cached per last scored date and reloaded once new days are added.
+@cache.cached("pulse/scores", max_entries=2)
+def get_scores(last_date):
+    return pulse.load_latest(), pulse.load_scores()
+
+with st.sidebar:
+    st.markdown("### ⚙️ Data")
+    if st.button("Update scores"):
+        with st.spinner("Scoring the new days..."):
+            ohlcv.refresh([pulse.NSE_INDEX], force=True)
+            added = pulse.update_scores()
+        st.success(f"Added {added} scores")
+
+last_date = pulse.last_date()
+if last_date is None:
+    st.info("No scores yet. Use **Update scores** in the sidebar to build them.")
+    st.stop()
+
+with metrics.span("load", "scores"):
+    latest, scores = get_scores(last_date)
+st.caption(f"Scores up to **{last_date.date()}** · 0 = risk-off, 50 = neutral, 100 = risk-on")
+
+def display_name(asset):
+    return "NSE Market" if asset == pulse.NSE else cot.DISPLAY_NAMES.get(asset, asset)
+
+# Latest score per asset
+with metrics.span("figure", "latest"):
+    fig = go.Figure(go.Bar(
+        x=latest["Asset"].map(display_name), y=latest["score"],
+        marker_color=["green" if s >= 50 else "red" for s in latest["score"]],
+        text=latest["score"].round(0), textposition="outside"
+    ))
+    charts.reference_line(fig, 50)
+    fig.update_layout(title="Latest Market Pulse by Asset", yaxis=dict(title="Score", range=[0, 105]),
+                      template="plotly_dark", height=450)
+    st.plotly_chart(metrics.payload("chart", "latest", fig), use_container_width=True)
+
+with st.expander("📋 Score components (each from -1 to +1)"):
+    table = latest.set_index("Asset")[[*pulse.COMPONENTS, "score"]]
+    st.dataframe(table.round(2), use_container_width=True)
+
+# Score history for one asset
+st.markdown("### 📈 Score History")
+assets = latest["Asset"].tolist()
+asset = st.selectbox("Asset", assets, format_func=display_name)
+history = scores[scores["Asset"] == asset]
+
+with metrics.span("figure", "history"):
+    fig = go.Figure()
+    fig.add_trace(charts.line(history.set_index("Date")["score"], name="Score", line=dict(color="orange")))
+    charts.reference_line(fig, 50)
+    fig.update_layout(title=f"{display_name(asset)} - Market Pulse", yaxis=dict(title="Score", range=[0, 100]),
+                      template="plotly_dark", hovermode="x unified", height=450)
+    st.plotly_chart(metrics.payload("chart", "history", fig), use_container_width=True)
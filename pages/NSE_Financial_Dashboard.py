@@ -1,15 +1,13 @@
 import streamlit as st
-import yfinance as yf
-import requests
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from bs4 import BeautifulSoup
 import streamlit.components.v1 as components
+from marketpulse import cache, charts, export, fundamentals, indicators, metrics, ohlcv
 
 # Configure layout
 st.set_page_config(layout="wide")
 st.title("📈 NSE Financial Dashboard")
+metrics.set_page("NSE_Financial_Dashboard")
 
 
 st.title("📈 Market Overview")
@@ -57,24 +55,34 @@ components.html(
     height=90
 )
 
-# Function to fetch stock data
-def fetch_stock_data(ticker, period):
+# Company info comes from the fundamentals snapshot (one row read, refreshed in
+# batch by the scheduler); the cache only saves re-reading it on every rerun
+@cache.cached("nse/stock_info", ttl="1h", max_entries=256)
+def fetch_stock_info(ticker):
+    return fundamentals.lookup(f"{ticker}.NS")
+
+# Function to fetch stock data (bars come from the local OHLCV cache)
+def fetch_stock_data(ticker, period, with_info=True):
     try:
-        stock = yf.Ticker(f"{ticker}.NS")  # Ensure .NS suffix
-        info = stock.info
-        history = stock.history(period=period)
+        with metrics.span("load", "stock_data"):
+            history = ohlcv.get_history(f"{ticker}.NS", period)  # Ensure .NS suffix
+            info = fetch_stock_info(ticker) if with_info else {}
         return history, info
     except Exception as e:
         st.error(f"⚠ Error fetching data for {ticker}.NS: {e}")
         return pd.DataFrame(), {}
 
-# Function to calculate Simple Moving Average (SMA)
-def calculate_sma(data, window):
-    return data['Close'].rolling(window=window).mean()
+# Indicators are memoized per (symbol, indicator, window) and computed on the
+# full stored history, so moving one slider only computes that one series
+@cache.cached("nse/indicator_engine")
+def get_indicator_engine():
+    return indicators.IndicatorEngine()
 
-# Function to calculate Exponential Moving Average (EMA)
-def calculate_ema(data, window):
-    return data['Close'].ewm(span=window, adjust=False).mean()
+@metrics.span("compute", "indicators")
+def calculate_indicators(ticker, data, specs):
+    symbol = f"{ticker}.NS"
+    results = get_indicator_engine().compute(symbol, ohlcv.load(symbol)['Close'], specs)
+    return {spec: series.reindex(data.index) for spec, series in results.items()}
 
 # Sidebar: Select Aspect
 # Sidebar: Select Aspect
@@ -126,34 +134,43 @@ if instrument == 'NSE Equity Market':
             fig = go.Figure()
 
             # Price Line
-            fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data['Close'], name='Close', line=dict(color='blue')))
+            fig.add_trace(charts.line(stock_data['Close'], name='Close', line=dict(color='blue')))
+
+            specs = []
+            if show_indicators:
+                specs += [('sma', sma_window), ('ema', ema_window)]
+            if show_bollinger:
+                specs += [('sma', bollinger_window), ('std', bollinger_window)]
+            values = calculate_indicators(ticker, stock_data, specs)
 
             # Moving Averages
             if show_indicators:
-                stock_data['SMA'] = calculate_sma(stock_data, sma_window)
-                stock_data['EMA'] = calculate_ema(stock_data, ema_window)
-                fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data['SMA'], line=dict(color='orange'), name=f'SMA ({sma_window})'))
-                fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data['EMA'], line=dict(color='purple'), name=f'EMA ({ema_window})'))
+                stock_data['SMA'] = values[('sma', sma_window)]
+                stock_data['EMA'] = values[('ema', ema_window)]
+                fig.add_trace(charts.line(stock_data['SMA'], line=dict(color='orange'), name=f'SMA ({sma_window})'))
+                fig.add_trace(charts.line(stock_data['EMA'], line=dict(color='purple'), name=f'EMA ({ema_window})'))
 
             # Bollinger Bands
             if show_bollinger:
-                stock_data['Middle Band'] = calculate_sma(stock_data, bollinger_window)
-                stock_data['Upper Band'] = stock_data['Middle Band'] + (stock_data['Close'].rolling(window=bollinger_window).std() * bollinger_std)
-                stock_data['Lower Band'] = stock_data['Middle Band'] - (stock_data['Close'].rolling(window=bollinger_window).std() * bollinger_std)
+                stock_data['Middle Band'], stock_data['Upper Band'], stock_data['Lower Band'] = indicators.bollinger(
+                    stock_data['Close'], bollinger_window, bollinger_std,
+                    middle=values[('sma', bollinger_window)], std=values[('std', bollinger_window)])
 
-                fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data['Upper Band'], line=dict(color='gray', dash='dash'), name=f'Upper Band ({bollinger_window}, {bollinger_std}σ)'))
-                fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data['Lower Band'], line=dict(color='gray', dash='dash'), name=f'Lower Band ({bollinger_window}, {bollinger_std}σ)'))
-                fig.add_trace(go.Scatter(x=stock_data.index, y=stock_data['Middle Band'], line=dict(color='lightgray'), name=f'Middle Band ({bollinger_window})'))
+                fig.add_trace(charts.line(stock_data['Upper Band'], line=dict(color='gray', dash='dash'), name=f'Upper Band ({bollinger_window}, {bollinger_std}σ)'))
+                fig.add_trace(charts.line(stock_data['Lower Band'], line=dict(color='gray', dash='dash'), name=f'Lower Band ({bollinger_window}, {bollinger_std}σ)'))
+                fig.add_trace(charts.line(stock_data['Middle Band'], line=dict(color='lightgray'), name=f'Middle Band ({bollinger_window})'))
 
             fig.update_layout(title=f"{ticker} Stock Price with Indicators", xaxis_title="Date", yaxis_title="Price")
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(metrics.payload("chart", "price", fig), use_container_width=True)
 
             if show_volume:
-                fig_volume = px.bar(stock_data, x=stock_data.index, y='Volume', title=f"{ticker} Trading Volume")
-                st.plotly_chart(fig_volume, use_container_width=True)
+                # Long periods are bucketed to the busiest day so volume spikes stay visible
+                fig_volume = go.Figure(charts.bar(stock_data['Volume'], method='max', name='Volume'))
+                fig_volume.update_layout(title=f"{ticker} Trading Volume", xaxis_title="Date", yaxis_title="Volume")
+                st.plotly_chart(metrics.payload("chart", "volume", fig_volume), use_container_width=True)
 
             st.subheader('📄 Raw Data')
-            st.dataframe(stock_data)
+            st.dataframe(metrics.payload("table", "stock_data", stock_data))
             tradingview_symbol = f"NSE:{ticker}"
             components.html(
                 f"""<!-- TradingView Widget BEGIN -->
@@ -194,20 +211,22 @@ elif instrument == "Market Indices":
 
     if ticker:
         period_indices = st.sidebar.selectbox("Select Time Period:", ['1mo', '3mo', '6mo', '1y', '2y', '5y', 'max'], index=3) # Default to 1y
-        stock = yf.Ticker(ticker)
-        data = stock.history(period=period_indices)
+        with metrics.span("load", "index_data"):
+            data = ohlcv.get_history(ticker, period_indices)
         st.write(f"### 📊 {index} Performance")
 
         if not data.empty:
             # Interactive Chart with Zoom and Pan
-            fig = go.Figure(data=[go.Scatter(x=data.index, y=data['Close'], mode='lines', name='Closing Price')])
+            # Downsampled to the chart width, so 'max' sends no more points than '1y'
+            # (and kept off WebGL, which the range slider can't draw)
+            fig = go.Figure(data=[charts.line(data['Close'], name='Closing Price', webgl=False)])
             fig.update_layout(
                 title=f"{index} Closing Prices ({period_indices})",
                 xaxis_title="Date",
                 yaxis_title="Price",
                 xaxis_rangeslider_visible=True # Add a range slider for zooming
             )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(metrics.payload("chart", "index", fig), use_container_width=True)
 
             # Display Key Statistics
             st.subheader("Key Statistics")
@@ -233,13 +252,15 @@ elif instrument == "Market Indices":
 
             # Display Raw Data with Download Option
             st.subheader("Raw Data")
-            st.dataframe(data)
-            csv = data.to_csv(index=True)
+            st.dataframe(metrics.payload("table", "index_data", data))
+            # The file is only written when the button is clicked, then reused until new bars arrive
+            export_format = st.selectbox("Download format", export.formats(), key="index_export_format")
+            start, end = data.index.min(), data.index.max()
             st.download_button(
-                label="Download Data as CSV",
-                data=csv,
-                file_name=f"{index.replace(' ', '')}_data{period_indices}.csv",
-                mime="text/csv",
+                label="Download Data",
+                data=export.download(export.export_bars, ticker, export_format, start, end),
+                file_name=f"{index.replace(' ', '')}_data{period_indices}.{export_format}",
+                mime=export.FORMATS[export_format],
             )
 
         else:
@@ -263,8 +284,10 @@ elif instrument == 'Correlation Analysis':
 
     if stock_ticker and index_ticker:
         try:
-            stock_df, _ = fetch_stock_data(stock_ticker, correlation_period) # Use the ticker as entered
-            index_df = yf.download(index_ticker, period=correlation_period)
+            # Stock and index are refreshed together in one batched download
+            with metrics.span("load", "correlation_data"):
+                series = ohlcv.get_many([f"{stock_ticker}.NS", index_ticker], correlation_period)
+            stock_df, index_df = series[f"{stock_ticker}.NS"], series[index_ticker]
 
             if stock_df is not None and not stock_df.empty and index_df is not None and not index_df.empty:
                 # Make DateTimeIndices timezone-naive
@@ -299,8 +322,8 @@ elif instrument == 'Correlation Analysis':
 
                     # Visualize the price trends together
                     fig_correlation = go.Figure()
-                    fig_correlation.add_trace(go.Scatter(x=merged_df.index, y=merged_df[f'Close_{stock_ticker}'], name=stock_ticker, yaxis='y1'))
-                    fig_correlation.add_trace(go.Scatter(x=merged_df.index, y=merged_df[f'Close_{index_to_compare}'], name=index_to_compare, yaxis='y2'))
+                    fig_correlation.add_trace(charts.line(merged_df[f'Close_{stock_ticker}'], name=stock_ticker, yaxis='y1'))
+                    fig_correlation.add_trace(charts.line(merged_df[f'Close_{index_to_compare}'], name=index_to_compare, yaxis='y2'))
 
                     fig_correlation.update_layout(
                         title=f"{stock_ticker} vs {index_to_compare} Price Trends",
@@ -311,7 +334,8 @@ elif instrument == 'Correlation Analysis':
                     )
                     st.plotly_chart(fig_correlation)
 
-                    # Scatter plot to visualize correlation
+                    # Scatter plot to visualize correlation (plotly.express is only needed here)
+                    import plotly.express as px
                     fig_scatter = px.scatter(merged_df, x=f'Close_{stock_ticker}', y=f'Close_{index_to_compare}',
                                               title=f"Scatter Plot: {stock_ticker} vs {index_to_compare}")
                     st.plotly_chart(fig_scatter)
@@ -335,43 +359,44 @@ elif instrument == 'Volatility Analysis':
 
     if ticker_volatility:
         try:
-            stock_data_volatility, _ = fetch_stock_data(ticker_volatility, period_volatility)
+            stock_data_volatility, _ = fetch_stock_data(ticker_volatility, period_volatility, with_info=False)
             if not stock_data_volatility.empty:
                 st.subheader(f"📊 Historical Volatility of {ticker_volatility}")
 
                 # Calculate daily returns
                 stock_data_volatility['Daily Returns'] = stock_data_volatility['Close'].pct_change().dropna()
 
-                # Calculate rolling standard deviation (volatility)
+                # Rolling annualized volatility and Bollinger inputs in one engine pass
                 window_volatility = st.sidebar.slider('Rolling Volatility Window (days)', min_value=5, max_value=90, value=20, step=5)
-                stock_data_volatility['Volatility'] = stock_data_volatility['Daily Returns'].rolling(window=window_volatility).std() * (252**0.5) * 100  # Annualized
+                bb_window = st.sidebar.slider('Bollinger Band Window', min_value=5, max_value=50, value=20)
+                bb_std = st.sidebar.slider('Bollinger Std Dev', min_value=1.0, max_value=3.0, value=2.0, step=0.5)
+                values = calculate_indicators(ticker_volatility, stock_data_volatility,
+                                              [('vol', window_volatility), ('sma', bb_window), ('std', bb_window)])
+                stock_data_volatility['Volatility'] = values[('vol', window_volatility)]  # Annualized
 
                 # Volatility Chart
                 fig_volatility = go.Figure()
-                fig_volatility.add_trace(go.Scatter(
-                    x=stock_data_volatility.index,
-                    y=stock_data_volatility['Volatility'],
+                fig_volatility.add_trace(charts.line(
+                    stock_data_volatility['Volatility'],
                     name=f'Volatility ({window_volatility}-day Rolling)',
                     line=dict(color='red')
                 ))
                 fig_volatility.update_layout(title=f'{ticker_volatility} - Rolling Volatility')
-                st.plotly_chart(fig_volatility)
+                st.plotly_chart(metrics.payload("chart", "volatility", fig_volatility))
 
                 # Close Price and Bollinger Bands
                 st.subheader("📈 Price with Bollinger Bands")
-                bb_window = st.sidebar.slider('Bollinger Band Window', min_value=5, max_value=50, value=20)
-                bb_std = st.sidebar.slider('Bollinger Std Dev', min_value=1.0, max_value=3.0, value=2.0, step=0.5)
-                stock_data_volatility['Middle Band'] = stock_data_volatility['Close'].rolling(window=bb_window).mean()
-                stock_data_volatility['Upper Band'] = stock_data_volatility['Middle Band'] + (stock_data_volatility['Close'].rolling(window=bb_window).std() * bb_std)
-                stock_data_volatility['Lower Band'] = stock_data_volatility['Middle Band'] - (stock_data_volatility['Close'].rolling(window=bb_window).std() * bb_std)
+                stock_data_volatility['Middle Band'], stock_data_volatility['Upper Band'], stock_data_volatility['Lower Band'] = indicators.bollinger(
+                    stock_data_volatility['Close'], bb_window, bb_std,
+                    middle=values[('sma', bb_window)], std=values[('std', bb_window)])
 
                 fig_price = go.Figure()
-                fig_price.add_trace(go.Scatter(x=stock_data_volatility.index, y=stock_data_volatility['Close'], name='Close', line=dict(color='blue')))
-                fig_price.add_trace(go.Scatter(x=stock_data_volatility.index, y=stock_data_volatility['Upper Band'], name='Upper Band', line=dict(color='gray', dash='dash')))
-                fig_price.add_trace(go.Scatter(x=stock_data_volatility.index, y=stock_data_volatility['Lower Band'], name='Lower Band', line=dict(color='gray', dash='dash')))
-                fig_price.add_trace(go.Scatter(x=stock_data_volatility.index, y=stock_data_volatility['Middle Band'], name='Middle Band', line=dict(color='lightgray')))
+                fig_price.add_trace(charts.line(stock_data_volatility['Close'], name='Close', line=dict(color='blue')))
+                fig_price.add_trace(charts.line(stock_data_volatility['Upper Band'], name='Upper Band', line=dict(color='gray', dash='dash')))
+                fig_price.add_trace(charts.line(stock_data_volatility['Lower Band'], name='Lower Band', line=dict(color='gray', dash='dash')))
+                fig_price.add_trace(charts.line(stock_data_volatility['Middle Band'], name='Middle Band', line=dict(color='lightgray')))
                 fig_price.update_layout(title=f"{ticker_volatility} Close Price with Bollinger Bands")
-                st.plotly_chart(fig_price)
+                st.plotly_chart(metrics.payload("chart", "bollinger", fig_price))
 
                 # Highlight High Volatility Points
                 st.subheader("📍 High Volatility Points")
@@ -380,13 +405,16 @@ elif instrument == 'Volatility Analysis':
                 st.write(f"Number of Days with Volatility > {vol_threshold}%: {len(high_vol_df)}")
                 st.dataframe(high_vol_df[['Close', 'Volatility']])
 
-                # Download Option
-                csv_vol = stock_data_volatility.to_csv(index=True)
+                # Download Option (written on click, once per symbol, range and settings)
+                vol_format = st.selectbox("Download format", export.formats(), key="volatility_export_format")
+                vol_key = (ticker_volatility, stock_data_volatility.index.min(), stock_data_volatility.index.max(),
+                           window_volatility, bb_window, bb_std)
                 st.download_button(
-                    label="Download Volatility Data as CSV",
-                    data=csv_vol,
-                    file_name=f"{ticker_volatility}_volatility_data.csv",
-                    mime="text/csv",
+                    label="Download Volatility Data",
+                    data=export.download(export.export_frame, stock_data_volatility,
+                                         f"{ticker_volatility}_volatility", vol_key, vol_format),
+                    file_name=f"{ticker_volatility}_volatility_data.{vol_format}",
+                    mime=export.FORMATS[vol_format],
                 )
 
         except Exception as e:
@@ -0,0 +1,59 @@
+import streamlit as st
+import plotly.graph_objects as go
+from marketpulse import cache, metrics, setups
+
+st.set_page_config(page_title="Top Setups", layout="wide")
+st.title("🎯 Top Setups")
+metrics.set_page("Top_Setup")
+
+# Setups only change when a new bar arrives, so they are cached per last bar
+@cache.cached("setups/latest", max_entries=2)
+def get_setups(last_bar):
+    return setups.load_setups()
+
+with st.sidebar:
+    st.markdown("### ⚙️ Data")
+    if st.button("Detect setups"):
+        with st.spinner("Scanning every stored symbol..."):
+            setups.build_setups()
+
+last_bar = setups.setups_last_bar()
+if last_bar is None:
+    st.info("No setups detected yet. Use **Detect setups** in the sidebar to scan the stored symbols.")
+    st.stop()
+
+with metrics.span("load", "setups"):
+    found = get_setups(last_bar)
+st.caption(f"**{len(found)}** setups as of **{last_bar.date()}**")
+
+# Filters
+col1, col2, col3 = st.columns([2, 1, 1])
+with col1:
+    selected = st.multiselect("Setups", options=list(setups.SETUPS), default=[])
+with col2:
+    markets = st.multiselect("Markets", options=["NSE", "COT"], default=["NSE", "COT"])
+with col3:
+    direction = st.selectbox("Direction", ["All", "Bullish", "Bearish", "Neutral"])
+k = st.slider("Number of setups to show", min_value=5, max_value=100, value=20, step=5)
+
+filtered = found[found["Market"].isin(markets)]
+if selected:
+    filtered = filtered[filtered["Setup"].isin(selected)]
+if direction != "All":
+    filtered = filtered[filtered["Direction"] == direction]
+
+with metrics.span("compute", "top_k"):
+    top = setups.top_k(filtered, k)
+
+st.markdown(f"### 🏆 Top {len(top)} of {len(filtered)} Setups")
+st.dataframe(top.round({"Strength": 2, "Close": 2}), use_container_width=True)
+
+# How often each setup occurs
+counts = filtered["Setup"].value_counts().rename_axis("Setup").reset_index(name="Count")
+fig = go.Figure(go.Bar(x=counts["Setup"], y=counts["Count"]))
+fig.update_layout(title="Setups Found", template="plotly_dark")
+st.plotly_chart(metrics.payload("chart", "counts", fig), use_container_width=True)
+
+with st.expander("ℹ️ Setup definitions"):
+    for name, description in setups.SETUPS.items():
+        st.markdown(f"**{name}**: {description}")
@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from marketpulse import store  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty store directory for the duration of a test."""
+    monkeypatch.setattr(store, "DATA_DIR", tmp_path)
+    return tmp_path
@@ -0,0 +1,175 @@
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from marketpulse import cache, indicators
+
+
+def _array(kb):
+    return np.zeros(kb * 1024 // 8)
+
+
+def test_put_charges_measured_size():
+    lru = cache.Cache(max_bytes=1 << 20)
+    lru.put(("a", 1), _array(100))
+    lru.put(("b", 1), _array(200))
+    stats = lru.stats()
+    assert stats["a"] == (1, 100 * 1024)
+    assert stats["b"] == (1, 200 * 1024)
+    assert stats[None] == (2, 300 * 1024)
+
+
+def test_views_are_charged_to_their_base_once():
+    base = _array(100)
+    views = (base, base[:10], base[10:])
+    assert cache.sizeof(views) == sys.getsizeof(views) + base.nbytes
+
+
+def test_evicts_least_recently_used_first():
+    lru = cache.Cache(max_bytes=300 * 1024)
+    for name in "abc":
+        lru.put((name,), _array(100))
+    # Reading "a" makes "b" the least recently used
+    assert lru.get(("a",))[0]
+    lru.put(("d",), _array(100))
+    assert not lru.get(("b",))[0]
+    assert all(lru.get((name,))[0] for name in "acd")
+    assert lru.bytes == 300 * 1024
+
+
+def test_too_large_entries_are_not_cached():
+    lru = cache.Cache(max_bytes=100 * 1024)
+    lru.put(("small",), _array(50))
+    lru.put(("large",), _array(200))
+    assert not lru.get(("large",))[0]
+    assert lru.get(("small",))[0]
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    lru = cache.Cache()
+    lru.put(("a",), 1, ttl=60)
+    assert lru.get(("a",)) == (True, 1)
+    now[0] += 61
+    assert lru.get(("a",)) == (False, None)
+    assert lru.bytes == 0
+
+
+def test_resize_charges_growth_and_evicts():
+    lru = cache.Cache(max_bytes=300 * 1024)
+    lru.put(("a",), _array(100))
+    lru.put(("b",), _array(100))
+    lru.resize(("b",), 150 * 1024)
+    assert lru.stats()["b"] == (1, 250 * 1024)
+    assert not lru.get(("a",))[0]
+    assert lru.bytes == 250 * 1024
+
+
+def test_indicator_engine_growth_is_tracked():
+    lru = cache.Cache(max_bytes=1 << 30)
+
+    @cache.cached("engine", cache=lru)
+    def engine():
+        return indicators.IndicatorEngine()
+
+    e = engine()
+    charged = lru.stats()["engine"][1]
+    close = pd.Series(np.arange(1.0, 5001.0), index=pd.bdate_range("2000-01-03", periods=5000))
+    e.compute("X", close, [("sma", 20), ("ema", 50)])
+    assert lru.stats()["engine"][1] == charged + e.bytes
+    assert e.bytes >= 2 * close.memory_usage(index=False)
+
+
+def test_max_entries_prunes_oldest_keys_of_a_dataset():
+    lru = cache.Cache()
+    calls = []
+
+    @cache.cached("prices", max_entries=2, cache=lru)
+    def load(symbol):
+        calls.append(symbol)
+        return symbol.lower()
+
+    @cache.cached("other", cache=lru)
+    def other(x):
+        return x
+
+    other(1)
+    for symbol in ("A", "B", "C"):
+        load(symbol)
+    assert lru.stats()["prices"][0] == 2
+    assert lru.stats()["other"][0] == 1
+    load("B")
+    load("A")
+    assert calls == ["A", "B", "C", "A"]
+
+
+def test_underscore_arguments_are_not_part_of_the_key():
+    lru = cache.Cache()
+
+    @cache.cached("frame", cache=lru)
+    def load(last_date, _frame):
+        return _frame["x"].sum()
+
+    assert load("2024-01-01", pd.DataFrame({"x": [1, 2]})) == 3
+    assert load("2024-01-01", pd.DataFrame({"x": [5, 5]})) == 3
+    assert load("2024-01-02", pd.DataFrame({"x": [5, 5]})) == 10
+
+
+def test_cached_frames_are_returned_as_copies():
+    lru = cache.Cache()
+
+    @cache.cached("frame", cache=lru)
+    def load():
+        return pd.DataFrame({"x": [1.0, 2.0]})
+
+    first = load()
+    first.loc[0, "x"] = 99.0
+    assert load()["x"].tolist() == [1.0, 2.0]
+
+
+def test_concurrent_misses_compute_once():
+    lru = cache.Cache()
+    calls = []
+    start = threading.Barrier(8)
+
+    @cache.cached("slow", cache=lru)
+    def slow(key):
+        calls.append(key)
+        time.sleep(0.1)
+        return object()
+
+    results = []
+
+    def session():
+        start.wait()
+        results.append(slow("k"))
+
+    threads = [threading.Thread(target=session) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == ["k"]
+    assert len({id(r) for r in results}) == 1
+    assert not cache._computing
+
+
+def test_concurrent_misses_on_different_keys_run_in_parallel():
+    lru = cache.Cache()
+
+    @cache.cached("slow", cache=lru)
+    def slow(key):
+        time.sleep(0.2)
+        return key
+
+    threads = [threading.Thread(target=slow, args=(k,)) for k in range(4)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.perf_counter() - started < 0.6
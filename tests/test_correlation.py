@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketpulse.correlation import RollingCorrelationEngine, blockwise_corr, pairwise_corr
+
+
+@pytest.fixture
+def gappy():
+    # Correlated random walks with about one price in ten missing
+    rng = np.random.default_rng(3)
+    dates = pd.bdate_range("2023-01-02", periods=300)
+    common = rng.normal(0, 0.01, (300, 1))
+    steps = common + rng.normal(0, 0.01, (300, 5))
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(steps, axis=0)), index=dates, columns=list("ABCDE"))
+    return prices.mask(rng.random(prices.shape) < 0.1)
+
+
+def test_pairwise_matches_dataframe_corr(gappy):
+    returns = gappy.pct_change(fill_method=None)
+    corr, counts = pairwise_corr(returns, min_periods=30, block_size=2)
+    pd.testing.assert_frame_equal(corr, returns.corr(min_periods=30))
+    valid = returns.notna().astype(int)
+    pd.testing.assert_frame_equal(counts, valid.T @ valid, check_names=False)
+
+
+def test_blockwise_float32_is_close(gappy):
+    returns = gappy.pct_change(fill_method=None)
+    corr = blockwise_corr(returns, block_size=3)
+    np.testing.assert_allclose(corr.to_numpy(), returns.corr().to_numpy(), atol=1e-5)
+
+
+def test_engine_does_not_fill_gaps(gappy):
+    pair = gappy[["A", "B"]]
+    returns = pair.pct_change(fill_method=None).dropna()
+    engine = RollingCorrelationEngine(pair)
+    assert engine.index.equals(returns.index)
+    pd.testing.assert_frame_equal(engine.corr(), returns.corr(), check_names=False)
+
+
+def test_rolling_pair_matches_series_rolling_corr(gappy):
+    pair = gappy[["A", "B"]]
+    returns = pair.pct_change(fill_method=None).dropna()
+    rolling = RollingCorrelationEngine(pair).rolling_pair("A", "B", 20)
+    expected = returns["A"].rolling(20).corr(returns["B"])
+    np.testing.assert_allclose(rolling.to_numpy(), expected.to_numpy(), atol=1e-10, equal_nan=True)
+    assert rolling.index.equals(expected.index)
@@ -0,0 +1,127 @@
+import pandas as pd
+import pytest
+
+from marketpulse import cot
+
+ASSETS = {"Gold": "Gold", "EUR": "Euro FX"}
+
+
+def _report(dates):
+    rows = []
+    for i, date in enumerate(dates):
+        for market in ("GOLD - COMMODITY EXCHANGE INC.", "EURO FX - CHICAGO MERCANTILE EXCHANGE"):
+            rows.append({"As of Date in Form YYYY-MM-DD": date.strftime("%Y-%m-%d"),
+                         "Market and Exchange Names": market,
+                         "Noncommercial Positions-Long (All)": 1000 + i,
+                         "Noncommercial Positions-Short (All)": 500 + i})
+    return pd.DataFrame(rows)
+
+
+def _write_year(directory, year, end):
+    dates = pd.date_range(f"{year}-01-01", end, freq="W-TUE")
+    _report(dates).to_csv(directory / f"annual_{year}.txt", index=False)
+    return dates
+
+
+@pytest.fixture
+def reports(data_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(cot, "COT_PICKLE", tmp_path / "missing.pkl")
+    monkeypatch.setattr(cot, "FIRST_YEAR", 2023)
+    directory = tmp_path / "cftc"
+    directory.mkdir()
+    return directory
+
+
+def _recording(directory, years):
+    fetch = cot.local_source(directory)
+
+    def recorded(year):
+        years.append(year)
+        return fetch(year)
+    return recorded
+
+
+def test_full_load_reads_every_year(reports):
+    weeks = len(_write_year(reports, 2023, "2023-12-31")) + len(_write_year(reports, 2024, "2024-03-31"))
+    years = []
+    added = cot.update_history(ASSETS, fetch=_recording(reports, years), today=pd.Timestamp("2024-04-01"))
+    assert sorted(years) == [2023, 2024]
+    assert added == 2 * weeks
+    assert cot.last_report_date() == pd.Timestamp("2024-03-26")
+    assert set(cot.load_history()["Asset"]) == set(ASSETS)
+
+
+def test_incremental_update_appends_only_newer_reports(reports):
+    _write_year(reports, 2023, "2023-12-31")
+    _write_year(reports, 2024, "2024-03-31")
+    cot.update_history(ASSETS, fetch=cot.local_source(reports), today=pd.Timestamp("2024-04-01"))
+    before = cot.load_history()
+
+    new_weeks = pd.date_range("2024-04-01", "2024-04-30", freq="W-TUE")
+    _write_year(reports, 2024, "2024-04-30")
+    years = []
+    added = cot.update_history(ASSETS, fetch=_recording(reports, years), today=pd.Timestamp("2024-05-01"))
+    assert years == [2024]
+    assert added == 2 * len(new_weeks)
+
+    history = cot.load_history()
+    assert len(history) == len(before) + added
+    assert not history.duplicated(subset=["Asset", "Date"]).any()
+    assert cot.last_report_date() == new_weeks[-1]
+    pd.testing.assert_frame_equal(history.iloc[:len(before)].reset_index(drop=True), before.reset_index(drop=True))
+
+
+def test_update_without_new_reports_is_a_noop(reports):
+    _write_year(reports, 2024, "2024-03-31")
+    today = pd.Timestamp("2024-04-01")
+    cot.update_history(ASSETS, fetch=cot.local_source(reports), today=today)
+    assert cot.update_history(ASSETS, fetch=cot.local_source(reports), today=today) == 0
+
+
+def test_classifier_matches_case_insensitive_substrings():
+    classifier = cot.AssetClassifier({"Gold": "Gold", "JPY": "Japanese Yen"})
+    codes = classifier.classify(["GOLD - COMMODITY EXCHANGE INC.", "JAPANESE YEN - CME", "gold", None])
+    assert list(codes[:3]) == ["Gold", "JPY", "Gold"]
+    assert pd.isna(codes[3])
+    assert list(codes.categories) == ["Gold", "JPY"]
+    assert not classifier.unmatched and not classifier.ambiguous
+
+
+def test_classifier_records_unmatched_names():
+    classifier = cot.AssetClassifier({"Gold": "Gold"})
+    codes = classifier.classify(["WHEAT-SRW - CHICAGO BOARD OF TRADE", "GOLD - COMMODITY EXCHANGE INC."])
+    assert pd.isna(codes[0]) and codes[1] == "Gold"
+    assert classifier.unmatched == {"WHEAT-SRW - CHICAGO BOARD OF TRADE"}
+
+
+def test_classifier_first_asset_wins_when_ambiguous():
+    # The GBP cross contains "Euro" too; GBP comes first in ASSETS
+    classifier = cot.AssetClassifier(cot.ASSETS)
+    name = "EURO FX/BRITISH POUND XRATE - CHICAGO MERCANTILE EXCHANGE"
+    assert list(classifier.classify([name, "EURO FX - CHICAGO MERCANTILE EXCHANGE"])) == ["GBP", "EUR"]
+    assert classifier.ambiguous == {name: ["GBP", "EUR"]}
+
+
+def test_classifier_finds_every_pattern_anywhere_in_the_name():
+    # Each optional lookahead scans the whole name, whatever the pattern order
+    classifier = cot.AssetClassifier({"A": "zeta", "B": "alpha", "C": "mid", "D": "absent"})
+    assert classifier.matches("alpha mid zeta") == [0, 1, 2]
+    assert classifier.matches("ZETA then ALPHA") == [0, 1]
+    assert classifier.matches("nothing here") == []
+
+
+def test_classifier_escapes_patterns():
+    classifier = cot.AssetClassifier({"SPX": "S&P 500 (Index)", "DOT": "a.b"})
+    assert classifier.matches("S&P 500 (INDEX) - CME") == [0]
+    assert classifier.matches("axb") == []
+
+
+def test_update_history_reports_classifier_leftovers(reports, capsys):
+    raw = _report(pd.date_range("2024-01-02", "2024-01-31", freq="W-TUE"))
+    raw.loc[0, "Market and Exchange Names"] = "WHEAT-SRW - CHICAGO BOARD OF TRADE"
+    raw.loc[1, "Market and Exchange Names"] = "EURO FX GOLD - NOWHERE"
+    raw.to_csv(reports / "annual_2024.txt", index=False)
+    cot.update_history(ASSETS, fetch=cot.local_source(reports), today=pd.Timestamp("2024-02-01"))
+    out = capsys.readouterr().out
+    assert "Ambiguous COT market 'EURO FX GOLD - NOWHERE': matches ['Gold', 'EUR'], using Gold" in out
+    assert "1 COT markets matched no asset (e.g. WHEAT-SRW - CHICAGO BOARD OF TRADE)" in out
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+from marketpulse import cot_store
+
+SPEC = cot_store.REPORTS["disaggregated_fut"]
+
+
+def _raw(dates, markets):
+    rows = []
+    for i, date in enumerate(dates):
+        for j, market in enumerate(markets):
+            row = {SPEC["date"]: date, SPEC["market"]: market, SPEC["open_interest"]: 1000 + i}
+            for k, columns in enumerate(SPEC["categories"].values()):
+                for m, column in enumerate(columns):
+                    if column is not None:
+                        row[column] = 100 * (k + 1) + 10 * m + i + j
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def raw():
+    return _raw(["2023-01-03", "2023-01-10"], ["GOLD - COMMODITY EXCHANGE INC.", "EURO FX - CHICAGO MERCANTILE EXCHANGE",
+                                               "WHEAT - CHICAGO BOARD OF TRADE"])
+
+
+def test_normalize_long_layout(raw):
+    df = cot_store.normalize(raw, "disaggregated_fut")
+    assert list(df.columns) == cot_store.COLUMNS
+    # Wheat is not one of the assets
+    assert sorted(df["Asset"].unique()) == ["EUR", "Gold"]
+    assert len(df) == 2 * 2 * len(SPEC["categories"])
+    row = df[(df["Asset"] == "Gold") & (df["Category"] == "Managed Money")].iloc[0]
+    assert row["Net"] == row["Long"] - row["Short"]
+    # Producer/Merchant has no spreading column
+    assert (df.loc[df["Category"] == "Producer/Merchant", "Spreading"] == 0).all()
+
+
+def test_normalize_accepts_double_underscores(raw):
+    renamed = raw.rename(columns={"Swap_Positions_Short_All": "Swap__Positions_Short_All"})
+    pd.testing.assert_frame_equal(cot_store.normalize(renamed, "disaggregated_fut"),
+                                  cot_store.normalize(raw, "disaggregated_fut"))
+
+
+def test_normalize_requires_position_columns(raw):
+    with pytest.raises(KeyError, match="M_Money_Positions_Short_All"):
+        cot_store.normalize(raw.drop(columns=["M_Money_Positions_Short_All"]), "disaggregated_fut")
+
+
+def test_unknown_report_type(raw):
+    with pytest.raises(ValueError):
+        cot_store.normalize(raw, "weekly_fut")
+
+
+def test_ingest_and_query_across_years(data_dir, raw):
+    reports = {2022: _raw(["2022-12-20", "2022-12-27"], ["GOLD - COMMODITY EXCHANGE INC."]), 2023: raw}
+    stored = cot_store.ingest("disaggregated_fut", [2022, 2023], fetch=reports.__getitem__)
+    assert set(stored) == {2022, 2023}
+    assert cot_store.stored_years("disaggregated_fut") == [2022, 2023]
+    assert cot_store.last_report_date("disaggregated_fut") == pd.Timestamp("2023-01-10")
+
+    df = cot_store.query("disaggregated_fut", ["Gold"], start="2022-12-27", end="2023-01-03",
+                         categories=["Swap Dealer"], columns=["Net"])
+    assert df.index.get_level_values("Date").tolist() == [pd.Timestamp("2022-12-27"), pd.Timestamp("2023-01-03")]
+    assert list(df.columns) == ["Category", "Net"]
+    net = cot_store.net_positions("disaggregated_fut", ["EUR", "Gold"])
+    assert list(net.index.get_level_values("Asset").unique()) == ["EUR", "Gold"]
+    assert set(net.columns) == set(SPEC["categories"])
+
+
+def test_ingest_skips_failed_years(data_dir, raw, capsys):
+    def fetch(year):
+        if year == 2022:
+            raise OSError("offline")
+        return raw
+
+    assert set(cot_store.ingest("disaggregated_fut", [2022, 2023], fetch=fetch)) == {2023}
+    assert "Failed for disaggregated_fut 2022" in capsys.readouterr().out
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketpulse import indicators
+
+SPECS = [("sma", 20), ("ema", 10), ("std", 20), ("vol", 20)]
+
+
+@pytest.fixture
+def close():
+    rng = np.random.default_rng(7)
+    dates = pd.bdate_range("2023-01-02", periods=400)
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, 400))), index=dates, name="Close")
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # Counts full computations and tail extensions made by the engine
+    counted = {"full": 0, "extend": 0}
+    compute_many, extend = indicators.compute_many, indicators._extend
+
+    def full(*args, **kwargs):
+        counted["full"] += 1
+        return compute_many(*args, **kwargs)
+
+    def tail(*args, **kwargs):
+        counted["extend"] += 1
+        return extend(*args, **kwargs)
+    monkeypatch.setattr(indicators, "compute_many", full)
+    monkeypatch.setattr(indicators, "_extend", tail)
+    return counted
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_extend_matches_full_recompute(close, spec, calls):
+    engine = indicators.IndicatorEngine()
+    engine.get("X", close.iloc[:300], *spec)
+    for end in (301, 350, 400):
+        extended = engine.get("X", close.iloc[:end], *spec)
+        expected = indicators.compute_many(close.iloc[:end], [spec])[spec]
+        pd.testing.assert_series_equal(extended, expected, check_freq=False, rtol=1e-9)
+    assert calls["extend"] == 3
+
+
+def test_unchanged_series_is_a_hit(close, calls):
+    engine = indicators.IndicatorEngine()
+    engine.compute("X", close, SPECS)
+    engine.compute("X", close, SPECS)
+    assert calls == {"full": 1, "extend": 0}
+
+
+def test_missing_last_close_is_still_a_hit(close, calls):
+    close = close.copy()
+    close.iloc[-1] = np.nan
+    engine = indicators.IndicatorEngine()
+    engine.compute("X", close, SPECS)
+    engine.compute("X", close, SPECS)
+    assert calls == {"full": 1, "extend": 0}
+
+
+def test_restated_history_is_recomputed(close, calls):
+    engine = indicators.IndicatorEngine()
+    engine.get("X", close.iloc[:300], "sma", 20)
+    restated = close * 0.98
+    values = engine.get("X", restated, "sma", 20)
+    assert calls["extend"] == 0 and calls["full"] == 2
+    pd.testing.assert_series_equal(values, indicators.sma(restated, 20), check_freq=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("spec", SPECS)
+def test_extend_after_missing_closes_matches_full_recompute(close, spec, calls):
+    close = close.copy()
+    close.iloc[297:300] = np.nan
+    engine = indicators.IndicatorEngine()
+    engine.get("X", close.iloc[:300], *spec)
+    extended = engine.get("X", close, *spec)
+    assert calls["extend"] == 1
+    pd.testing.assert_series_equal(extended, indicators.compute_many(close, [spec])[spec], check_freq=False, rtol=1e-9)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketpulse import ohlcv, providers
+
+SYMBOL = "SBIN.NS"
+
+
+class CountingReplay(providers.ReplayProvider):
+    """Replay provider that records the ``start`` of every price request."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.starts = []
+
+    def price_history(self, symbols, start=None, interval="1d", max_workers=8):
+        self.starts.append(start)
+        return super().price_history(symbols, start=start, interval=interval, max_workers=max_workers)
+
+
+def _bars(periods, scale=1.0):
+    # Always the same 105 bars, so a shorter history is a prefix of a longer one
+    rng = np.random.default_rng(5)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 105))) * scale
+    bars = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                         "Volume": rng.integers(1_000, 5_000, 105)},
+                        index=pd.bdate_range("2024-01-01", periods=105, name="Date")).round(2)
+    return bars.iloc[:periods]
+
+
+@pytest.fixture
+def replay(data_dir, tmp_path, monkeypatch):
+    provider = CountingReplay(tmp_path / "replay")
+    (provider.root / "prices" / "1d").mkdir(parents=True)
+    monkeypatch.setattr(providers, "_provider", provider)
+    monkeypatch.setattr(ohlcv, "_checked", {})
+    monkeypatch.setattr(ohlcv, "_scheduled", lambda: False)
+    return provider
+
+
+def _record(provider, bars):
+    bars.to_csv(provider.root / "prices" / "1d" / f"{SYMBOL}.csv")
+
+
+def _stored():
+    return ohlcv.load(SYMBOL).astype(float)
+
+
+def test_new_bars_are_appended(replay):
+    _record(replay, _bars(100))
+    assert ohlcv.refresh([SYMBOL], force=True) == [SYMBOL]
+    _record(replay, _bars(105))
+    assert ohlcv.refresh([SYMBOL], force=True) == [SYMBOL]
+    # The second request starts at the last complete stored bar, not the beginning
+    assert replay.starts == [None, _bars(100).index[-2].strftime("%Y-%m-%d")]
+    pd.testing.assert_frame_equal(_stored(), _bars(105).astype(float), check_freq=False)
+
+
+def test_unchanged_history_writes_nothing(replay):
+    _record(replay, _bars(100))
+    ohlcv.refresh([SYMBOL], force=True)
+    assert ohlcv.refresh([SYMBOL], force=True) == []
+    assert len(replay.starts) == 2
+
+
+def test_restated_history_is_fetched_in_full(replay):
+    _record(replay, _bars(100))
+    ohlcv.refresh([SYMBOL], force=True)
+    # A split halves every past price along with the new bars
+    _record(replay, _bars(105, scale=0.5))
+    assert ohlcv.refresh([SYMBOL], force=True) == [SYMBOL]
+    assert replay.starts == [None, _bars(100).index[-2].strftime("%Y-%m-%d"), None]
+    pd.testing.assert_frame_equal(_stored(), _bars(105, scale=0.5).astype(float), check_freq=False)
+
+
+@pytest.mark.parametrize("symbol", ["a/b", "../x", "..", ".", "SBIN.NS/..", "..\\x", "sbin.ns", "", "SBIN NS", None])
+def test_check_symbol_rejects_paths_and_unknown_characters(symbol):
+    with pytest.raises(ValueError):
+        providers.check_symbol(symbol)
+
+
+@pytest.mark.parametrize("symbol", ["SBIN.NS", "^NSEI", "M&M.NS", "EURUSD=X", "BRK-B"])
+def test_check_symbol_accepts_tickers(symbol):
+    assert providers.check_symbol(symbol) == symbol
+
+
+def test_stored_paths_stay_inside_the_store(data_dir):
+    with pytest.raises(ValueError):
+        ohlcv.load("../../etc/passwd")
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketpulse import scanner
+
+
+@pytest.fixture
+def features():
+    return pd.DataFrame({
+        "close": [100.0, 50.0, 20.0],
+        "sma_50": [90.0, 60.0, 20.0],
+        "sma_200": [80.0, 70.0, 25.0],
+        "return_20d": [5.0, -3.0, 1.0],
+    }, index=pd.Index(["A", "B", "C"], name="Symbol"))
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("close > sma_50", ["A"]),
+    ("sma_50 > sma_200 and return_20d > 0", ["A"]),
+    ("close < sma_50 or return_20d >= 1", ["A", "B", "C"]),
+    ("sma_200 < close <= 100", ["A"]),
+    ("(close - sma_50) / sma_50 * 100 > -10", ["A", "C"]),
+    ("-return_20d > 0", ["B"]),
+    ("close == sma_50", ["C"]),
+])
+def test_accepted_expressions(features, expression, expected):
+    assert scanner.filter_mask(features, expression)[lambda m: m].index.tolist() == expected
+
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os').system('true')",
+    "close.abs() > 0",
+    "close.__class__ > 0",
+    "abs(close) > 0",
+    "volume > 0",
+    "close > 'a'",
+    "close in [1, 2]",
+    "close[0] > 0",
+    "close > sma_50 if True else close",
+    "lambda: close",
+    "close ** 2 > 0",
+    "not close > 0",
+])
+def test_rejected_expressions(features, expression):
+    with pytest.raises(ValueError):
+        scanner.filter_mask(features, expression)
+
+
+@pytest.mark.parametrize("expression", ["close", "close + 1", "1 > 0", "close >", ""])
+def test_non_conditions_are_rejected(features, expression):
+    with pytest.raises(ValueError):
+        scanner.filter_mask(features, expression)
+
+
+def test_scan_applies_every_filter_and_sorts(features):
+    result = scanner.scan(features, ["close > 10", "", "return_20d > -5"], sort_by="return_20d")
+    assert result.index.tolist() == ["A", "C", "B"]
+
+
+@pytest.fixture
+def ragged():
+    # A trades every day; B stopped 30 bars ago, so its rows end early
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range("2022-01-03", periods=400)
+    close = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (400, 2)), axis=0)),
+                         index=dates, columns=["A", "B"])
+    volume = pd.DataFrame(rng.integers(1_000, 5_000, (400, 2)).astype(float), index=dates, columns=["A", "B"])
+    close.iloc[-30:, 1] = np.nan
+    volume.iloc[-30:, 1] = np.nan
+    return close, volume
+
+
+def test_stale_symbol_is_read_at_its_own_last_bar(ragged):
+    close, volume = ragged
+    features = scanner.compute_features(close, volume)
+    own = scanner.compute_features(close[["B"]].iloc[:-30], volume[["B"]].iloc[:-30])
+    pd.testing.assert_series_equal(features.loc["B"], own.loc["B"])
+    assert features.loc["B", "last_bar"] == close.index[-31]
+    assert features.loc["B"].drop("last_bar").notna().all()
+
+
+def test_stale_symbol_still_passes_filters(ragged):
+    features = scanner.compute_features(*ragged)
+    matched = scanner.scan(features, ["sma_200 > 0", "volume_ratio > 0", "vol_pct >= 0"])
+    assert set(matched.index) == {"A", "B"}
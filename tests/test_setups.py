@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketpulse import setups
+
+DATES = pd.bdate_range("2023-01-02", periods=300)
+
+
+def _walk(seed, n=len(DATES)):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+
+
+@pytest.fixture
+def ragged():
+    close = pd.DataFrame({name: _walk(i) for i, name in enumerate("ABCD")}, index=DATES)
+    # A stopped trading 20 bars ago, after its range narrowed for 40 bars
+    close.iloc[-20:, 0] = np.nan
+    close.iloc[-60:-20, 0] = close.iloc[-61, 0] * (1 + 0.01 * np.sin(np.arange(40)) * np.exp(-np.arange(40) / 8))
+    # B only listed 10 bars ago: no band width, volatility or moving averages yet
+    close.iloc[:-10, 1] = np.nan
+    # C trends up steadily and crosses its long averages late
+    close["C"] = np.r_[np.linspace(120, 80, 240), np.linspace(80, 110, 60)]
+    return close
+
+
+def test_last_rows_follow_each_symbol(ragged):
+    rows = setups.last_rows(ragged)
+    assert rows.tolist() == [len(DATES) - 21, len(DATES) - 1, len(DATES) - 1, len(DATES) - 1]
+
+
+def test_symbols_are_read_at_their_last_bar(ragged):
+    found = setups.detect(ragged)
+    squeeze = found[found["Setup"] == "Bollinger squeeze"].set_index("Symbol")
+    # A's squeeze is on its own last bar, not the panel's last row (where it has no data)
+    assert "A" in squeeze.index
+    assert squeeze.loc["A", "Date"] == DATES[-21]
+    assert squeeze.loc["A", "Close"] == ragged["A"].iloc[-21]
+    # Its strength comes from a real percentile, not from a missing last value
+    assert squeeze.loc["A", "Strength"] < 1
+
+
+def test_missing_indicators_are_never_hits(ragged):
+    found = setups.detect(ragged)
+    assert found.loc[found["Symbol"] == "B", "Setup"].isin(
+        ["Bollinger squeeze", "Volatility contraction", "Golden cross", "Death cross"]).sum() == 0
+    assert found["Strength"].between(0, 1).all()
+
+
+def test_squeeze_without_band_width_is_not_a_hit(ragged):
+    close = ragged[["B"]]
+    values = {("sma", 20): close.rolling(20).mean(), ("std", 20): close.rolling(20).std()}
+    hit, strength = setups.bollinger_squeeze(close, values)
+    assert not hit.any()
+    assert np.isnan(strength).all()
+
+
+def test_crossover_reads_each_symbols_window():
+    fast = pd.DataFrame({"X": [1.0, 1.0, 3.0, 3.0, np.nan, np.nan], "Y": [3.0, 3.0, 3.0, 3.0, 3.0, 1.0]})
+    slow = pd.DataFrame({"X": [2.0] * 6, "Y": [2.0] * 6})
+    rows = np.array([3, 5])
+    up, down, strength = setups.crossover(fast, slow, recent=2, rows=rows)
+    assert up.tolist() == [True, False]
+    assert down.tolist() == [False, True]
+    assert strength.tolist() == [0.5, 1.0]
+    # Read at the final row instead, X has no values and nothing is reported
+    up, down, strength = setups.crossover(fast, slow, recent=2)
+    assert not up[0] and not down[0] and np.isnan(strength[0])
+
+
+def test_detect_on_empty_panel():
+    assert setups.detect(pd.DataFrame(index=DATES[:0])).empty
+
+
+def test_top_k_matches_a_full_sort():
+    rng = np.random.default_rng(0)
+    found = pd.DataFrame({"Symbol": [f"S{i}" for i in range(200)], "Strength": rng.uniform(0, 1, 200)})
+    found.loc[5, "Strength"] = np.nan
+    top = setups.top_k(found, k=10)
+    expected = found.sort_values("Strength", ascending=False).head(10)
+    assert top["Symbol"].tolist() == expected["Symbol"].tolist()
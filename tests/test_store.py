@@ -0,0 +1,138 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from marketpulse import store
+
+
+@pytest.fixture
+def bars(data_dir):
+    dates = pd.bdate_range("2024-01-01", periods=5)
+    df = pd.DataFrame({"Close": [1.0, np.nan, 3.0, 4.0, 5.0], "Volume": [10, 20, 30, 40, 50]}, index=dates)
+    # Written out of order, so the writer has to sort
+    store.write_frame("bars", df.iloc[::-1], index_name="Date", metadata={"source": "test"})
+    return df
+
+
+def test_index_round_trip_and_nan(bars):
+    back = store.read_frame("bars")
+    assert back.index.name == "Date"
+    pd.testing.assert_frame_equal(back, bars.rename_axis("Date"), check_freq=False)
+    assert np.isnan(back["Close"].iloc[1])
+
+
+def test_range_bounds_are_inclusive(bars):
+    back = store.read_frame("bars", start="2024-01-02", end="2024-01-04")
+    assert back.index.tolist() == list(bars.index[1:4])
+
+
+def test_columns_and_range(bars):
+    back = store.read_frame("bars", columns=["Volume"], start="2024-01-05")
+    assert list(back.columns) == ["Volume"]
+    assert back["Volume"].tolist() == [50]
+
+
+def test_metadata_records_index_and_sort_key(bars):
+    meta = store.read_metadata("bars")
+    assert meta["source"] == "test"
+    assert meta["index"] == meta["sort_by"] == "Date"
+    assert store.read_columns("bars") == ["Close", "Volume"]
+
+
+def test_import_pickle_only_when_stale(data_dir, tmp_path):
+    pickle_path = tmp_path / "legacy.pkl"
+    pd.DataFrame({"x": [1, 2]}).to_pickle(pickle_path)
+    assert store.import_pickle("legacy", pickle_path, lambda df: df)
+    assert not store.import_pickle("legacy", pickle_path, lambda df: df)
+    # A newer pickle is converted again
+    pd.DataFrame({"x": [3]}).to_pickle(pickle_path)
+    later = store.path_for("legacy").stat().st_mtime + 10
+    os.utime(pickle_path, (later, later))
+    assert store.import_pickle("legacy", pickle_path, lambda df: df)
+    assert store.read_frame("legacy")["x"].tolist() == [3]
+
+
+@pytest.fixture
+def positions(data_dir):
+    # Three assets over ragged date ranges, written grouped by asset and sorted by date
+    frames = []
+    for asset, start, weeks in (("EUR", "2020-01-05", 10), ("GBP", "2020-02-02", 6), ("JPY", "2019-12-29", 12)):
+        dates = pd.date_range(start, periods=weeks, freq="W")
+        frames.append(pd.DataFrame({"Asset": asset, "Date": dates, "Net": np.arange(weeks, dtype=float)}))
+    # Shuffled, so the writer has to sort
+    df = pd.concat(frames, ignore_index=True).sample(frac=1, random_state=0)
+    store.write_frame("positions", df, sort_by="Date", group_by="Asset")
+    return df
+
+
+def _expected(df, assets=None, start=None, end=None):
+    keep = pd.Series(True, index=df.index)
+    if assets is not None:
+        keep &= df["Asset"].isin(assets)
+    if start is not None:
+        keep &= df["Date"] >= pd.Timestamp(start)
+    if end is not None:
+        keep &= df["Date"] <= pd.Timestamp(end)
+    return df[keep].sort_values(["Asset", "Date"], ignore_index=True)
+
+
+def test_groups_are_recorded(positions):
+    groups = store.read_metadata("positions")["groups"]
+    assert list(groups) == ["EUR", "GBP", "JPY"]
+    assert groups["GBP"] == [10, 16]
+
+
+def test_read_one_group(positions):
+    df = store.read_frame("positions", group="GBP")
+    pd.testing.assert_frame_equal(df, _expected(positions, ["GBP"]))
+
+
+def test_read_one_group_in_range(positions):
+    df = store.read_frame("positions", group="EUR", start="2020-01-05", end="2020-01-19")
+    assert df["Date"].tolist() == list(pd.date_range("2020-01-05", "2020-01-19", freq="W"))
+
+
+def test_ungrouped_range_read_filters_every_group(positions):
+    df = store.read_frame("positions", start="2020-02-16")
+    pd.testing.assert_frame_equal(df, _expected(positions, start="2020-02-16"))
+
+
+def test_unknown_group_and_empty_range_read_nothing(positions):
+    assert store.read_frame("positions", group="CHF").empty
+    empty = store.read_frame("positions", group="GBP", start="2021-01-01")
+    assert empty.empty
+    assert list(empty.columns) == ["Asset", "Date", "Net"]
+
+
+def test_columns_with_group_and_range(positions):
+    df = store.read_frame("positions", columns=["Net"], group="JPY", end="2020-01-05")
+    assert list(df.columns) == ["Net"]
+    assert df["Net"].tolist() == [0.0, 1.0]
+
+
+def test_group_read_needs_a_grouped_dataset(data_dir):
+    store.write_frame("flat", pd.DataFrame({"x": [1, 2]}))
+    with pytest.raises(ValueError):
+        store.read_frame("flat", group="a")
+
+
+def test_iter_frames_chunks_a_group(positions):
+    chunks = list(store.iter_frames("positions", group="JPY", start="2020-01-05", rows=4))
+    assert [len(c) for c in chunks] == [4, 4, 3]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True),
+                                  _expected(positions, ["JPY"], start="2020-01-05"))
+
+
+def test_read_groups_with_range(positions):
+    df = store.read_frame("positions", group=["JPY", "EUR"], start="2020-01-12", end="2020-02-09")
+    expected = _expected(positions, ["JPY", "EUR"], "2020-01-12", "2020-02-09")
+    # Groups come back in the order they were asked for
+    expected = pd.concat([expected[expected["Asset"] == "JPY"], expected[expected["Asset"] == "EUR"]],
+                         ignore_index=True)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_read_no_groups(positions):
+    assert store.read_frame("positions", group=[]).empty